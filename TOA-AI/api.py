@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 import os
+import re
+import hashlib
 import logging
+import mimetypes
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from src.retrieval import Retriever
 from src.llm import RAGPromptTemplate, LLMConnector, LLMProvider
+from src.utils.metrics import registry as metrics_registry
+from src.utils.asset_manager import find_asset
+from src.utils.table_store import render_table, RENDER_FORMATS
+from src.utils.thumbnails import get_thumbnail_service
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if it exists
@@ -278,6 +286,190 @@ async def get_llm_providers():
     """
     return {"providers": [provider.value for provider in LLMProvider]}
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Get timing histograms of retrieval and search calls
+    """
+    return {
+        "enabled": metrics_registry.enabled,
+        "sample_rate": metrics_registry.sample_rate,
+        "metrics": metrics_registry.snapshot()
+    }
+
+# Content-addressed assets never change, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Other assets are revalidated with their ETag on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+TABLE_MEDIA_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "html": "text/html; charset=utf-8"
+}
+
+# Warning fields returned to clients (registry entries also hold server file paths)
+WARNING_FIELDS = ["id", "warning_type", "content", "page_num", "section_id", "priority"]
+
+def _etag_matches(request, etag):
+    """Check whether the request's If-None-Match header matches an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    
+    def strip_weak(tag):
+        return tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+    
+    candidates = [strip_weak(tag) for tag in if_none_match.split(",")]
+    return "*" in candidates or strip_weak(etag) in candidates
+
+def _file_response(request, path, etag, cache_control):
+    """
+    Serve a file with ETag revalidation and single byte-range support
+    
+    Args:
+        request (Request): Incoming request
+        path (str): Path to the file
+        etag (str): Entity tag of the file
+        cache_control (str): Cache-Control header value
+    
+    Returns:
+        Response: 200, 206, 304 or 416 response
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+    size = os.path.getsize(path)
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip()) if range_header else None
+    if match and (not if_range or if_range == etag) and match.group(1) + match.group(2):
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(match.group(2)), 0)
+            end = size - 1
+        
+        if start > end or start >= size:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        
+        with open(path, "rb") as f:
+            f.seek(start)
+            content = f.read(end - start + 1)
+        
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(content=content, status_code=206, media_type=media_type, headers=headers)
+    
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+def _image_etag(image, path, variant=None):
+    """ETag of an image file: its content hash if known, otherwise size and modification time"""
+    if image.get("content_hash"):
+        return f'"{image["content_hash"]}{"-" + variant if variant else ""}"'
+    stat = os.stat(path)
+    return f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def _get_asset_or_404(asset_id):
+    """Look up an asset, raising 404 if it does not exist"""
+    asset_type, asset = find_asset(asset_id)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=f"Asset not found: {asset_id}")
+    return asset_type, asset
+
+@app.get("/assets/{asset_id}")
+def get_asset(asset_id: str, request: Request, format: str = "html"):
+    """
+    Get an extracted asset
+    
+    Images are returned as stored; tables are rendered in the requested
+    format (html, markdown or csv); warnings are returned as JSON.
+    """
+    asset_type, asset = _get_asset_or_404(asset_id)
+    
+    if asset_type == "images":
+        path = asset["file_path"]
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"Image file missing for {asset_id}")
+        cache_control = IMMUTABLE_CACHE_CONTROL if asset.get("content_hash") else REVALIDATE_CACHE_CONTROL
+        return _file_response(request, path, _image_etag(asset, path), cache_control)
+    
+    if asset_type == "tables":
+        if format not in RENDER_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported table format: {format}")
+        try:
+            content = render_table(asset, format)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Table file missing for {asset_id}")
+        
+        etag = f'"{hashlib.md5(content.encode("utf-8")).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=content, media_type=TABLE_MEDIA_TYPES[format], headers=headers)
+    
+    return {field: asset.get(field) for field in WARNING_FIELDS}
+
+def _variant_redirect(request, asset_id, variant_tag):
+    """Redirect to the versioned URL of an image variant, revalidating the redirect on every use"""
+    url = request.url_for("get_asset_variant", asset_id=asset_id, variant_tag=variant_tag)
+    return RedirectResponse(str(url), status_code=307, headers={"Cache-Control": REVALIDATE_CACHE_CONTROL})
+
+@app.get("/assets/{asset_id}/thumbnail")
+def get_asset_thumbnail(asset_id: str, request: Request, variant: str = "thumbnail"):
+    """
+    Get a downscaled variant of an image asset ("thumbnail" or "preview")
+    
+    Redirects to the variant's versioned URL, which names its current size
+    and quality, so a change to IMAGE_VARIANTS moves clients to a new URL.
+    """
+    asset_type, asset = _get_asset_or_404(asset_id)
+    if asset_type != "images":
+        raise HTTPException(status_code=404, detail=f"Asset {asset_id} is not an image")
+    
+    service = get_thumbnail_service()
+    if variant not in service.sizes:
+        raise HTTPException(status_code=400, detail=f"Unknown image variant: {variant}")
+    
+    return _variant_redirect(request, asset_id, service.variant_tag(variant))
+
+@app.get("/assets/{asset_id}/thumbnail/{variant_tag}")
+def get_asset_variant(asset_id: str, variant_tag: str, request: Request):
+    """
+    Get an image variant by its versioned tag (e.g. "thumbnail-256-q85")
+    
+    Variants are generated on first request and served from disk afterwards.
+    A tag of outdated settings redirects to the current one.
+    """
+    asset_type, asset = _get_asset_or_404(asset_id)
+    if asset_type != "images":
+        raise HTTPException(status_code=404, detail=f"Asset {asset_id} is not an image")
+    
+    service = get_thumbnail_service()
+    variant = variant_tag.rsplit("-", 2)[0]
+    if variant not in service.sizes:
+        raise HTTPException(status_code=404, detail=f"Unknown image variant: {variant_tag}")
+    if variant_tag != service.variant_tag(variant):
+        return _variant_redirect(request, asset_id, service.variant_tag(variant))
+    
+    # A content-addressed variant can be revalidated without generating it
+    if asset.get("content_hash") and _etag_matches(request, _image_etag(asset, None, variant_tag)):
+        return Response(status_code=304, headers={"ETag": _image_etag(asset, None, variant_tag),
+                                                  "Cache-Control": IMMUTABLE_CACHE_CONTROL})
+    
+    try:
+        variant_path = service.get(asset, variant)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Image file missing for {asset_id}")
+    
+    # The URL names the variant's settings, so the file behind it never changes
+    cache_control = IMMUTABLE_CACHE_CONTROL if asset.get("content_hash") else REVALIDATE_CACHE_CONTROL
+    return _file_response(request, variant_path, _image_etag(asset, variant_path, variant_tag), cache_control)
+
 if __name__ == "__main__":
     # Run the API server
     port = int(os.environ.get("PORT", 8000))
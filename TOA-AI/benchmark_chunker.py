@@ -0,0 +1,156 @@
+"""
+TOA-AI Chunker Benchmark
+Times section splitting on a large synthetic section and checks it against the original splitter
+"""
+
+import argparse
+import time
+import random
+from pathlib import Path
+
+# Add the project directory to the path
+import sys
+sys.path.append(str(Path(__file__).parent))
+
+# Import project components
+from config.config import CHUNKING
+from src.processors.document_chunker import DocumentChunker
+from src.utils.logger import get_logger
+
+# Initialize logger
+logger = get_logger("BenchmarkChunker")
+
+SENTENCES = [
+    "Ensure the aircraft is grounded before starting the refueling operation.",
+    "Verify that all personnel are clear of the intake danger area!",
+    "Is the fire extinguisher positioned upwind of the fueling point?",
+    "Connect the bonding cable to the aircraft and the refueling unit.",
+    "Set the pressure to 1.5 PSI as shown in TO 00-25-172CL-3.",
+    "WARNING: Do not exceed 55 PSI nozzle pressure during hot refueling.",
+    "NOTE: Record the fuel quantity on the AFTO Form 781."
+]
+
+def build_section(size, seed=0):
+    """
+    Build a procedure-like section of roughly the given size
+    
+    Args:
+        size (int): Section size in characters
+        seed (int): Random seed
+    
+    Returns:
+        tuple: (section content, section dict)
+    """
+    rng = random.Random(seed)
+    section = {"id": "1.1", "title": "HOT REFUELING PROCEDURES", "page": 1,
+               "assets": {"images": [], "tables": [], "warnings": []}}
+    
+    parts = [f"SECTION {section['id']} {section['title']}\n\n"]
+    length = len(parts[0])
+    step = 1
+    while length < size:
+        paragraph = f"{step}. " + " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 4))) + "\n\n"
+        parts.append(paragraph)
+        length += len(paragraph)
+        step += 1
+    
+    return "".join(parts), section
+
+def legacy_split(content, section, chunk_settings):
+    """
+    The original character-by-character splitter, kept as the reference output
+    
+    Args:
+        content (str): Section content
+        section (dict): Section
+        chunk_settings (dict): Chunk settings
+    
+    Returns:
+        list: Chunk texts
+    """
+    split_chars = chunk_settings["special_break_chars"]
+    parts = []
+    current_part = ""
+    for char in content:
+        current_part += char
+        if any(current_part.endswith(split_char) for split_char in split_chars):
+            parts.append(current_part)
+            current_part = ""
+    if current_part:
+        parts.append(current_part)
+    
+    chunks = []
+    current_chunk = ""
+    for part in parts:
+        if len(current_chunk) + len(part) > chunk_settings["chunk_size"]:
+            if current_chunk:
+                if not current_chunk.startswith(f"SECTION {section['id']}"):
+                    current_chunk = f"SECTION {section['id']} {section['title']}\n\n{current_chunk}"
+                chunks.append(current_chunk)
+                
+                if chunk_settings["chunk_overlap"] > 0:
+                    overlap_text = current_chunk[-chunk_settings["chunk_overlap"]:]
+                    for split_char in split_chars:
+                        pos = overlap_text.find(split_char)
+                        if pos > 0:
+                            overlap_text = overlap_text[pos + len(split_char):]
+                            break
+                    current_chunk = overlap_text
+                else:
+                    current_chunk = ""
+        current_chunk += part
+    
+    if current_chunk:
+        if not current_chunk.startswith(f"SECTION {section['id']}"):
+            current_chunk = f"SECTION {section['id']} {section['title']}\n\n{current_chunk}"
+        chunks.append(current_chunk)
+    
+    return chunks
+
+def split(content, section, chunk_settings):
+    """Split a section with DocumentChunker and return the chunk texts"""
+    chunker = DocumentChunker({"id": "BENCH", "metadata": {"to_number": "BENCH"}}, chunk_settings)
+    chunker._split_section_into_chunks(content, section)
+    return [chunk["content"] for chunk in chunker.chunks]
+
+def best_time(func, repeat):
+    """Get the best wall time of several runs and the result of the last one"""
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark DocumentChunker section splitting")
+    parser.add_argument("--size", type=int, default=100_000,
+                        help="Section size in characters (default 100 KB)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per splitter (best time is reported)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed for the synthetic section")
+    
+    args = parser.parse_args()
+    
+    content, section = build_section(args.size, args.seed)
+    chunk_settings = dict(CHUNKING, boundary_pattern=None)
+    
+    legacy_time, legacy_chunks = best_time(lambda: legacy_split(content, section, chunk_settings), args.repeat)
+    new_time, new_chunks = best_time(lambda: split(content, section, chunk_settings), args.repeat)
+    
+    if new_chunks != legacy_chunks:
+        logger.error(f"Output differs from the original splitter ({len(new_chunks)} vs {len(legacy_chunks)} chunks)")
+        sys.exit(1)
+    
+    logger.info(f"Section of {len(content)} characters -> {len(new_chunks)} chunks (identical output)")
+    logger.info(f"Original splitter: {legacy_time * 1000:.1f} ms")
+    logger.info(f"Offset splitter:   {new_time * 1000:.1f} ms ({legacy_time / new_time:.1f}x faster)")
+    
+    if CHUNKING.get("boundary_pattern"):
+        pattern_time, pattern_chunks = best_time(lambda: split(content, section, CHUNKING), args.repeat)
+        logger.info(f"boundary_pattern:  {pattern_time * 1000:.1f} ms, {len(pattern_chunks)} chunks")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+TOA-AI Ingestion Benchmark
+Measures the speed of each ingestion stage and compares runs
+"""
+
+import argparse
+import os
+import json
+import time
+import shutil
+import tempfile
+import platform
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+# Add the project directory to the path
+import sys
+sys.path.append(str(Path(__file__).parent))
+
+# resource is not available on Windows; CPU time of child processes and peak RSS are not measured there
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Import project components
+from config.config import DATA_DIR, PDF_PROCESSING
+import src.utils.asset_manager as asset_manager_module
+import src.utils.asset_registry_db as asset_registry_db_module
+from src.processors.pdf_processor import PDFProcessor
+from src.processors.page_layout import PageLayout
+from src.processors.document_chunker import DocumentChunker
+from src.utils.asset_manager import AssetManager
+from src.utils.logger import get_logger
+
+# Initialize logger
+logger = get_logger("BenchmarkIngestion")
+
+# Stage name -> (owner, attribute) of the functions timed for that stage.
+# Nested calls within the same stage are only counted once.
+STAGES = {
+    "get_text": [(PageLayout, "__init__")],
+    "ocr": [(PDFProcessor, "_apply_ocr")],
+    "camelot": [(PDFProcessor, "_read_tables")],
+    "image_extraction": [(PDFProcessor, "_extract_images")],
+    "asset_writes": [(AssetManager, "store_image"), (AssetManager, "reference_image"),
+                     (AssetManager, "store_table"), (AssetManager, "store_warning"),
+                     (AssetManager, "merge_assets"), (AssetManager, "remove_page_assets"),
+                     (AssetManager, "flush")],
+    "chunking": [(DocumentChunker, "create_chunks")],
+}
+
+class StageTimer:
+    """
+    Accumulates wall and CPU time per stage by wrapping the stage functions
+    
+    CPU time is process CPU time plus the CPU time of finished child
+    processes (e.g. Tesseract), measured across the outermost call. Child
+    CPU time is only available where the resource module is (not Windows).
+    """
+    
+    def __init__(self):
+        self.stats = {}
+        self._depth = {}
+        self._originals = []
+    
+    def _cpu_time(self):
+        """CPU seconds used by this process and its finished children"""
+        if resource is None:
+            return time.process_time()
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return time.process_time() + children.ru_utime + children.ru_stime
+    
+    def _stage(self, name):
+        """Get the counters of a stage, creating them on first use"""
+        return self.stats.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+    
+    def measure(self, name, func, *args, **kwargs):
+        """
+        Call a function and add its time to a stage
+        
+        Args:
+            name (str): Stage name
+            func (callable): Function to call
+        
+        Returns:
+            Result of the function
+        """
+        depth = self._depth.get(name, 0)
+        if depth:
+            return func(*args, **kwargs)
+        
+        self._depth[name] = 1
+        wall_start = time.perf_counter()
+        cpu_start = self._cpu_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stage = self._stage(name)
+            stage["calls"] += 1
+            stage["wall_seconds"] += time.perf_counter() - wall_start
+            stage["cpu_seconds"] += self._cpu_time() - cpu_start
+            self._depth[name] = 0
+    
+    def install(self):
+        """Wrap the functions of every stage"""
+        for name, targets in STAGES.items():
+            for owner, attribute in targets:
+                original = getattr(owner, attribute)
+                self._originals.append((owner, attribute, original))
+                setattr(owner, attribute, self._wrap(name, original))
+    
+    def uninstall(self):
+        """Restore the original functions"""
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+    
+    def _wrap(self, name, func):
+        """Wrap a function so its calls are timed as part of a stage"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.measure(name, func, *args, **kwargs)
+        return wrapper
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in megabytes (None where it is not available)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    if platform.system() == "Darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def _embed_and_index(chunks, model_name, stage_timer, use_embedding_cache=False):
+    """
+    Time embedding the chunks and building the vector store index
+    
+    Args:
+        chunks (list): Chunks to embed
+        model_name (str): Sentence transformer model name
+        stage_timer (StageTimer): Timer to record into
+        use_embedding_cache (bool): Reuse embeddings from the persistent embedding cache
+    
+    Returns:
+        bool: True if both stages ran
+    """
+    try:
+        from create_embeddings import create_embeddings, save_embeddings
+        from src.retrieval.vector_store import VectorStore
+    except ImportError as e:
+        logger.warning(f"Skipping embedding and index build: {e}")
+        return False
+    
+    embeddings = stage_timer.measure("embedding", create_embeddings, chunks, model_name=model_name,
+                                     use_cache=use_embedding_cache)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        embeddings_path = os.path.join(tmp_dir, "embeddings.json")
+        save_embeddings(embeddings, chunks, embeddings_path)
+        stage_timer.measure("index_build", VectorStore, embeddings_path, model_name=model_name)
+    
+    return True
+
+def run_benchmark(pdf_files, model_name="all-MiniLM-L6-v2", embed=True, use_ocr_cache=False,
+                  use_embedding_cache=False):
+    """
+    Run the ingestion pipeline over PDFs and measure each stage
+    
+    Documents are processed serially with a fresh asset directory, so the
+    ingest manifest and existing assets do not affect the timings.
+    
+    Args:
+        pdf_files (list): Paths to PDF files
+        model_name (str): Sentence transformer model for the embedding stage
+        embed (bool): Also time embedding and index build
+        use_ocr_cache (bool): Allow OCR results from the disk cache
+        use_embedding_cache (bool): Allow embeddings from the persistent embedding cache
+    
+    Returns:
+        dict: Benchmark result
+    """
+    stage_timer = StageTimer()
+    documents = []
+    all_chunks = []
+    
+    # Keep benchmark assets out of the real asset tree
+    asset_dir = Path(tempfile.mkdtemp(prefix="toa_benchmark_"))
+    asset_dirs = {name: getattr(asset_manager_module, name)
+                  for name in ["ASSETS_DIR", "IMAGE_DIR", "TABLE_DIR", "WARNING_DIR"]}
+    for name in asset_dirs:
+        setattr(asset_manager_module, name, asset_dir / name.split("_")[0].lower())
+    registry_db_path = asset_registry_db_module.REGISTRY_DB_PATH
+    asset_registry_db_module.REGISTRY_DB_PATH = asset_dir / "asset_registry.db"
+    
+    ocr_cache = PDF_PROCESSING.get("ocr_cache", True)
+    PDF_PROCESSING["ocr_cache"] = use_ocr_cache
+    
+    stage_timer.install()
+    
+    wall_start = time.perf_counter()
+    cpu_start = stage_timer._cpu_time()
+    
+    try:
+        for pdf_file in pdf_files:
+            logger.info(f"Benchmarking {pdf_file}")
+            doc_start = time.perf_counter()
+            
+            processor = PDFProcessor(pdf_file)
+            document = processor.process_document(workers=1)
+            chunks = DocumentChunker(document).create_chunks()
+            
+            doc_seconds = time.perf_counter() - doc_start
+            documents.append({
+                "file": Path(pdf_file).name,
+                "pages": processor.num_pages,
+                "chunks": len(chunks),
+                "wall_seconds": doc_seconds,
+                "pages_per_second": processor.num_pages / doc_seconds if doc_seconds else 0.0
+            })
+            all_chunks.extend(chunks)
+        
+        ingest_seconds = time.perf_counter() - wall_start
+        
+        embedded = bool(embed and all_chunks) and _embed_and_index(all_chunks, model_name, stage_timer,
+                                                                   use_embedding_cache)
+    finally:
+        stage_timer.uninstall()
+        PDF_PROCESSING["ocr_cache"] = ocr_cache
+        for name, path in asset_dirs.items():
+            setattr(asset_manager_module, name, path)
+        asset_registry_db_module.REGISTRY_DB_PATH = registry_db_path
+        shutil.rmtree(asset_dir, ignore_errors=True)
+    
+    total_pages = sum(document["pages"] for document in documents)
+    
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "embedding_model": model_name if embedded else None,
+        "embedding_cache": use_embedding_cache if embedded else None,
+        "documents": documents,
+        "stages": stage_timer.stats,
+        "totals": {
+            "documents": len(documents),
+            "pages": total_pages,
+            "chunks": len(all_chunks),
+            "ingest_wall_seconds": ingest_seconds,
+            "wall_seconds": time.perf_counter() - wall_start,
+            "cpu_seconds": stage_timer._cpu_time() - cpu_start,
+            "pages_per_second": total_pages / ingest_seconds if ingest_seconds else 0.0,
+            "peak_rss_mb": _peak_rss_mb()
+        }
+    }
+
+def compare_results(result, baseline, time_threshold=0.10, rss_threshold=0.10, min_seconds=0.05):
+    """
+    Compare a benchmark result against an earlier one
+    
+    Args:
+        result (dict): Current benchmark result
+        baseline (dict): Earlier benchmark result
+        time_threshold (float): Allowed relative increase in stage wall time
+        rss_threshold (float): Allowed relative increase in peak RSS
+        min_seconds (float): Stages faster than this in both runs are ignored
+    
+    Returns:
+        list: Regression messages (empty if none)
+    """
+    regressions = []
+    
+    def check(label, current, previous, threshold, unit):
+        if previous <= 0:
+            return
+        change = (current - previous) / previous
+        logger.info(f"{label}: {previous:.2f}{unit} -> {current:.2f}{unit} ({change:+.1%})")
+        if change > threshold:
+            regressions.append(f"{label} regressed by {change:.1%} "
+                               f"({previous:.2f}{unit} -> {current:.2f}{unit}, allowed {threshold:.0%})")
+    
+    for name in sorted(set(result["stages"]) | set(baseline.get("stages", {}))):
+        current = result["stages"].get(name, {}).get("wall_seconds", 0.0)
+        previous = baseline.get("stages", {}).get(name, {}).get("wall_seconds", 0.0)
+        if max(current, previous) < min_seconds:
+            continue
+        check(f"Stage {name}", current, previous, time_threshold, "s")
+    
+    totals, previous_totals = result["totals"], baseline.get("totals", {})
+    check("Ingest wall time", totals["ingest_wall_seconds"],
+          previous_totals.get("ingest_wall_seconds", 0.0), time_threshold, "s")
+    if totals["peak_rss_mb"] is not None and previous_totals.get("peak_rss_mb") is not None:
+        check("Peak RSS", totals["peak_rss_mb"], previous_totals["peak_rss_mb"], rss_threshold, "MB")
+    
+    if previous_totals.get("pages_per_second"):
+        logger.info(f"Pages per second: {previous_totals['pages_per_second']:.2f} -> "
+                    f"{totals['pages_per_second']:.2f}")
+    
+    return regressions
+
+def _log_result(result):
+    """Log the per-stage timings of a benchmark result"""
+    for name, stage in sorted(result["stages"].items(), key=lambda item: -item[1]["wall_seconds"]):
+        logger.info(f"{name:<18} {stage['calls']:>6} calls  "
+                    f"wall {stage['wall_seconds']:8.2f}s  cpu {stage['cpu_seconds']:8.2f}s")
+    
+    totals = result["totals"]
+    peak_rss = "unavailable" if totals["peak_rss_mb"] is None else f"{totals['peak_rss_mb']:.0f} MB"
+    logger.info(f"{totals['documents']} documents, {totals['pages']} pages, {totals['chunks']} chunks: "
+                f"{totals['pages_per_second']:.2f} pages/s, peak RSS {peak_rss}")
+    if result.get("embedding_cache") is not None:
+        logger.info(f"Embedding cache {'used' if result['embedding_cache'] else 'bypassed'}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark TOA-AI ingestion stages")
+    parser.add_argument("--dir", type=str, default=str(DATA_DIR),
+                        help="Directory containing PDF files")
+    parser.add_argument("--pattern", type=str, default="*.pdf",
+                        help="Pattern to match PDF files")
+    parser.add_argument("--output", type=str, default="benchmark_results.json",
+                        help="Path to write the benchmark result to")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Earlier benchmark result to compare against")
+    parser.add_argument("--time-threshold", type=float, default=0.10,
+                        help="Allowed relative increase in stage wall time (default 0.10)")
+    parser.add_argument("--rss-threshold", type=float, default=0.10,
+                        help="Allowed relative increase in peak RSS (default 0.10)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Ignore stages faster than this in both runs")
+    parser.add_argument("--model", type=str, default="all-MiniLM-L6-v2",
+                        help="Sentence transformer model for the embedding stage")
+    parser.add_argument("--no-embed", action="store_true", default=False,
+                        help="Skip the embedding and index build stages")
+    parser.add_argument("--ocr-cache", action="store_true", default=False,
+                        help="Allow OCR results from the disk cache")
+    parser.add_argument("--embedding-cache", action="store_true", default=False,
+                        help="Allow embeddings from the persistent embedding cache")
+    
+    args = parser.parse_args()
+    
+    pdf_files = sorted(Path(args.dir).glob(args.pattern))
+    if not pdf_files:
+        logger.error(f"No PDF files found in {args.dir} matching {args.pattern}")
+        sys.exit(1)
+    
+    result = run_benchmark(pdf_files, model_name=args.model, embed=not args.no_embed,
+                           use_ocr_cache=args.ocr_cache, use_embedding_cache=args.embedding_cache)
+    _log_result(result)
+    
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"Benchmark result saved to {args.output}")
+    
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        
+        regressions = compare_results(result, baseline, args.time_threshold,
+                                      args.rss_threshold, args.min_seconds)
+        if regressions:
+            for regression in regressions:
+                logger.error(regression)
+            sys.exit(1)
+        
+        logger.info(f"No regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
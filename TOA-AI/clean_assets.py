@@ -0,0 +1,328 @@
+"""
+TOA-AI Asset Cleanup Script
+Removes asset files no registry refers to and checks the integrity of the rest
+"""
+
+import argparse
+import os
+import json
+import time
+import hashlib
+from pathlib import Path, PureWindowsPath
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to the path
+import sys
+sys.path.append(str(Path(__file__).parent))
+
+# Import project components
+from config.config import ASSETS_DIR, IMAGE_DIR, TABLE_DIR, WARNING_DIR, ASSET_REGISTRY
+from src.utils.asset_manager import AssetManager
+from src.utils.asset_registry_db import AssetRegistryDB, ASSET_TYPES
+from src.utils.table_store import load_table
+from src.utils.thumbnails import ThumbnailService
+from src.utils.logger import get_logger
+from PIL import Image
+
+# Initialize logger
+logger = get_logger("CleanAssets")
+
+# Directory holding each asset type, one folder per document
+ASSET_DIRS = {
+    "images": IMAGE_DIR,
+    "tables": TABLE_DIR,
+    "warnings": WARNING_DIR
+}
+
+def load_registries():
+    """
+    Load the asset registries of all documents from the configured backend
+    
+    Returns:
+        dict: Registries keyed by document ID
+    """
+    if ASSET_REGISTRY.get("backend") == "sqlite":
+        db = AssetRegistryDB()
+        return {document_id: db.load_document(document_id) for document_id in db.document_ids()}
+    
+    registries = {}
+    for registry_path in sorted(ASSETS_DIR.glob("*/asset_registry.json")):
+        with open(registry_path, "r") as f:
+            registries[registry_path.parent.name] = json.load(f)
+    return registries
+
+def resolve_path(path, directory):
+    """
+    Find a registered file on this machine
+    
+    Registries store absolute paths, which break when the asset tree is
+    moved or was produced on another OS (e.g. C:\\...\\assets\\images\\...).
+    Such paths are resolved by file name in the document's asset folder.
+    
+    Args:
+        path (str): Path from the registry
+        directory (Path): Asset folder of the document
+    
+    Returns:
+        Path: Path to the file (may not exist)
+    """
+    if os.path.exists(path):
+        return Path(path)
+    return directory / PureWindowsPath(path).name
+
+def registered_files(asset_type, asset, directory):
+    """
+    Get the files a registry entry refers to
+    
+    Args:
+        asset_type (str): "images", "tables" or "warnings"
+        asset (dict): Registry entry
+        directory (Path): Asset folder of the document
+    
+    Returns:
+        list: Paths of the asset's files
+    """
+    if asset_type == "tables":
+        keys = ["data_path"] if asset.get("data_path") else ["csv_path", "md_path"]
+    else:
+        keys = ["file_path", "path"]
+    return [resolve_path(asset[key], directory) for key in keys if asset.get(key)]
+
+def validate_asset(asset_type, asset, path):
+    """
+    Check that an asset file matches its registry entry
+    
+    Images stored as-is must hash to their content_hash, other images must
+    decode; tables must load with the registered shape; warning files must
+    hold the registered text.
+    
+    Args:
+        asset_type (str): "images", "tables" or "warnings"
+        asset (dict): Registry entry
+        path (Path): Path of the asset's main file
+    
+    Returns:
+        str: Description of the problem, or None if the file is valid
+    """
+    try:
+        if asset_type == "images":
+            if asset.get("encoding") == "original" and asset.get("content_hash"):
+                digest = hashlib.md5()
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+                if digest.hexdigest() != asset["content_hash"]:
+                    return "content hash mismatch"
+            else:
+                with Image.open(path) as image:
+                    image.verify()
+        
+        elif asset_type == "tables":
+            table = dict(asset)
+            table["data_path" if asset.get("data_path") else "csv_path"] = str(path)
+            shape = load_table(table).shape
+            if shape != (asset.get("rows"), asset.get("columns")):
+                return f"shape {shape} does not match {asset.get('rows')}x{asset.get('columns')}"
+        
+        elif asset_type == "warnings" and "content" in asset:
+            with open(path, "r", encoding="utf-8") as f:
+                if f.read() != f"{asset['warning_type']}: {asset['content']}":
+                    return "content does not match the registry"
+    except Exception as e:
+        return f"unreadable ({e})"
+    
+    return None
+
+def find_orphans(document_id, referenced, image_ids, min_age):
+    """
+    Find files in a document's asset folders that no registry entry refers to
+    
+    Image variants are kept as long as their image is registered and they
+    were generated with the current variant settings. Files
+    modified within min_age seconds are skipped, as they may belong to an
+    ingestion that is still running.
+    
+    Args:
+        document_id (str): Document identifier
+        referenced (set): Resolved paths of registered files
+        image_ids (set): Registered image IDs
+        min_age (float): Minimum file age in seconds
+    
+    Returns:
+        list: Paths of orphaned files
+    """
+    orphans = []
+    cutoff = time.time() - min_age
+    
+    thumbnail_service = ThumbnailService()
+    variant_tags = {thumbnail_service.variant_tag(variant) for variant in thumbnail_service.sizes}
+    
+    for directory in list(ASSET_DIRS.values()) + [ASSETS_DIR]:
+        doc_dir = directory / document_id
+        if not doc_dir.is_dir():
+            continue
+        
+        for path in doc_dir.rglob("*"):
+            if not path.is_file() or path in referenced or path.name == "asset_registry.json":
+                continue
+            if path.parent.name == "variants":
+                image_id, _, variant_tag = path.stem.rpartition("_")
+                if image_id in image_ids and variant_tag in variant_tags:
+                    continue
+            if path.stat().st_mtime > cutoff:
+                continue
+            orphans.append(path)
+    
+    return orphans
+
+def clean_assets(dry_run=False, validate=True, drop_missing=False, remove_unregistered=False,
+                 workers=8, min_age=3600):
+    """
+    Compare the asset registries with the files on disk
+    
+    Args:
+        dry_run (bool): Only report, do not delete anything
+        validate (bool): Check registered files against their registry entries
+        drop_missing (bool): Remove registry entries whose files are missing
+        remove_unregistered (bool): Also clean asset folders of documents without a registry
+        workers (int): Threads used for validation
+        min_age (float): Only remove orphans older than this many seconds
+    
+    Returns:
+        dict: Cleanup report
+    """
+    registries = load_registries()
+    
+    # Asset folders of documents that have no registry at all
+    folders = {path.name for directory in ASSET_DIRS.values() if directory.is_dir()
+               for path in directory.iterdir() if path.is_dir()}
+    unregistered = sorted(folders - set(registries))
+    if unregistered and not remove_unregistered:
+        logger.warning(f"Skipping asset folders without a registry: {', '.join(unregistered)} "
+                       "(use --remove-unregistered to clean them)")
+    
+    report = {"documents": {}, "orphans": 0, "orphan_bytes": 0, "missing": 0, "invalid": 0,
+              "removed_files": 0, "reclaimed_bytes": 0, "dropped_entries": 0, "dry_run": dry_run}
+    checks = []
+    
+    documents = list(registries.items())
+    if remove_unregistered:
+        documents += [(document_id, {}) for document_id in unregistered]
+    
+    for document_id, registry in documents:
+        referenced = set()
+        missing = []
+        
+        for asset_type in ASSET_TYPES:
+            directory = ASSET_DIRS[asset_type] / document_id
+            for asset_id, asset in registry.get(asset_type, {}).items():
+                paths = registered_files(asset_type, asset, directory)
+                referenced.update(paths)
+                
+                absent = [path for path in paths if not path.exists()]
+                if absent or not paths:
+                    missing.append((asset_type, asset_id))
+                elif validate:
+                    checks.append((document_id, asset_type, asset_id, asset, paths[0]))
+        
+        image_ids = set(registry.get("images", {}))
+        orphans = find_orphans(document_id, referenced, image_ids, min_age)
+        orphan_bytes = sum(path.stat().st_size for path in orphans)
+        
+        report["documents"][document_id] = {
+            "assets": sum(len(registry.get(asset_type, {})) for asset_type in ASSET_TYPES),
+            "missing": [asset_id for _, asset_id in missing],
+            "orphans": [str(path) for path in orphans],
+            "orphan_bytes": orphan_bytes,
+            "invalid": {}
+        }
+        report["orphans"] += len(orphans)
+        report["orphan_bytes"] += orphan_bytes
+        report["missing"] += len(missing)
+        
+        for asset_type, asset_id in missing:
+            logger.warning(f"{asset_id} is registered but its file is missing")
+        
+        if dry_run:
+            continue
+        
+        for path in orphans:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                report["removed_files"] += 1
+                report["reclaimed_bytes"] += size
+            except OSError as e:
+                logger.error(f"Could not remove {path}: {e}")
+        
+        if drop_missing and missing:
+            asset_manager = AssetManager(document_id)
+            registries_in_memory = asset_manager.get_all_assets()
+            for asset_type, asset_id in missing:
+                registries_in_memory[asset_type].pop(asset_id, None)
+            asset_manager.flush()
+            report["dropped_entries"] += len(missing)
+    
+    # Hashing and decoding release the GIL, so threads validate in parallel
+    if checks:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda check: validate_asset(check[1], check[3], check[4]), checks)
+            for (document_id, asset_type, asset_id, asset, path), problem in zip(checks, results):
+                if problem:
+                    logger.warning(f"{asset_id} ({path.name}): {problem}")
+                    report["documents"][document_id]["invalid"][asset_id] = problem
+                    report["invalid"] += 1
+    
+    return report
+
+def _format_bytes(size):
+    """Format a byte count for the log"""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Remove orphaned asset files and check asset integrity")
+    parser.add_argument("--dry-run", action="store_true", default=False,
+                        help="Only report what would be removed")
+    parser.add_argument("--no-validate", action="store_true", default=False,
+                        help="Skip checking registered files against their registry entries")
+    parser.add_argument("--drop-missing", action="store_true", default=False,
+                        help="Remove registry entries whose files no longer exist")
+    parser.add_argument("--remove-unregistered", action="store_true", default=False,
+                        help="Also clean asset folders of documents without a registry")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Threads used for validation")
+    parser.add_argument("--min-age", type=float, default=3600,
+                        help="Only remove orphans older than this many seconds (default 3600)")
+    parser.add_argument("--report", type=str, default=None,
+                        help="Path to write the full report to (JSON)")
+    
+    args = parser.parse_args()
+    
+    start_time = time.time()
+    
+    report = clean_assets(dry_run=args.dry_run, validate=not args.no_validate,
+                          drop_missing=args.drop_missing, remove_unregistered=args.remove_unregistered,
+                          workers=args.workers, min_age=args.min_age)
+    
+    if args.dry_run:
+        logger.info(f"Found {report['orphans']} orphaned files ({_format_bytes(report['orphan_bytes'])}) "
+                    f"in {len(report['documents'])} documents, nothing removed (dry run)")
+    else:
+        logger.info(f"Removed {report['removed_files']} orphaned files, "
+                    f"reclaimed {_format_bytes(report['reclaimed_bytes'])}")
+    logger.info(f"{report['missing']} registered assets with missing files"
+                + (f" ({report['dropped_entries']} entries dropped)" if report["dropped_entries"] else "")
+                + f", {report['invalid']} failed validation")
+    logger.info(f"Asset check completed in {time.time() - start_time:.2f} seconds")
+    
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from pathlib import Path
 ROOT_DIR = Path(os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 DATA_DIR = ROOT_DIR.parent / "DATA"  # Original PDF files
 PROCESSED_DIR = ROOT_DIR / "processed"  # Processed data
+CHUNKS_DIR = PROCESSED_DIR / "chunks"  # Chunk shards, one NDJSON file per document
 ASSETS_DIR = ROOT_DIR / "assets"  # Extracted images and tables
 INDEX_DIR = ROOT_DIR / "index"  # Vector indices
 CONFIG_DIR = ROOT_DIR / "config"  # Configuration files
@@ -21,7 +22,7 @@ TEXT_DIR = ASSETS_DIR / "text"
 WARNING_DIR = ASSETS_DIR / "warnings"
 
 # Ensure all directories exist
-for dir_path in [DATA_DIR, PROCESSED_DIR, ASSETS_DIR, INDEX_DIR, CONFIG_DIR,
+for dir_path in [DATA_DIR, PROCESSED_DIR, CHUNKS_DIR, ASSETS_DIR, INDEX_DIR, CONFIG_DIR,
                 IMAGE_DIR, TABLE_DIR, TEXT_DIR, WARNING_DIR]:
     os.makedirs(dir_path, exist_ok=True)
 
@@ -29,10 +30,46 @@ for dir_path in [DATA_DIR, PROCESSED_DIR, ASSETS_DIR, INDEX_DIR, CONFIG_DIR,
 PDF_PROCESSING = {
     "dpi": 300,  # DPI for converting PDF to images
     "ocr_lang": "eng",  # Language for OCR
+    "ocr_workers": 2,  # Tesseract threads per process
+    "ocr_min_dpi": 150,  # Lowest OCR render DPI; "dpi" is the highest
+    "ocr_target_pixels": 3300,  # OCR render size in pixels along the long page edge
+    "ocr_cache": True,  # Cache OCR text on disk keyed by the rendered page
     "min_text_length": 10,  # Minimum text length to consider valid
     "table_extraction_mode": "lattice",  # Default table extraction mode (lattice or stream)
-    "image_formats": ["png", "jpg", "jpeg"],  # Supported image formats
+    "image_formats": ["png", "jpg", "jpeg"],  # Image streams stored as-is; other formats are converted to PNG
     "tesseract_path": r"C:\Program Files\Tesseract-OCR\tesseract.exe",  # Path to Tesseract executable (Windows)
+    "workers": 1,  # Worker processes for page processing (1 = serial)
+    "jobs": 1,  # Documents processed concurrently, each in its own process
+    "memory_limit_mb": None,  # Address-space cap per document process (None = unlimited)
+    "caption_max_distance": 72,  # Max gap in points between an asset and its caption
+    "table_prefilter": {
+        "enabled": False,  # Only run Camelot on likely table pages (faster, but drops stream-mode tables read from prose pages)
+        "min_ruling_lines": 6,  # Horizontal/vertical vector lines suggesting a bordered table
+        "min_aligned_rows": 3,  # Rows a text column must appear in to count as aligned
+        "min_aligned_columns": 2,  # Aligned text columns suggesting a borderless table
+        "window": 32,  # Pages pre-filtered and read by Camelot together (bounds the layouts held in memory)
+    },
+}
+
+# Asset registry settings
+ASSET_REGISTRY = {
+    "backend": "json",  # "json" (asset_registry.json per document) or "sqlite" (one indexed database)
+    "db_path": ASSETS_DIR / "asset_registry.db",  # Used by the sqlite backend
+    "indent": 2,  # JSON indentation of asset_registry.json (None = compact, faster to write)
+}
+
+# Table storage (one file per table; Markdown/CSV/HTML are rendered on request)
+TABLE_STORAGE = {
+    "format": "parquet",  # "parquet" (needs pyarrow, falls back to CSV) or "csv"
+    "compression": "zstd",  # Parquet compression codec
+    "render_cache_size": 256,  # Rendered tables kept in memory
+}
+
+# Image variants (generated on request, never during ingestion)
+IMAGE_VARIANTS = {
+    "sizes": {"thumbnail": 256, "preview": 1024},  # Longest edge in pixels per variant
+    "workers": 2,  # Background threads generating variants
+    "jpeg_quality": 85,  # Quality of JPEG variants
 }
 
 # Document structure settings
@@ -62,9 +99,26 @@ CHUNKING = {
     "chunk_size": 512,  # Target chunk size in characters
     "chunk_overlap": 50,  # Overlap between chunks in characters
     "special_break_chars": [".", "!", "?", "\n\n"],  # Characters to break chunks on
+    "boundary_pattern": None,  # Regex ending each part instead (e.g. r"[.!?](?=\s|$)|\n\n" keeps "1.5" together)
+    "size_unit": "chars",  # "chars" (chunk_size in characters) or "tokens" (chunks fill the embedding model's window)
+    "embedding_model": "all-MiniLM-L6-v2",  # Model whose tokenizer measures chunks in token mode
+    "max_tokens": None,  # Max sequence length in token mode (None reads it from the model, 256 for all-MiniLM-L6-v2)
     "preserve_warnings": True,  # Keep warnings as separate chunks
     "preserve_procedures": True,  # Keep procedures as separate chunks
     "preserve_tables": True,  # Keep tables as separate chunks
+    "table_chunk_size": 1024,  # Larger tables are split into row groups that repeat the header (characters)
+    "asset_workers": 4,  # Threads rendering a document's tables for table chunks
+    "parent_chunks": True,  # Link split sections and tables to a parent chunk returned in their place (small-to-big)
+    "parent_chunk_size": 4000,  # Largest parent text in characters (parents are not embedded)
+}
+
+# Near-duplicate chunk removal across documents (MinHash/LSH)
+CHUNK_DEDUP = {
+    "enabled": True,  # Keep one copy of chunks repeated across documents
+    "num_perm": 128,  # MinHash signature length
+    "bands": 16,  # LSH bands (num_perm / bands rows each)
+    "shingle_size": 5,  # Words per shingle
+    "threshold": 0.85,  # Minimum estimated Jaccard similarity of duplicates
 }
 
 # Vector database settings
@@ -74,6 +128,9 @@ VECTOR_DB = {
     "collection_name": "toa_maintenance_docs",  # ChromaDB collection name
     "distance_metric": "cosine",  # Distance metric for vector search
     "top_k": 5,  # Default number of results to return
+    "small_to_big": True,  # Return the parent chunk of matched chunks, once per parent
+    "child_candidates": 3,  # Chunks matched per result in small-to-big search, so shared parents still fill top_k
+    "embedding_cache": True,  # Reuse embeddings of unchanged chunk text in create_embeddings.py (index/embedding_cache)
 }
 
 # LLM settings
@@ -97,5 +154,14 @@ LOGGING = {
     "log_file": ROOT_DIR / "logs" / "toa_ai.log",
 }
 
+# Timing metrics settings
+METRICS = {
+    "enabled": True,  # Record durations of @timer functions
+    "sample_rate": 1.0,  # Fraction of calls timed (lower it for hot paths at high QPS)
+    "summary_interval": 300,  # Seconds between logged timing summaries (0 = only at exit)
+    "summary_path": None,  # JSON file the summary is written to at exit (None = only logged), e.g. ROOT_DIR / "logs" / "metrics.json"
+    "slow_call_seconds": 5.0,  # Log individual calls slower than this (None = never)
+}
+
 # Create logs directory
 os.makedirs(ROOT_DIR / "logs", exist_ok=True) 
\ No newline at end of file
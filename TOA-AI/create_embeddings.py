@@ -6,6 +6,14 @@ from tqdm import tqdm
 import logging
 import torch
 import argparse
+import sys
+from pathlib import Path
+
+# Add the project directory to the path
+sys.path.append(str(Path(__file__).parent))
+from config.config import VECTOR_DB
+from src.processors.chunk_store import read_chunk_source
+from src.utils.embedding_cache import EmbeddingCache
 
 # Set up logging
 logging.basicConfig(
@@ -16,21 +24,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def load_chunks(chunks_path):
-    """Load chunks from a JSON file"""
+    """Load chunks from the chunk shards, a single shard or a JSON file"""
     logger.info(f"Loading chunks from {chunks_path}")
     try:
-        with open(chunks_path, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
+        chunks = list(read_chunk_source(chunks_path))
         logger.info(f"Loaded {len(chunks)} chunks")
         return chunks
     except Exception as e:
         logger.error(f"Error loading chunks: {e}")
         return []
 
-def create_embeddings(chunks, model_name="all-MiniLM-L6-v2", batch_size=32):
-    """Create embeddings for the chunks using the specified model"""
-    logger.info(f"Creating embeddings using {model_name}")
-    
+def encode_texts(texts, model_name="all-MiniLM-L6-v2", batch_size=32):
+    """Encode texts with the specified model"""
     # Get device (use GPU if available)
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"Using device: {device}")
@@ -38,11 +43,8 @@ def create_embeddings(chunks, model_name="all-MiniLM-L6-v2", batch_size=32):
     # Load the model
     model = SentenceTransformer(model_name, device=device)
     
-    # Extract text from chunks
-    texts = [chunk["content"] for chunk in chunks]
-    
     # Generate embeddings
-    logger.info(f"Generating embeddings for {len(texts)} chunks")
+    logger.info(f"Generating embeddings for {len(texts)} texts")
     embeddings = []
     
     # Process in batches
@@ -52,7 +54,27 @@ def create_embeddings(chunks, model_name="all-MiniLM-L6-v2", batch_size=32):
         embeddings.extend(batch_embeddings)
     
     # Convert to a numpy array
-    embeddings = np.array(embeddings)
+    return np.array(embeddings)
+
+def create_embeddings(chunks, model_name="all-MiniLM-L6-v2", batch_size=32, use_cache=None, cache_dir=None):
+    """
+    Create embeddings for the chunks using the specified model
+    
+    With the embedding cache, only chunks whose text has not been embedded
+    by the model before are encoded (and the model is only loaded if there
+    are any).
+    """
+    logger.info(f"Creating embeddings using {model_name}")
+    
+    # Extract text from chunks
+    texts = [chunk["content"] for chunk in chunks]
+    encode_batch = lambda batch: encode_texts(batch, model_name, batch_size)
+    
+    if VECTOR_DB.get("embedding_cache", True) if use_cache is None else use_cache:
+        embeddings = EmbeddingCache(model_name, cache_dir).encode(texts, encode_batch)
+    else:
+        embeddings = encode_batch(texts)
+    
     logger.info(f"Generated embeddings with shape: {embeddings.shape}")
     
     return embeddings
@@ -78,10 +100,12 @@ def save_embeddings(embeddings, chunks, output_path):
 
 def main():
     parser = argparse.ArgumentParser(description="Generate embeddings for document chunks")
-    parser.add_argument("--chunks", default="TOA-AI/processed/all_chunks.json", help="Path to chunks file")
+    parser.add_argument("--chunks", default="TOA-AI/processed/chunks", help="Chunk shard directory, shard or JSON file")
     parser.add_argument("--output", default="TOA-AI/embeddings/embeddings.json", help="Output path for embeddings")
     parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Sentence transformer model to use")
     parser.add_argument("--batch-size", type=int, default=32, help="Batch size for embedding generation")
+    parser.add_argument("--no-cache", action="store_true", help="Encode every chunk instead of reusing cached embeddings")
+    parser.add_argument("--cache-dir", default=None, help="Embedding cache directory (defaults to index/embedding_cache)")
     
     args = parser.parse_args()
     
@@ -96,7 +120,8 @@ def main():
         return
     
     # Create embeddings
-    embeddings = create_embeddings(chunks, model_name=args.model, batch_size=args.batch_size)
+    embeddings = create_embeddings(chunks, model_name=args.model, batch_size=args.batch_size,
+                                   use_cache=False if args.no_cache else None, cache_dir=args.cache_dir)
     
     # Save embeddings
     save_embeddings(embeddings, chunks, args.output)
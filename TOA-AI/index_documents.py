@@ -12,7 +12,6 @@ import sys
 sys.path.append(str(Path(__file__).parent))
 
 # Import project components
-from config.config import PROCESSED_DIR
 from src.processors.vector_indexer import VectorIndexer
 from src.utils.logger import get_logger, timer
 
@@ -25,8 +24,9 @@ def index_chunks(chunks_path=None, reset=False):
     Index document chunks
     
     Args:
-        chunks_path (str, optional): Path to chunks file
-        reset (bool): Whether to reset the index
+        chunks_path (str, optional): Shard directory, shard or chunks JSON file (defaults to the chunk shards)
+        reset (bool): Whether to reset the index; otherwise only new
+            or changed chunks are indexed
         
     Returns:
         bool: True if indexing was successful
@@ -40,7 +40,7 @@ def index_chunks(chunks_path=None, reset=False):
         indexer.reset_index()
     
     # Index chunks
-    success = indexer.index_chunks(chunks_path=chunks_path)
+    success = indexer.index_chunks(chunks_path=chunks_path, incremental=not reset)
     
     return success
 
@@ -48,21 +48,16 @@ def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Index document chunks for retrieval")
     parser.add_argument("--chunks", type=str, default=None, 
-                        help="Path to chunks file (defaults to all_chunks.json)")
+                        help="Chunk shard directory, shard or JSON file (defaults to processed/chunks)")
     parser.add_argument("--reset", action="store_true", default=False,
                         help="Reset the index before indexing")
     
     args = parser.parse_args()
     
-    # Use default path if not specified
-    chunks_path = args.chunks
-    if not chunks_path:
-        chunks_path = PROCESSED_DIR / "all_chunks.json"
-    
     start_time = time.time()
     
     # Index chunks
-    success = index_chunks(chunks_path, args.reset)
+    success = index_chunks(args.chunks, args.reset)
     
     end_time = time.time()
     if success:
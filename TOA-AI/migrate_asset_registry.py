@@ -0,0 +1,43 @@
+"""
+TOA-AI Asset Registry Migration Script
+Copies the per-document asset_registry.json files into the SQLite registry
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+# Add the project directory to the path
+import sys
+sys.path.append(str(Path(__file__).parent))
+
+# Import project components
+from config.config import ASSETS_DIR, ASSET_REGISTRY
+from src.utils.asset_registry_db import REGISTRY_DB_PATH, migrate_json_registries
+from src.utils.logger import get_logger
+
+# Initialize logger
+logger = get_logger("MigrateAssetRegistry")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Migrate asset_registry.json files to the SQLite registry")
+    parser.add_argument("--assets-dir", type=str, default=str(ASSETS_DIR),
+                        help="Directory with one asset folder per document")
+    parser.add_argument("--db", type=str, default=str(REGISTRY_DB_PATH),
+                        help="Path to the SQLite registry")
+    
+    args = parser.parse_args()
+    
+    start_time = time.time()
+    
+    migrated = migrate_json_registries(args.assets_dir, args.db)
+    
+    logger.info(f"Migrated {sum(migrated.values())} assets of {len(migrated)} documents to {args.db} "
+                f"in {time.time() - start_time:.2f} seconds")
+    
+    if ASSET_REGISTRY.get("backend") != "sqlite":
+        logger.info('Set ASSET_REGISTRY["backend"] = "sqlite" in config/config.py to use it')
+
+if __name__ == "__main__":
+    main()
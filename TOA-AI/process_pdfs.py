@@ -7,6 +7,8 @@ import argparse
 import os
 import json
 import time
+import multiprocessing
+from multiprocessing.connection import wait
 from pathlib import Path
 from tqdm import tqdm
 
@@ -15,64 +17,231 @@ import sys
 sys.path.append(str(Path(__file__).parent))
 
 # Import project components
-from config.config import DATA_DIR, PROCESSED_DIR
+from config.config import DATA_DIR, PROCESSED_DIR, PDF_PROCESSING, CHUNK_DEDUP
 from src.processors.pdf_processor import PDFProcessor
 from src.processors.document_chunker import DocumentChunker
+from src.processors.chunk_dedup import find_duplicates
+from src.processors.chunk_store import shard_path, iter_shard, iter_chunks, write_manifest
+from src.processors.ingest_manifest import IngestManifest, hash_file
+from src.processors.page_stream import PageStreamWriter, page_stream_path, open_document
 from src.utils.logger import get_logger, timer
+from src.utils.metrics import registry as metrics_registry
 
 # Initialize logger
 logger = get_logger("ProcessPDFs")
 
 @timer
-def process_pdf(pdf_path):
+def process_pdf(pdf_path, workers=None, force=False):
     """
     Process a single PDF file
     
+    Only pages whose content hash changed since the last run are processed;
+    an unchanged PDF is not processed at all, and is only chunked again from
+    its stored pages if the chunking settings changed.
+    
     Args:
         pdf_path (str): Path to the PDF file
+        workers (int, optional): Number of worker processes for page processing
+        force (bool): Reprocess every page even if the manifest says it is unchanged
         
     Returns:
-        dict: Processed document
+        dict: Processed document, with its sections streamed from the page stream
     """
     logger.info(f"Processing PDF: {pdf_path}")
     
+    document_id = Path(pdf_path).stem
+    output_path = page_stream_path(document_id)
+    chunks_path = shard_path(document_id)
+    
+    manifest = IngestManifest(document_id)
+    pdf_hash = hash_file(pdf_path)
+    
+    # Reuse the previous output if the PDF has not changed at all
+    if not force and manifest.is_unchanged(pdf_hash) and output_path.exists():
+        document = open_document(output_path)
+        if manifest.chunks_unchanged() and chunks_path.exists():
+            logger.info(f"{pdf_path} is unchanged since the last run, reusing processed output")
+            chunks = list(iter_shard(chunks_path))
+            return document, chunks
+        
+        # The chunks are missing or were made with other chunking settings
+        logger.info(f"{pdf_path} is unchanged, chunking its stored pages again")
+        chunks = _create_chunks(document)
+        manifest.update_chunks(chunks)
+        manifest.save()
+        return document, chunks
+    
     # Initialize PDF processor
     processor = PDFProcessor(pdf_path)
     
-    # Process document
-    document = processor.process_document()
+    # Reuse results of pages whose content has not changed
+    page_hashes = processor.compute_page_hashes()
+    cached_pages = {} if force else manifest.cached_pages(page_hashes)
+    changed_pages = [page_num for page_num in range(processor.num_pages)
+                     if page_num not in cached_pages]
+    processor.asset_manager.remove_page_assets(changed_pages)
     
-    # Save processed document
-    output_path = PROCESSED_DIR / f"{document['id']}_processed.json"
-    with open(output_path, "w") as f:
-        json.dump(document, f, indent=2)
+    # Process document, writing each page out as soon as it is done
+    with PageStreamWriter(document_id, output_path) as writer:
+        processor.process_to_stream(writer, workers=workers, cached_pages=cached_pages)
     
     logger.info(f"Saved processed document to {output_path}")
     
-    # Create and save chunks
-    chunker = DocumentChunker(document)
-    chunks = chunker.create_chunks()
-    chunks_path = chunker.save_chunks()
+    document = open_document(output_path)
+    
+    chunks = _create_chunks(document)
+    
+    # Record page and chunk hashes for the next run
+    manifest.update(pdf_hash, page_hashes, chunks)
+    manifest.save()
     
     logger.info(f"Processing complete for {pdf_path}")
     
     return document, chunks
 
+def _create_chunks(document):
+    """
+    Create a document's chunks and save them to its shard
+    
+    Args:
+        document (dict): Processed document
+        
+    Returns:
+        list: Chunks of the document
+    """
+    chunker = DocumentChunker(document)
+    chunks = chunker.create_chunks()
+    chunker.save_chunks()
+    
+    return chunks
+
+def _apply_memory_limit(memory_limit_mb):
+    """
+    Cap the address space of the current process
+    
+    Args:
+        memory_limit_mb (int): Memory limit in megabytes (None for no limit)
+    """
+    if not memory_limit_mb:
+        return
+    
+    try:
+        import resource
+    except ImportError:
+        logger.warning("Per-document memory limits are not supported on this platform")
+        return
+    
+    limit = int(memory_limit_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _ingest_worker(pdf_path, workers, memory_limit_mb, force, conn):
+    """
+    Process a single PDF in a child process and send the result to the parent
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        workers (int): Number of worker processes for page processing
+        memory_limit_mb (int): Memory limit for this document in megabytes
+        force (bool): Reprocess every page even if unchanged
+        conn (multiprocessing.connection.Connection): Pipe back to the parent
+    """
+    try:
+        _apply_memory_limit(memory_limit_mb)
+        document, chunks = process_pdf(pdf_path, workers=workers, force=force)
+        metrics_registry.log_summary()
+        conn.send(("ok", document, chunks))
+    except BaseException as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}", None))
+    finally:
+        conn.close()
+
+def _run_ingest_jobs(pdf_files, jobs, workers=None, memory_limit_mb=None, force=False):
+    """
+    Process PDFs in separate child processes, several at a time
+    
+    A document that raises, runs out of memory or kills its process only
+    fails its own job; the other documents keep running.
+    
+    Args:
+        pdf_files (list): PDF files in scheduling order
+        jobs (int): Number of documents to process concurrently
+        workers (int, optional): Number of worker processes for page processing
+        memory_limit_mb (int, optional): Memory limit per document in megabytes
+        force (bool): Reprocess every page even if unchanged
+        
+    Yields:
+        dict: Result for each document as soon as it finishes
+    """
+    ctx = multiprocessing.get_context()
+    pending = list(pdf_files)
+    running = {}
+    
+    with tqdm(total=len(pending), desc="Processing PDFs") as progress:
+        while pending or running:
+            # Start new jobs while there are free slots
+            while pending and len(running) < jobs:
+                pdf_file = pending.pop(0)
+                reader, writer = ctx.Pipe(duplex=False)
+                process = ctx.Process(
+                    target=_ingest_worker,
+                    args=(str(pdf_file), workers, memory_limit_mb, force, writer),
+                    name=f"ingest-{pdf_file.stem}"
+                )
+                process.start()
+                writer.close()
+                running[reader] = (process, pdf_file, time.time())
+            
+            # A pipe becomes readable when the child sends its result or dies
+            for reader in wait(list(running)):
+                process, pdf_file, start_time = running.pop(reader)
+                try:
+                    status, payload, chunks = reader.recv()
+                except EOFError:
+                    status, payload, chunks = "failed", None, None
+                reader.close()
+                process.join()
+                
+                if status == "ok":
+                    document, error = payload, None
+                else:
+                    document = None
+                    error = payload or f"Process exited with code {process.exitcode}"
+                
+                progress.update(1)
+                yield {
+                    "pdf_file": pdf_file,
+                    "status": status,
+                    "seconds": round(time.time() - start_time, 2),
+                    "document": document,
+                    "chunks": chunks or [],
+                    "error": error
+                }
+
 @timer
-def process_directory(dir_path=DATA_DIR, file_pattern="*.pdf"):
+def process_directory(dir_path=DATA_DIR, file_pattern="*.pdf", workers=None,
+                      jobs=None, memory_limit_mb=None, force=False):
     """
     Process all PDF files in a directory
     
+    Documents run in separate processes, largest first, so a single long TO
+    does not hold up the end of the run and a crash only loses that document.
+    Each document's chunks are written by its own process as soon as it
+    finishes; a summary report is written to ingest_report.json.
+    
     Args:
         dir_path (str): Directory containing PDF files
         file_pattern (str): Pattern to match PDF files
+        workers (int, optional): Number of worker processes for page processing
+        jobs (int, optional): Number of documents to process concurrently
+        memory_limit_mb (int, optional): Memory limit per document in megabytes
+        force (bool): Reprocess every page even if unchanged
         
     Returns:
         list: List of processed documents
         list: List of all chunks
     """
     # Get all PDF files in the directory
-    pdf_files = list(Path(dir_path).glob(file_pattern))
+    pdf_files = sorted(Path(dir_path).glob(file_pattern))
     
     if not pdf_files:
         logger.warning(f"No PDF files found in {dir_path} matching pattern {file_pattern}")
@@ -80,28 +249,84 @@ def process_directory(dir_path=DATA_DIR, file_pattern="*.pdf"):
     
     logger.info(f"Found {len(pdf_files)} PDF files to process")
     
-    # Process each PDF file
-    processed_docs = []
-    all_chunks = []
+    jobs = jobs or PDF_PROCESSING.get("jobs", 1)
+    if memory_limit_mb is None:
+        memory_limit_mb = PDF_PROCESSING.get("memory_limit_mb")
+    
+    # Schedule the biggest documents first
+    schedule = sorted(pdf_files, key=lambda pdf_file: pdf_file.stat().st_size, reverse=True)
     
-    for pdf_file in tqdm(pdf_files, desc="Processing PDFs"):
-        try:
-            document, chunks = process_pdf(pdf_file)
-            processed_docs.append(document)
-            all_chunks.extend(chunks)
-        except Exception as e:
-            logger.error(f"Error processing {pdf_file}: {str(e)}")
+    results = {}
+    for result in _run_ingest_jobs(schedule, jobs, workers, memory_limit_mb, force):
+        if result["status"] == "ok":
+            logger.info(f"Finished {result['pdf_file'].name} in {result['seconds']:.2f} seconds "
+                        f"({len(result['chunks'])} chunks)")
+        else:
+            logger.error(f"Error processing {result['pdf_file']}: {result['error']}")
+        results[result["pdf_file"]] = result
     
-    # Save all chunks to a single file for easier indexing
-    all_chunks_path = PROCESSED_DIR / "all_chunks.json"
-    with open(all_chunks_path, "w") as f:
-        json.dump(all_chunks, f, indent=2)
+    # Collect results in file order so the output does not depend on scheduling
+    processed_docs = [results[pdf_file]["document"] for pdf_file in pdf_files
+                      if results[pdf_file]["status"] == "ok"]
+    
+    # Index boilerplate repeated across documents only once. The shards are
+    # streamed, so only a signature per chunk is held in memory
+    duplicates, dedup_report = {}, None
+    if CHUNK_DEDUP.get("enabled", True):
+        duplicates, dedup_report = find_duplicates(iter_chunks(deduplicate=False))
+    
+    # Record all shards and the duplicate groups in the chunk manifest
+    manifest = write_manifest(duplicates, dedup_report)
+    
+    _save_ingest_report([results[pdf_file] for pdf_file in schedule], dedup_report)
+    
+    # Chunks as they will be indexed
+    all_chunks = list(iter_chunks([document["id"] for document in processed_docs]))
     
     logger.info(f"Processed {len(processed_docs)} documents with {len(all_chunks)} total chunks")
-    logger.info(f"All chunks saved to {all_chunks_path}")
+    logger.info(f"Chunk manifest lists {len(manifest['documents'])} shards with {manifest['chunks']} chunks")
     
     return processed_docs, all_chunks
 
+def _save_ingest_report(results, dedup_report=None):
+    """
+    Save a summary of per-document processing time and failures
+    
+    Args:
+        results (list): Results yielded by _run_ingest_jobs
+        dedup_report (dict, optional): Near-duplicate removal report
+        
+    Returns:
+        Path: Path to the report file
+    """
+    report = {
+        "succeeded": sum(1 for result in results if result["status"] == "ok"),
+        "failed": sum(1 for result in results if result["status"] != "ok"),
+        "documents": [
+            {
+                "file": result["pdf_file"].name,
+                "status": result["status"],
+                "seconds": result["seconds"],
+                "chunks": len(result["chunks"]),
+                "error": result["error"]
+            }
+            for result in results
+        ],
+        "dedup": dedup_report
+    }
+    
+    report_path = PROCESSED_DIR / "ingest_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    for entry in report["documents"]:
+        logger.info(f"{entry['file']}: {entry['status']} in {entry['seconds']:.2f} seconds"
+                    + (f" ({entry['error']})" if entry["error"] else ""))
+    logger.info(f"Ingest report saved to {report_path}: "
+                f"{report['succeeded']} succeeded, {report['failed']} failed")
+    
+    return report_path
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Process Technical Order PDFs for RAG")
@@ -111,6 +336,14 @@ def main():
                         help="Pattern to match PDF files")
     parser.add_argument("--single", type=str, default=None,
                         help="Process a single PDF file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes per document for page processing (defaults to config)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Documents to process concurrently (defaults to config)")
+    parser.add_argument("--memory-limit", type=int, default=None,
+                        help="Memory limit per document in MB (defaults to config)")
+    parser.add_argument("--force", action="store_true", default=False,
+                        help="Reprocess every page, ignoring the ingest manifest")
     
     args = parser.parse_args()
     
@@ -118,10 +351,12 @@ def main():
     
     if args.single:
         # Process a single PDF file
-        process_pdf(args.single)
+        process_pdf(args.single, workers=args.workers, force=args.force)
     else:
         # Process all PDFs in the directory
-        process_directory(args.dir, args.pattern)
+        process_directory(args.dir, args.pattern, workers=args.workers,
+                          jobs=args.jobs, memory_limit_mb=args.memory_limit,
+                          force=args.force)
     
     end_time = time.time()
     logger.info(f"Total processing time: {end_time - start_time:.2f} seconds")
@@ -22,14 +22,16 @@ from src.utils.logger import get_logger
 # Initialize logger
 logger = get_logger("RunScript")
 
-def run_full_pipeline(pdf_dir=None, single_pdf=None, reset_index=True):
+def run_full_pipeline(pdf_dir=None, single_pdf=None, reset_index=False, force=False):
     """
     Run the full TOA-AI pipeline: process PDFs, index documents, start chatbot
     
     Args:
         pdf_dir (str, optional): Directory containing PDF files
         single_pdf (str, optional): Path to a single PDF file
-        reset_index (bool): Whether to reset the index
+        reset_index (bool): Whether to reset the index; otherwise only new
+            or changed chunks are indexed
+        force (bool): Reprocess every page even if unchanged
         
     Returns:
         TOAChatbot: Initialized chatbot instance
@@ -39,9 +41,9 @@ def run_full_pipeline(pdf_dir=None, single_pdf=None, reset_index=True):
     # Step 1: Process PDFs
     logger.info("Step 1: Processing PDFs")
     if single_pdf:
-        _, chunks = process_pdf(single_pdf)
+        _, chunks = process_pdf(single_pdf, force=force)
     else:
-        _, chunks = process_directory(pdf_dir or DATA_DIR)
+        _, chunks = process_directory(pdf_dir or DATA_DIR, force=force)
     
     # Step 2: Index Documents
     logger.info("Step 2: Indexing Documents")
@@ -71,6 +73,10 @@ def main():
                         help="Start interactive chat session after processing")
     parser.add_argument("--query", type=str, default=None,
                         help="Run a single query after processing")
+    parser.add_argument("--reset-index", action="store_true", default=False,
+                        help="Rebuild the index from scratch instead of updating changed chunks")
+    parser.add_argument("--force", action="store_true", default=False,
+                        help="Reprocess every page, ignoring the ingest manifest")
     
     args = parser.parse_args()
     
@@ -81,20 +87,21 @@ def main():
     
     # Full pipeline if not skipping steps
     if not args.skip_processing and not args.skip_indexing:
-        chatbot = run_full_pipeline(args.dir, args.single)
+        chatbot = run_full_pipeline(args.dir, args.single,
+                                    reset_index=args.reset_index, force=args.force)
     else:
         # Step 1: Process PDFs (if not skipped)
         if not args.skip_processing:
             logger.info("Processing PDFs")
             if args.single:
-                process_pdf(args.single)
+                process_pdf(args.single, force=args.force)
             else:
-                process_directory(args.dir or DATA_DIR)
+                process_directory(args.dir or DATA_DIR, force=args.force)
         
         # Step 2: Index Documents (if not skipped)
         if not args.skip_indexing:
             logger.info("Indexing Documents")
-            index_chunks(reset=True)
+            index_chunks(reset=args.reset_index)
         
         # Step 3: Initialize Chatbot
         logger.info("Initializing Chatbot")
@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Optional
 
 # Add parent directory to system path
 sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import VECTOR_DB
 from src.processors.vector_indexer import VectorIndexer
 from src.chatbot.llm_service import LLMService
 from src.utils.logger import get_logger, timer
@@ -102,19 +103,22 @@ class TOAChatbot:
         safety_terms = ["safety", "warning", "caution", "danger", "hazard", "precaution", 
                        "careful", "protect", "prevent", "risk", "injury", "accident"]
         
+        # Match small chunks but return their parent sections and tables
+        search = self.vector_indexer.search_parents if VECTOR_DB.get("small_to_big") else self.vector_indexer.search
+        
         filter_dict = None
         if any(term in query.lower() for term in safety_terms):
             # Try to get chunks with warnings first
             filter_dict = {"contains_warning": True}
             
-            results = self.vector_indexer.search(query, top_k=min(3, top_k), filter_dict=filter_dict)
+            results = search(query, top_k=min(3, top_k), filter_dict=filter_dict)
             
             # If no warning chunks found, fall back to regular search
             if not results or len(results["ids"][0]) == 0:
                 filter_dict = None
         
         # Perform vector search
-        results = self.vector_indexer.search(query, top_k=top_k, filter_dict=filter_dict)
+        results = search(query, top_k=top_k, filter_dict=filter_dict)
         
         if not results:
             return {"chunks": [], "success": False}
@@ -0,0 +1,241 @@
+"""
+TOA-AI Chunk Deduplication
+Groups near-duplicate chunks across documents with MinHash signatures and LSH buckets
+"""
+
+import hashlib
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+
+# Add parent directory to system path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import CHUNK_DEDUP
+from src.utils.logger import get_logger, timer
+
+logger = get_logger("ChunkDedup")
+
+# Mersenne prime for the permutation hashes, and the range they are reduced to
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+class ChunkDeduplicator:
+    """
+    Finds chunks whose text is nearly the same, e.g. the cover-page tables,
+    distribution statements and warnings repeated in every checklist
+    
+    Each chunk body (the text after its heading, which names the document
+    and page) is reduced to a MinHash signature over word shingles. The
+    signature is cut into bands; chunks sharing a band bucket are candidate
+    pairs, and a pair is a duplicate if the signatures agree on at least
+    threshold of their values (the estimated Jaccard similarity). Only
+    chunks of the same type are compared.
+    """
+    
+    def __init__(self, settings=None):
+        """
+        Initialize the deduplicator
+        
+        Args:
+            settings (dict, optional): Settings to override CHUNK_DEDUP
+        """
+        self.settings = dict(CHUNK_DEDUP, **(settings or {}))
+        self.num_perm = self.settings["num_perm"]
+        self.bands = self.settings["bands"]
+        self.rows = self.num_perm // self.bands
+        self.shingle_size = self.settings["shingle_size"]
+        self.threshold = self.settings["threshold"]
+        
+        # Fixed seed, so signatures are comparable between runs
+        generator = np.random.RandomState(self.settings.get("seed", 1))
+        self.a = generator.randint(1, (1 << 61) - 1, size=self.num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, (1 << 61) - 1, size=self.num_perm, dtype=np.uint64)
+    
+    def _shingles(self, content):
+        """Hash the word shingles of a chunk body to 32-bit values"""
+        heading_end = content.find("\n\n")
+        body = content[heading_end + 2:] if heading_end >= 0 else content
+        words = _WORD_PATTERN.findall(body.lower())
+        
+        size = self.shingle_size
+        if len(words) <= size:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[index:index + size]) for index in range(len(words) - size + 1)}
+        
+        return np.array([int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+                         for shingle in shingles], dtype=np.uint64)
+    
+    def signature(self, content):
+        """
+        Compute the MinHash signature of a chunk
+        
+        Args:
+            content (str): Chunk text
+        
+        Returns:
+            numpy.ndarray: num_perm minimum hash values
+        """
+        hashes = self._shingles(content)
+        # Overflow in a * h wraps around, which keeps the values well mixed
+        with np.errstate(over="ignore"):
+            permuted = ((np.outer(hashes, self.a) + self.b) % _PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+    
+    def _group(self, signatures, types):
+        """
+        Group near-duplicate signatures
+        
+        Args:
+            signatures (numpy.ndarray): One MinHash signature per row
+            types (list): Chunk type of each signature
+        
+        Returns:
+            list: Groups of positions (ascending), only groups with more than one member
+        """
+        buckets = defaultdict(list)
+        for position, (chunk_type, signature) in enumerate(zip(types, signatures)):
+            for band in range(self.bands):
+                band_values = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                buckets[(chunk_type, band, band_values)].append(position)
+        
+        # Union-find over candidate pairs that pass the similarity check
+        parents = list(range(len(types)))
+        
+        def find(position):
+            while parents[position] != position:
+                parents[position] = parents[parents[position]]
+                position = parents[position]
+            return position
+        
+        checked = set()
+        for positions in buckets.values():
+            for index, position in enumerate(positions):
+                for other in positions[index + 1:]:
+                    if (position, other) in checked:
+                        continue
+                    checked.add((position, other))
+                    if np.mean(signatures[position] == signatures[other]) >= self.threshold:
+                        first, second = find(position), find(other)
+                        if first != second:
+                            parents[max(first, second)] = min(first, second)
+        
+        groups = defaultdict(list)
+        for position in range(len(types)):
+            groups[find(position)].append(position)
+        
+        return [group for group in groups.values() if len(group) > 1]
+    
+    @timer
+    def find_duplicates(self, chunks):
+        """
+        Find near-duplicate chunks
+        
+        Chunks are read once and only their signature and location are
+        kept, so a stream of chunks does not have to fit in memory. The
+        first chunk of a group (in input order) is canonical; every other
+        copy is listed under it with its chunk ID, document, page and
+        section.
+        
+        Args:
+            chunks (iterable): Chunks of all documents
+        
+        Returns:
+            tuple: (dropped copies keyed by canonical chunk ID, report dict)
+        """
+        locations = []
+        types = []
+        sizes = []
+        signatures = []
+        for chunk in chunks:
+            metadata = chunk["metadata"]
+            locations.append({
+                "chunk_id": chunk["id"],
+                "document_id": metadata.get("document_id"),
+                "page": metadata.get("page", metadata.get("page_num")),
+                "section_id": metadata.get("section_id")
+            })
+            types.append(chunk.get("type"))
+            sizes.append(len(chunk["content"]))
+            signatures.append(self.signature(chunk["content"]))
+        
+        groups = self._group(np.array(signatures), types) if signatures else []
+        
+        duplicates = {}
+        removed_chars = 0
+        removed_by_document = defaultdict(int)
+        for group in groups:
+            duplicates[locations[group[0]]["chunk_id"]] = [locations[position] for position in group[1:]]
+            for position in group[1:]:
+                removed_chars += sizes[position]
+                removed_by_document[locations[position]["document_id"]] += 1
+        
+        removed = sum(len(group) - 1 for group in groups)
+        report = {
+            "chunks_before": len(locations),
+            "chunks_after": len(locations) - removed,
+            "groups": len(groups),
+            "removed": removed,
+            "removed_chars": removed_chars,
+            "removed_by_document": dict(removed_by_document),
+            "reduction": removed / len(locations) if locations else 0.0
+        }
+        
+        logger.info(f"Found {removed} near-duplicate chunks in {len(groups)} groups: "
+                    f"{report['chunks_before']} -> {report['chunks_after']} chunks "
+                    f"({report['reduction']:.1%} smaller index, {removed_chars} characters)")
+        
+        return duplicates, report
+    
+    def deduplicate(self, chunks):
+        """
+        Keep one canonical copy of each group of near-duplicate chunks
+        
+        Args:
+            chunks (list): Chunks of all documents
+        
+        Returns:
+            tuple: (deduplicated chunks, report dict)
+        """
+        duplicates, report = self.find_duplicates(chunks)
+        dropped = {duplicate["chunk_id"] for copies in duplicates.values() for duplicate in copies}
+        
+        kept = []
+        for chunk in chunks:
+            if chunk["id"] in dropped:
+                continue
+            if chunk["id"] in duplicates:
+                chunk = dict(chunk, metadata=dict(chunk["metadata"], duplicates=duplicates[chunk["id"]]))
+            kept.append(chunk)
+        
+        return kept, report
+
+def find_duplicates(chunks, settings=None):
+    """
+    Find near-duplicate chunks across documents
+    
+    Args:
+        chunks (iterable): Chunks of all documents
+        settings (dict, optional): Settings to override CHUNK_DEDUP
+    
+    Returns:
+        tuple: (dropped copies keyed by canonical chunk ID, report dict)
+    """
+    return ChunkDeduplicator(settings).find_duplicates(chunks)
+
+def deduplicate_chunks(chunks, settings=None):
+    """
+    Remove near-duplicate chunks across documents
+    
+    Args:
+        chunks (list): Chunks of all documents
+        settings (dict, optional): Settings to override CHUNK_DEDUP
+    
+    Returns:
+        tuple: (deduplicated chunks, report dict)
+    """
+    return ChunkDeduplicator(settings).deduplicate(chunks)
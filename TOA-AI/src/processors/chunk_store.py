@@ -0,0 +1,258 @@
+"""
+TOA-AI Chunk Store
+Stores each document's chunks as an NDJSON shard with a small manifest and streams them back
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+import sys
+
+# Add parent directory to system path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import CHUNKS_DIR
+from src.utils.logger import get_logger
+
+logger = get_logger("ChunkStore")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MANIFEST_NAME = "manifest.json"
+PARENTS_DIRNAME = "parents"
+
+def dumps(record):
+    """
+    Encode a record as one compact JSON line
+    
+    Uses orjson if it is installed, the standard library otherwise.
+    
+    Args:
+        record (dict): Record to encode
+    
+    Returns:
+        bytes: UTF-8 JSON followed by a newline
+    """
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+def loads(line):
+    """Decode one JSON line"""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+def shard_path(document_id, chunks_dir=None):
+    """
+    Get the path of a document's chunk shard
+    
+    Args:
+        document_id (str): Document identifier
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Returns:
+        Path: Path to the NDJSON shard
+    """
+    return Path(chunks_dir or CHUNKS_DIR) / f"{document_id}.ndjson"
+
+def write_shard(document_id, chunks, chunks_dir=None):
+    """
+    Write a document's chunks, one per line
+    
+    The shard is written to a temporary file and renamed into place, so
+    readers never see a half-written shard.
+    
+    Args:
+        document_id (str): Document identifier
+        chunks (iterable): Chunks of the document
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Returns:
+        tuple: (shard path, number of chunks written)
+    """
+    path = shard_path(document_id, chunks_dir)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    
+    count = 0
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(dumps(chunk))
+            count += 1
+    os.replace(tmp_path, path)
+    
+    return path, count
+
+def parents_dir(chunks_dir=None):
+    """
+    Get the directory of the parent chunk shards
+    
+    Args:
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Returns:
+        Path: Directory with one parent shard per document
+    """
+    return Path(chunks_dir or CHUNKS_DIR) / PARENTS_DIRNAME
+
+def iter_shard(path):
+    """
+    Read the chunks of a shard one at a time
+    
+    Args:
+        path (str): Path to the NDJSON shard
+    
+    Yields:
+        dict: Chunk
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+def shard_document_ids(chunks_dir=None):
+    """
+    Get the documents that have a chunk shard
+    
+    Args:
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Returns:
+        list: Document IDs in sorted order
+    """
+    return sorted(path.stem for path in Path(chunks_dir or CHUNKS_DIR).glob("*.ndjson"))
+
+def _count_lines(path):
+    """Count the records of a shard without decoding them"""
+    count = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            count += block.count(b"\n")
+    return count
+
+def read_manifest(chunks_dir=None):
+    """
+    Read the shard manifest
+    
+    Args:
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Returns:
+        dict: Manifest, empty if there is none
+    """
+    path = Path(chunks_dir or CHUNKS_DIR) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+def write_manifest(duplicates=None, dedup_report=None, chunks_dir=None):
+    """
+    Record the shards, their chunk and parent counts and the near-duplicate groups
+    
+    Args:
+        duplicates (dict, optional): Dropped copies keyed by canonical chunk ID
+        dedup_report (dict, optional): Near-duplicate removal report
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Returns:
+        dict: Manifest
+    """
+    chunks_dir = Path(chunks_dir or CHUNKS_DIR)
+    documents = {}
+    for document_id in shard_document_ids(chunks_dir):
+        path = shard_path(document_id, chunks_dir)
+        parents_path = shard_path(document_id, parents_dir(chunks_dir))
+        documents[document_id] = {
+            "file": path.name,
+            "chunks": _count_lines(path),
+            "parents": _count_lines(parents_path) if parents_path.exists() else 0,
+            "bytes": path.stat().st_size
+        }
+    
+    manifest = {
+        "format": "ndjson",
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "documents": documents,
+        "chunks": sum(entry["chunks"] for entry in documents.values()),
+        "duplicates": duplicates or {},
+        "dedup": dedup_report
+    }
+    
+    os.makedirs(chunks_dir, exist_ok=True)
+    tmp_path = chunks_dir / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, chunks_dir / MANIFEST_NAME)
+    
+    return manifest
+
+def iter_chunks(document_ids=None, deduplicate=True, chunks_dir=None):
+    """
+    Stream the chunks of all (or some) documents from their shards
+    
+    With deduplicate, copies the manifest lists as near-duplicates are
+    skipped and canonical chunks get their "duplicates" metadata, so the
+    result is what gets indexed.
+    
+    Args:
+        document_ids (list, optional): Documents to read (defaults to all shards)
+        deduplicate (bool): Apply the near-duplicate groups of the manifest
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Yields:
+        dict: Chunk
+    """
+    duplicates = read_manifest(chunks_dir).get("duplicates", {}) if deduplicate else {}
+    dropped = {duplicate["chunk_id"] for copies in duplicates.values() for duplicate in copies}
+    
+    for document_id in document_ids or shard_document_ids(chunks_dir):
+        for chunk in iter_shard(shard_path(document_id, chunks_dir)):
+            if chunk["id"] in dropped:
+                continue
+            if chunk["id"] in duplicates:
+                chunk["metadata"]["duplicates"] = duplicates[chunk["id"]]
+            yield chunk
+
+def iter_parents(document_ids=None, chunks_dir=None):
+    """
+    Stream the parent chunks of all (or some) documents
+    
+    Args:
+        document_ids (list, optional): Documents to read (defaults to all parent shards)
+        chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+    
+    Yields:
+        dict: Parent chunk
+    """
+    directory = parents_dir(chunks_dir)
+    for document_id in document_ids or shard_document_ids(directory):
+        path = shard_path(document_id, directory)
+        if path.exists():
+            yield from iter_shard(path)
+
+def read_chunk_source(path=None):
+    """
+    Stream chunks from a shard directory, a single shard or a JSON chunk list
+    
+    JSON lists (all_chunks.json and <document>_chunks.json from earlier
+    versions) have to be loaded whole; shards are streamed.
+    
+    Args:
+        path (str, optional): Source (defaults to the shard directory)
+    
+    Yields:
+        dict: Chunk
+    """
+    path = Path(path or CHUNKS_DIR)
+    if path.is_dir():
+        yield from iter_chunks(chunks_dir=path)
+    elif path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+    else:
+        yield from iter_shard(path)
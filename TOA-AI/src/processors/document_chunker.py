@@ -4,15 +4,20 @@ Processes extracted document content into optimized chunks for RAG
 """
 
 import re
-import json
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 import uuid
 
 # Add parent directory to system path
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from config.config import CHUNKING, PROCESSED_DIR
+from config.config import CHUNKING
 from src.utils.logger import get_logger, timer
+from src.utils.table_store import load_table
+from src.utils.token_counter import get_token_counter
+from src.processors.chunk_store import write_shard, parents_dir
 
 logger = get_logger("DocumentChunker")
 
@@ -25,6 +30,11 @@ class DocumentChunker:
         """
         Initialize the document chunker
         
+        The sections can be a list or any iterable that can be iterated more
+        than once, such as the PageStreamSections of open_document. They are
+        iterated a few times, and only a single section's content is held at
+        a time.
+        
         Args:
             document (dict): Processed document content
             chunk_settings (dict, optional): Chunk settings to override defaults
@@ -33,8 +43,23 @@ class DocumentChunker:
         self.document_id = document["id"]
         self.chunk_settings = chunk_settings or CHUNKING
         
+        # In token mode chunks are sized in the embedding model's word-pieces
+        self.token_counter = None
+        if self.chunk_settings.get("size_unit", "chars") == "tokens":
+            self.token_counter = get_token_counter(self.chunk_settings.get("embedding_model"),
+                                                   self.chunk_settings.get("max_tokens"))
+        
         # Initialize chunk storage
         self.chunks = []
+        
+        # Parent chunks, keyed by ID: returned for their (embedded) child chunks, not embedded themselves
+        self.parents = {}
+        
+        # Tables and warnings of the document, loaded on first use
+        self.assets = None
+        
+        # Sections of the document without their content, indexed on first use
+        self.sections = None
     
     @timer
     def create_chunks(self):
@@ -53,116 +78,301 @@ class DocumentChunker:
             self._create_table_chunks()
         
         # Process sections into chunks if sections exist
-        if self.document["sections"] and len(self.document["sections"]) > 0:
+        if self._section_index():
             self._create_section_chunks()
         else:
             # If no sections were found, create chunks from raw document content
             logger.info(f"No sections found in document {self.document_id}, creating chunks from raw content")
             self._create_raw_content_chunks()
         
+        if self.token_counter:
+            self._fit_chunks_to_window()
+        
         logger.info(f"Created {len(self.chunks)} chunks for document {self.document_id}")
         
         return self.chunks
     
-    def _create_raw_content_chunks(self):
-        """Create chunks from raw content when no sections are available"""
+    def _section_index(self):
+        """
+        Index the document's sections once, without their content
+        
+        Warning, table and parent chunks only need the section tree and the
+        section sizes, so the content of a streamed document is not kept.
+        
+        Returns:
+            list: Sections without "content", with the length of their chunk text as "text_length"
+        """
+        if self.sections is None:
+            self.sections = []
+            for section in self.document["sections"]:
+                entry = {key: value for key, value in section.items() if key != "content"}
+                entry["text_length"] = len(self._section_text(section))
+                self.sections.append(entry)
+        
+        return self.sections
+    
+    def _section_text(self, section):
+        """Text of a section's chunks: its heading followed by its content"""
+        return f"SECTION {section['id']} {section['title']}\n\n{section['content']}"
+    
+    def _load_assets(self):
+        """
+        Load the document's tables and warnings once, keyed by asset ID
+        
+        The registry is read a single time. Warning text comes from the
+        registry itself and is kept under "text". All tables are loaded in
+        one batch on a thread pool (reading Parquet releases the GIL) and
+        kept as compact Markdown lines under "header_lines" and "row_lines".
+        
+        Returns:
+            dict: Registry entries keyed by asset ID
+        """
+        if self.assets is not None:
+            return self.assets
+        
         from src.utils.asset_manager import AssetManager
-        asset_manager = AssetManager(self.document_id)
+        registries = AssetManager(self.document_id).get_all_assets()
+        
+        self.assets = {}
+        for warning_id, warning_info in registries["warnings"].items():
+            warning_type = warning_info.get("warning_type", "WARNING")
+            if "content" in warning_info:
+                text = f"{warning_type}: {warning_info['content']}"
+            else:
+                # Registries written before warnings kept their text
+                with open(warning_info.get("file_path") or warning_info["path"], "r", encoding="utf-8") as f:
+                    text = f.read()
+            self.assets[warning_id] = dict(warning_info, asset_type="warning", warning_type=warning_type, text=text)
+        
+        tables = registries["tables"]
+        if tables:
+            workers = min(self.chunk_settings.get("asset_workers", 4), len(tables))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                loaded = executor.map(self._load_table_lines, tables.items())
+                for (table_id, table_info), lines in zip(tables.items(), loaded):
+                    if lines is not None:
+                        header_lines, row_lines, first_row = lines
+                        self.assets[table_id] = dict(table_info, asset_type="table", header_lines=header_lines,
+                                                     row_lines=row_lines, first_row=first_row)
+        
+        logger.info(f"Loaded {len(registries['warnings'])} warnings and {len(tables)} tables "
+                    f"for document {self.document_id}")
+        
+        return self.assets
+    
+    def _load_table_lines(self, table_item):
+        """
+        Load a table as compact Markdown lines
+        
+        Cells are written without column padding, with whitespace collapsed
+        and pipes escaped. Camelot tables have positional column names
+        ("0", "1", ...) and their header is the first row.
+        
+        Args:
+            table_item (tuple): (table ID, table registry entry)
+        
+        Returns:
+            tuple: (header lines, row lines, table row of the first row line), or None if the table cannot be read
+        """
+        table_id, table_info = table_item
+        try:
+            table_df = load_table(table_info)
+        except Exception as e:
+            logger.error(f"Error loading table {table_id}: {e}")
+            return None
+        
+        def cell(value):
+            if value is None or value != value:
+                return ""
+            return " ".join(str(value).split()).replace("|", "\\|")
+        
+        rows = [[cell(value) for value in row] for row in table_df.itertuples(index=False, name=None)]
+        columns = [str(column) for column in table_df.columns]
+        
+        first_row = 0
+        if columns == [str(index) for index in range(len(columns))] and rows:
+            header, rows = rows[0], rows[1:]
+            first_row = 1
+        else:
+            header = [cell(column) for column in columns]
+        
+        header_lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+        row_lines = ["| " + " | ".join(row) + " |" for row in rows]
+        
+        return header_lines, row_lines, first_row
+    
+    def _table_row_groups(self, table, heading):
+        """
+        Split a table's rows into groups that fit the table chunk size
+        
+        Every group repeats the header, so the budget for rows is the chunk
+        size less the heading and header. In token mode the chunk size is
+        the embedding model's window, otherwise CHUNKING["table_chunk_size"]
+        characters. A single row longer than the budget gets a group of its
+        own.
         
-        # Load registries
-        asset_manager._load_registries()
+        Args:
+            table (dict): Loaded table (see _load_assets)
+            heading (str): Chunk heading placed before the table
+        
+        Returns:
+            list: (row start, row end) of each group, as table row positions (end exclusive)
+        """
+        header = "\n".join(table["header_lines"])
+        row_lines = table["row_lines"]
+        
+        # Leave room for the row range added to the heading of split tables
+        fixed_text = f"{heading} (ROWS 0000-0000 OF 0000)\n\n{header}\n"
+        if self.token_counter:
+            budget = self.token_counter.window - self.token_counter.count(fixed_text)
+            sizes = self.token_counter.count_many(row_lines)
+        else:
+            budget = self.chunk_settings.get("table_chunk_size", 1024) - len(fixed_text)
+            sizes = [len(row_line) + 1 for row_line in row_lines]
+        
+        groups = []
+        group_start = 0
+        group_size = 0
+        for index, size in enumerate(sizes):
+            if index > group_start and group_size + size > budget:
+                groups.append((group_start, index))
+                group_start, group_size = index, 0
+            group_size += size
+        if row_lines:
+            groups.append((group_start, len(row_lines)))
+        
+        first_row = table["first_row"]
+        return [(first_row + start, first_row + end) for start, end in groups] or [(first_row, first_row)]
+    
+    def _add_table_chunks(self, chunk_id, table_id, heading, metadata):
+        """
+        Add the chunks of a table, one per row group
+        
+        Args:
+            chunk_id (str): Chunk ID of the whole table
+            table_id (str): Table asset ID
+            heading (str): Chunk heading placed before the table
+            metadata (dict): Chunk metadata
+        """
+        table = self.assets[table_id]
+        first_row = table["first_row"]
+        row_count = first_row + len(table["row_lines"])
+        groups = self._table_row_groups(table, heading)
+        
+        for row_start, row_end in groups:
+            rows = table["row_lines"][row_start - first_row:row_end - first_row]
+            markdown = "\n".join(table["header_lines"] + rows)
+            
+            if len(groups) > 1:
+                group_id = f"{chunk_id}_rows_{row_start}_{row_end}"
+                group_heading = f"{heading} (ROWS {row_start + 1}-{row_end} OF {row_count})"
+            else:
+                group_id, group_heading = chunk_id, heading
+            
+            self.chunks.append({
+                "id": group_id,
+                "type": "table",
+                "content": f"{group_heading}\n\n{markdown}",
+                "metadata": dict(metadata, asset_id=table_id, row_start=row_start, row_end=row_end,
+                                 row_count=row_count)
+            })
+        
+        # The whole table is the parent of its row groups
+        if len(groups) > 1:
+            markdown = "\n".join(table["header_lines"] + table["row_lines"])
+            self._add_parent(chunk_id.replace("chunk_", "parent_", 1), f"{heading}\n\n{markdown}",
+                             dict(metadata, asset_id=table_id, row_count=row_count),
+                             self.chunks[-len(groups):])
+    
+    def _add_parent(self, parent_id, content, metadata, children):
+        """
+        Add a parent chunk and link its child chunks to it
+        
+        Parents longer than CHUNKING["parent_chunk_size"] characters are not
+        added, and their children stay on their own.
+        
+        Args:
+            parent_id (str): Parent chunk ID
+            content (str): Parent text
+            metadata (dict): Parent metadata
+            children (list): Child chunks, which get parent_id metadata
+        
+        Returns:
+            bool: Whether the parent was added
+        """
+        if not self.chunk_settings.get("parent_chunks", False):
+            return False
+        if len(content) > self.chunk_settings.get("parent_chunk_size", 4000):
+            return False
+        
+        self.parents[parent_id] = {
+            "id": parent_id,
+            "type": "parent",
+            "content": content,
+            "metadata": dict(metadata, chunk_type="parent")
+        }
+        for child in children:
+            child["metadata"]["parent_id"] = parent_id
+        
+        return True
+    
+    def _create_raw_content_chunks(self):
+        """Create chunks from raw content when no sections are available"""
+        assets = self._load_assets()
         
         # Check if registries are populated
-        if not asset_manager.table_registry and not asset_manager.warning_registry:
+        if not assets:
             logger.error(f"Could not load asset registry for document {self.document_id}")
             return
         
-        # Create chunks from tables
-        if asset_manager.table_registry:
-            for table_id, table_info in asset_manager.table_registry.items():
-                # Read table content from MD file
-                try:
-                    with open(table_info["md_path"], "r", encoding="utf-8") as f:
-                        table_content = f.read()
-                    
-                    # Create a chunk for this table
-                    chunk_id = f"chunk_{self.document_id}_table_{table_id}"
-                    
-                    chunk = {
-                        "id": chunk_id,
-                        "type": "table",
-                        "content": f"TABLE FROM DOCUMENT {self.document_id}, PAGE {table_info['page_num']+1}\n\n{table_content}",
-                        "metadata": {
-                            "document_id": self.document_id,
-                            "to_number": self.document["metadata"]["to_number"],
-                            "section_id": "unknown",
-                            "section_title": "unknown",
-                            "page_num": table_info["page_num"],
-                            "asset_id": table_id,
-                            "asset_type": "table"
-                        }
-                    }
-                    
-                    self.chunks.append(chunk)
-                    logger.info(f"Created chunk from table {table_id}")
-                except Exception as e:
-                    logger.error(f"Error creating chunk from table {table_id}: {e}")
-        
-        # Create chunks from warnings
-        if asset_manager.warning_registry:
-            for warning_id, warning_info in asset_manager.warning_registry.items():
-                try:
-                    # Check if the warning info has a file_path or path key
-                    file_path = None
-                    if "file_path" in warning_info:
-                        file_path = warning_info["file_path"]
-                    elif "path" in warning_info:
-                        file_path = warning_info["path"]
-                    else:
-                        logger.error(f"Warning {warning_id} does not have a path key")
-                        continue
-                    
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        warning_content = f.read()
-                    
-                    # Create a chunk for this warning
-                    chunk_id = f"chunk_{self.document_id}_warning_{warning_id}"
-                    
-                    # Get warning type, defaulting to "WARNING" if not found
-                    warning_type = warning_info.get("type", "WARNING")
-                    
-                    chunk = {
+        # Create chunks from tables, then from warnings
+        for asset_type in ("table", "warning"):
+            for asset_id, asset in assets.items():
+                if asset["asset_type"] != asset_type:
+                    continue
+                
+                chunk_id = f"chunk_{self.document_id}_{asset_type}_{asset_id}"
+                metadata = {
+                    "document_id": self.document_id,
+                    "to_number": self.document["metadata"]["to_number"],
+                    "section_id": "unknown",
+                    "section_title": "unknown",
+                    "page_num": asset["page_num"],
+                    "asset_id": asset_id,
+                    "asset_type": asset_type
+                }
+                
+                if asset_type == "table":
+                    heading = f"TABLE FROM DOCUMENT {self.document_id}, PAGE {asset['page_num']+1}"
+                    self._add_table_chunks(chunk_id, asset_id, heading, metadata)
+                else:
+                    metadata["warning_type"] = asset["warning_type"]
+                    self.chunks.append({
                         "id": chunk_id,
                         "type": "warning",
-                        "content": f"{warning_type} FROM DOCUMENT {self.document_id}, PAGE {warning_info['page_num']+1}\n\n{warning_content}",
-                        "metadata": {
-                            "document_id": self.document_id,
-                            "to_number": self.document["metadata"]["to_number"],
-                            "section_id": "unknown",
-                            "section_title": "unknown",
-                            "page_num": warning_info["page_num"],
-                            "asset_id": warning_id,
-                            "asset_type": "warning",
-                            "warning_type": warning_type
-                        }
-                    }
-                    
-                    self.chunks.append(chunk)
-                    logger.info(f"Created chunk from warning {warning_id}")
-                except Exception as e:
-                    logger.error(f"Error creating chunk from warning {warning_id}: {e}")
+                        "content": (f"{asset['warning_type']} FROM DOCUMENT {self.document_id}, "
+                                    f"PAGE {asset['page_num']+1}\n\n{asset['text']}"),
+                        "metadata": metadata
+                    })
+        
+        logger.info(f"Created chunks from {len(assets)} tables and warnings")
     
     def _create_warning_chunks(self):
         """Create standalone chunks for warnings"""
-        # Find all warnings in the document (from asset registry)
-        for section in self.document["sections"]:
+        assets = self._load_assets()
+        
+        for section in self._section_index():
             for warning_id in section["assets"]["warnings"]:
+                warning = assets.get(warning_id)
+                if warning is None:
+                    logger.warning(f"Warning {warning_id} of section {section['id']} is not in the asset registry")
+                    continue
+                
                 # Create a standalone chunk for each warning
                 warning_chunk = {
                     "id": f"chunk_warning_{warning_id}",
                     "type": "warning",
-                    "content": f"SECTION {section['id']} {section['title']}\n\n"
-                              f"WARNING: {self._get_warning_content(warning_id)}",
+                    "content": f"SECTION {section['id']} {section['title']}\n\n{warning['text']}",
                     "metadata": {
                         "document_id": self.document_id,
                         "to_number": self.document["metadata"]["to_number"],
@@ -170,72 +380,148 @@ class DocumentChunker:
                         "section_title": section["title"],
                         "page": section["page"],
                         "chunk_type": "warning",
-                        "contains_warning": True
+                        "contains_warning": True,
+                        "asset_id": warning_id,
+                        "warning_type": warning["warning_type"]
                     }
                 }
                 
                 self.chunks.append(warning_chunk)
     
-    def _get_warning_content(self, warning_id):
-        """Get warning content from document structure"""
-        # This is a simplified approach - in production you'd query the AssetManager
-        for section in self.document["sections"]:
-            for warning in section["assets"].get("warnings", []):
-                if warning == warning_id:
-                    # Return placeholder if we can't get actual content
-                    return "Warning content placeholder"
-        return "Warning content not found"
-    
     def _create_table_chunks(self):
         """Create standalone chunks for tables"""
-        # Find all tables in the document (from asset registry)
-        for section in self.document["sections"]:
+        assets = self._load_assets()
+        
+        for section in self._section_index():
             for table_id in section["assets"]["tables"]:
-                # Create a standalone chunk for each table
-                table_chunk = {
-                    "id": f"chunk_table_{table_id}",
-                    "type": "table",
-                    "content": f"SECTION {section['id']} {section['title']}\n\n"
-                              f"TABLE: {self._get_table_content(table_id)}",
-                    "metadata": {
-                        "document_id": self.document_id,
-                        "to_number": self.document["metadata"]["to_number"],
-                        "section_id": section["id"],
-                        "section_title": section["title"],
-                        "page": section["page"],
-                        "chunk_type": "table",
-                        "contains_table": True
-                    }
-                }
+                table = assets.get(table_id)
+                if table is None:
+                    logger.warning(f"Table {table_id} of section {section['id']} is not in the asset registry")
+                    continue
                 
-                self.chunks.append(table_chunk)
-    
-    def _get_table_content(self, table_id):
-        """Get table content from document structure"""
-        # This is a simplified approach - in production you'd query the AssetManager
-        for section in self.document["sections"]:
-            for table in section["assets"].get("tables", []):
-                if table == table_id:
-                    # Return placeholder if we can't get actual content
-                    return "Table content placeholder"
-        return "Table content not found"
+                # Create standalone chunks for each table
+                self._add_table_chunks(f"chunk_table_{table_id}", table_id,
+                                       f"SECTION {section['id']} {section['title']}\n\nTABLE", {
+                    "document_id": self.document_id,
+                    "to_number": self.document["metadata"]["to_number"],
+                    "section_id": section["id"],
+                    "section_title": section["title"],
+                    "page": section["page"],
+                    "chunk_type": "table",
+                    "contains_table": True
+                })
     
     def _create_section_chunks(self):
         """Create chunks from document sections"""
+        section_parents = self._section_parents() if self.chunk_settings.get("parent_chunks", False) else {}
+        
         for section in self.document["sections"]:
             # Skip empty sections
             if not section["content"] or len(section["content"].strip()) < 10:
                 continue
             
+            first_chunk = len(self.chunks)
+            
             # Prepare the content with section header
-            content = f"SECTION {section['id']} {section['title']}\n\n{section['content']}"
+            content = self._section_text(section)
             
             # Check if content fits in a single chunk
-            if len(content) <= self.chunk_settings["chunk_size"]:
+            if self.token_counter:
+                fits = self.token_counter.count(content) <= self.token_counter.window
+            else:
+                fits = len(content) <= self.chunk_settings["chunk_size"]
+            
+            if fits:
                 self._add_section_chunk(content, section)
             else:
                 # Split into multiple chunks
                 self._split_section_into_chunks(content, section)
+            
+            # Link the chunks to their parent, unless it is no more than the one chunk
+            children = self.chunks[first_chunk:]
+            if section["id"] in section_parents:
+                parent_section, parent_content = section_parents[section["id"]]
+                if len(children) > 1 or parent_content != children[0]["content"]:
+                    self._add_parent(f"parent_{self.document_id}_{parent_section['id'].replace('.', '_')}",
+                                     parent_content, {
+                        "document_id": self.document_id,
+                        "to_number": self.document["metadata"]["to_number"],
+                        "section_id": parent_section["id"],
+                        "section_title": parent_section["title"],
+                        "page": parent_section["page"]
+                    }, children)
+    
+    def _section_parents(self):
+        """
+        Choose the parent text of each section's chunks from the section tree
+        
+        The parent is the largest part of the tree around the section that
+        fits CHUNKING["parent_chunk_size"] characters: the subtree (the
+        section followed by its subsections) of its highest ancestor that
+        fits, else its own subtree, else the section alone. Sections longer
+        than that get no parent. Parents are chosen from the section index,
+        so only the content of sections that are part of a parent is read.
+        
+        Returns:
+            dict: (parent section, parent text) keyed by section ID
+        """
+        max_size = self.chunk_settings.get("parent_chunk_size", 4000)
+        sections = {section["id"]: section for section in self._section_index()}
+        subsections = defaultdict(list)
+        for section in self._section_index():
+            if section.get("parent_id") in sections:
+                subsections[section["parent_id"]].append(section["id"])
+        
+        subtree_lengths = {}
+        
+        def subtree_length(section_id):
+            if section_id not in subtree_lengths:
+                subtree_lengths[section_id] = sections[section_id]["text_length"] + sum(
+                    2 + subtree_length(child_id) for child_id in subsections[section_id])
+            return subtree_lengths[section_id]
+        
+        # Parent section of each section, and whether the parent includes its subsections
+        chosen = {}
+        for section_id, section in sections.items():
+            if section["text_length"] > max_size:
+                continue
+            if subtree_length(section_id) > max_size:
+                chosen[section_id] = (section_id, False)
+                continue
+            
+            parent_id = section_id
+            while (sections[parent_id].get("parent_id") in sections
+                   and subtree_length(sections[parent_id]["parent_id"]) <= max_size):
+                parent_id = sections[parent_id]["parent_id"]
+            chosen[section_id] = (parent_id, True)
+        
+        needed = set()
+        
+        def add_subtree(section_id):
+            needed.add(section_id)
+            for child_id in subsections[section_id]:
+                add_subtree(child_id)
+        
+        for parent_id, with_subsections in set(chosen.values()):
+            if with_subsections:
+                add_subtree(parent_id)
+            else:
+                needed.add(parent_id)
+        
+        texts = {}
+        if needed:
+            texts = {section["id"]: self._section_text(section) for section in self.document["sections"]
+                     if section["id"] in needed}
+        subtree_texts = {}
+        
+        def subtree_text(section_id):
+            if section_id not in subtree_texts:
+                subtree_texts[section_id] = "\n\n".join(
+                    [texts[section_id]] + [subtree_text(child_id) for child_id in subsections[section_id]])
+            return subtree_texts[section_id]
+        
+        return {section_id: (sections[parent_id], subtree_text(parent_id) if with_subsections else texts[parent_id])
+                for section_id, (parent_id, with_subsections) in chosen.items()}
     
     def _add_section_chunk(self, content, section, chunk_index=0):
         """Add a chunk for a section"""
@@ -267,86 +553,211 @@ class DocumentChunker:
         
         self.chunks.append(chunk)
     
+    def _part_boundaries(self, content):
+        """
+        Find the offsets where content is split into parts (sentences or paragraphs)
+        
+        By default a part ends at the first position where the text since the
+        previous boundary ends with one of special_break_chars. All
+        occurrences are found by one regex scan; at each start position only
+        the shortest break string can end a part first, so the alternatives
+        are ordered by length. Setting boundary_pattern instead ends a part
+        after every match of that regex.
+        
+        Args:
+            content (str): Text to split
+        
+        Returns:
+            list: End offset of every part (the last one is len(content))
+        """
+        pattern = self.chunk_settings.get("boundary_pattern")
+        if pattern:
+            ends = [match.end() for match in re.finditer(pattern, content) if match.end() > 0]
+        else:
+            split_chars = sorted(set(self.chunk_settings["special_break_chars"]), key=len)
+            scanner = re.compile("(?=(" + "|".join(re.escape(split_char) for split_char in split_chars) + "))")
+            
+            # (end, start) of every occurrence, overlapping ones included
+            occurrences = sorted((match.start() + len(match.group(1)), match.start())
+                                 for match in scanner.finditer(content))
+            
+            ends = []
+            part_start = 0
+            for occurrence_end, occurrence_start in occurrences:
+                # An occurrence only ends a part if it lies within that part
+                if occurrence_start >= part_start and occurrence_end > part_start:
+                    ends.append(occurrence_end)
+                    part_start = occurrence_end
+        
+        if not ends or ends[-1] < len(content):
+            ends.append(len(content))
+        return ends
+    
     def _split_section_into_chunks(self, content, section):
         """Split section content into multiple chunks"""
-        # Split content into sentences or paragraphs
         split_chars = self.chunk_settings["special_break_chars"]
-        parts = []
+        chunk_size = self.chunk_settings["chunk_size"]
+        chunk_overlap = self.chunk_settings["chunk_overlap"]
+        header = f"SECTION {section['id']} {section['title']}\n\n"
+        part_ends = self._part_boundaries(content)
         
-        # Start with content
-        current_part = ""
+        if self.token_counter:
+            # Measure spans by the tokens starting in them, leaving room for the header
+            token_starts = self.token_counter.token_starts(content)
+            chunk_size = self.token_counter.window - self.token_counter.count(header)
+            part_ends = self._split_long_parts(part_ends, token_starts, chunk_size)
+            size = self.token_counter.count
+            measure = lambda start, end: self.token_counter.span_count(token_starts, start, end)
+        else:
+            size = len
+            measure = lambda start, end: end - start
         
-        for char in content:
-            current_part += char
-            
-            # Check if we should split here
-            if any(current_part.endswith(split_char) for split_char in split_chars):
-                if len(current_part) > 0:
-                    parts.append(current_part)
-                    current_part = ""
-        
-        # Add the last part if it exists
-        if current_part:
-            parts.append(current_part)
-        
-        # Now combine parts into chunks
-        chunks = []
-        current_chunk = ""
+        # The current chunk is prefix + content[chunk_start:chunk_end]; the
+        # prefix only holds overlap text that did not come from content
+        prefix = ""
+        chunk_start = chunk_end = 0
         chunk_index = 0
         
-        for part in parts:
+        for part_end in part_ends:
             # If adding this part would exceed chunk size, save current chunk and start a new one
-            if len(current_chunk) + len(part) > self.chunk_settings["chunk_size"]:
-                if current_chunk:
+            if size(prefix) + measure(chunk_start, part_end) > chunk_size:
+                if prefix or chunk_end > chunk_start:
+                    current_chunk = prefix + content[chunk_start:chunk_end]
+                    
                     # Add section header to every chunk for context
                     if not current_chunk.startswith(f"SECTION {section['id']}"):
-                        current_chunk = f"SECTION {section['id']} {section['title']}\n\n{current_chunk}"
+                        current_chunk = header + current_chunk
                     
                     self._add_section_chunk(current_chunk, section, chunk_index)
                     chunk_index += 1
                     
                     # Start new chunk with overlap from previous chunk
-                    if self.chunk_settings["chunk_overlap"] > 0:
-                        # Find a good breaking point for the overlap
-                        overlap_text = current_chunk[-self.chunk_settings["chunk_overlap"]:]
-                        
-                        # Find the first sentence break in the overlap
-                        for split_char in split_chars:
-                            pos = overlap_text.find(split_char)
-                            if pos > 0:
-                                overlap_text = overlap_text[pos + len(split_char):]
-                                break
-                        
-                        current_chunk = overlap_text
+                    if chunk_overlap > 0:
+                        if chunk_overlap <= chunk_end - chunk_start:
+                            # The overlap lies within content: locate it by offsets
+                            overlap_start = chunk_end - chunk_overlap
+                            for split_char in split_chars:
+                                pos = content.find(split_char, overlap_start, chunk_end)
+                                if pos > overlap_start:
+                                    overlap_start = pos + len(split_char)
+                                    break
+                            prefix, chunk_start = "", overlap_start
+                        else:
+                            # Short chunk: the overlap reaches into the header
+                            overlap_text = current_chunk[-chunk_overlap:]
+                            for split_char in split_chars:
+                                pos = overlap_text.find(split_char)
+                                if pos > 0:
+                                    overlap_text = overlap_text[pos + len(split_char):]
+                                    break
+                            prefix, chunk_start = overlap_text, chunk_end
                     else:
-                        current_chunk = ""
+                        prefix, chunk_start = "", chunk_end
+                    
+                    # A token budget is a hard limit, so drop an overlap that does not fit
+                    if self.token_counter and size(prefix) + measure(chunk_start, part_end) > chunk_size:
+                        prefix, chunk_start = "", chunk_end
             
-            current_chunk += part
+            chunk_end = part_end
         
         # Add the last chunk if it exists
-        if current_chunk:
+        if prefix or chunk_end > chunk_start:
+            current_chunk = prefix + content[chunk_start:chunk_end]
+            
             # Add section header if needed
             if not current_chunk.startswith(f"SECTION {section['id']}"):
-                current_chunk = f"SECTION {section['id']} {section['title']}\n\n{current_chunk}"
+                current_chunk = header + current_chunk
             
             self._add_section_chunk(current_chunk, section, chunk_index)
     
-    def save_chunks(self, output_path=None):
+    def _split_long_parts(self, part_ends, token_starts, max_tokens):
         """
-        Save chunks to file
+        Cut parts longer than max_tokens at token boundaries
         
         Args:
-            output_path (str, optional): Path to save chunks
+            part_ends (list): End offset of every part
+            token_starts (list): Start offset of every token of the text
+            max_tokens (int): Maximum tokens per part
         
         Returns:
-            str: Path to saved chunks file
+            list: End offset of every part, none longer than max_tokens
         """
-        if not output_path:
-            output_path = PROCESSED_DIR / f"{self.document_id}_chunks.json"
+        max_tokens = max(max_tokens, 1)
+        fitted = []
+        part_start = 0
+        for part_end in part_ends:
+            first = bisect_left(token_starts, part_start)
+            last = bisect_left(token_starts, part_end)
+            fitted.extend(token_starts[index] for index in range(first + max_tokens, last, max_tokens))
+            fitted.append(part_end)
+            part_start = part_end
+        return fitted
+    
+    def _fit_chunks_to_window(self):
+        """
+        Split chunks that exceed the embedding model's window (token mode)
+        
+        Section chunks are already sized to the window; this catches table,
+        warning and raw-content chunks. An oversized chunk is split at line
+        breaks and each piece keeps the chunk's heading (the text before the
+        first blank line).
+        """
+        counter = self.token_counter
+        counts = counter.count_many([chunk["content"] for chunk in self.chunks])
         
-        with open(output_path, "w") as f:
-            json.dump(self.chunks, f, indent=2)
+        fitted = []
+        for chunk, count in zip(self.chunks, counts):
+            if count <= counter.window:
+                fitted.append(chunk)
+                continue
+            
+            content = chunk["content"]
+            heading_end = content.find("\n\n") + 2 if "\n\n" in content else 0
+            heading, body = content[:heading_end], content[heading_end:]
+            max_tokens = counter.window - counter.count(heading)
+            
+            token_starts = counter.token_starts(body)
+            line_ends = [match.end() for match in re.finditer("\n", body)] + [len(body)]
+            
+            pieces = []
+            piece_start = piece_end = 0
+            for line_end in self._split_long_parts(line_ends, token_starts, max_tokens):
+                if piece_end > piece_start and counter.span_count(token_starts, piece_start, line_end) > max_tokens:
+                    pieces.append(body[piece_start:piece_end])
+                    piece_start = piece_end
+                piece_end = line_end
+            if piece_end > piece_start:
+                pieces.append(body[piece_start:piece_end])
+            
+            parts = [dict(chunk, id=f"{chunk['id']}_part{index}", content=heading + piece,
+                          metadata=dict(chunk["metadata"], part_index=index, part_count=len(pieces)))
+                     for index, piece in enumerate(pieces)]
+            fitted.extend(parts)
+            
+            # The unsplit chunk is the parent of its parts, unless it already has one
+            if "parent_id" not in chunk["metadata"]:
+                self._add_parent(chunk["id"].replace("chunk_", "parent_", 1), content,
+                                 chunk["metadata"], parts)
+            
+            logger.info(f"Split {chunk['id']} ({count} tokens) into {len(pieces)} chunks")
+        
+        self.chunks = fitted
+    
+    def save_chunks(self, output_path=None):
+        """
+        Save chunks to the document's shard (one compact JSON record per line)
+        
+        Parent chunks go to a shard of their own in the parents directory.
+        
+        Args:
+            output_path (str, optional): Shard directory (defaults to CHUNKS_DIR)
+        
+        Returns:
+            Path: Path to the saved shard
+        """
+        shard, _ = write_shard(self.document_id, self.chunks, output_path)
+        write_shard(self.document_id, self.parents.values(), parents_dir(output_path))
         
-        logger.info(f"Saved {len(self.chunks)} chunks to {output_path}")
+        logger.info(f"Saved {len(self.chunks)} chunks ({len(self.parents)} parents) to {shard}")
         
-        return output_path 
\ No newline at end of file
+        return shard 
\ No newline at end of file
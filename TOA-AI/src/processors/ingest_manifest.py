@@ -0,0 +1,204 @@
+"""
+TOA-AI Ingest Manifest
+Records content hashes of ingested PDFs and the results derived from each page
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+import sys
+
+# Add parent directory to system path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import PROCESSED_DIR, PDF_PROCESSING, DOCUMENT_STRUCTURE, CHUNKING
+from src.utils.logger import get_logger
+from src.processors.page_stream import page_stream_path, iter_pages
+
+logger = get_logger("IngestManifest")
+
+MANIFEST_DIR = PROCESSED_DIR / "manifest"
+
+# Settings that change how fast a document is processed, not what comes out
+RUNTIME_SETTINGS = ["workers", "jobs", "memory_limit_mb", "ocr_workers", "ocr_cache"]
+CHUNKING_RUNTIME_SETTINGS = ["asset_workers"]
+
+def hash_file(file_path, block_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file
+    
+    Args:
+        file_path (str): Path to the file
+        block_size (int): Read size in bytes
+    
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_chunk(chunk):
+    """
+    Compute the SHA-256 digest of a chunk's content and metadata
+    
+    Args:
+        chunk (dict): Chunk
+    
+    Returns:
+        str: Hex digest
+    """
+    payload = json.dumps(chunk, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def settings_hash():
+    """
+    Hash the extraction settings, so results are not reused across
+    configuration changes
+    
+    Returns:
+        str: Hex digest
+    """
+    settings = {
+        "pdf_processing": {key: value for key, value in PDF_PROCESSING.items()
+                           if key not in RUNTIME_SETTINGS},
+        "document_structure": DOCUMENT_STRUCTURE
+    }
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def chunking_hash():
+    """
+    Hash the chunking settings, so chunks are created again when they change
+    
+    Returns:
+        str: Hex digest
+    """
+    settings = {key: value for key, value in CHUNKING.items()
+                if key not in CHUNKING_RUNTIME_SETTINGS}
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class IngestManifest:
+    """
+    Content-addressed record of one processed document
+    
+    Stores the PDF hash, one hash per page and one hash per chunk. A re-run
+    only reprocesses pages whose hash changed; the results of the other pages
+    are read back from the document's page stream. Chunks are reused only if
+    they were created with the current chunking settings.
+    """
+    
+    def __init__(self, document_id):
+        """
+        Load the manifest for a document
+        
+        Args:
+            document_id (str): Document identifier
+        """
+        self.document_id = document_id
+        self.manifest_path = MANIFEST_DIR / f"{document_id}.json"
+        self.entry = {}
+        
+        self._load()
+    
+    def _load(self):
+        """Load the manifest from disk if it exists"""
+        if not os.path.exists(self.manifest_path):
+            return
+        
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.entry = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading ingest manifest for {self.document_id}: {e}")
+            self.entry = {}
+        
+        # Results produced with other settings cannot be reused
+        if self.entry.get("settings_hash") != settings_hash():
+            if self.entry:
+                logger.info(f"Extraction settings changed since {self.document_id} was processed")
+            self.entry = {}
+    
+    def save(self):
+        """Save the manifest to disk, replacing the previous one atomically"""
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entry, f)
+        os.replace(tmp_path, self.manifest_path)
+        
+        logger.info(f"Saved ingest manifest for {self.document_id}")
+    
+    def is_unchanged(self, pdf_hash):
+        """
+        Check whether the PDF is byte-identical to the last processed version
+        
+        Args:
+            pdf_hash (str): Hash of the PDF file
+        
+        Returns:
+            bool: True if nothing needs to be reprocessed
+        """
+        return bool(self.entry) and self.entry.get("pdf_hash") == pdf_hash
+    
+    def chunks_unchanged(self):
+        """
+        Check whether the stored chunks were created with the current chunking settings
+        
+        Returns:
+            bool: True if the chunks can be reused
+        """
+        return bool(self.entry) and self.entry.get("chunking_hash") == chunking_hash()
+    
+    def cached_pages(self, page_hashes):
+        """
+        Get stored results for pages whose content hash has not changed
+        
+        Args:
+            page_hashes (list): Current hash of every page
+        
+        Returns:
+            dict: Page results keyed by page number
+        """
+        stored_hashes = self.entry.get("pages", {})
+        unchanged = {page_num for page_num, page_hash in enumerate(page_hashes)
+                     if stored_hashes.get(str(page_num)) == page_hash}
+        
+        stream_path = page_stream_path(self.document_id)
+        if not unchanged or not os.path.exists(stream_path):
+            return {}
+        
+        return {page["page_num"]: page for page in iter_pages(stream_path)
+                if page["page_num"] in unchanged}
+    
+    def update(self, pdf_hash, page_hashes, chunks):
+        """
+        Record the hashes of a processed document
+        
+        Args:
+            pdf_hash (str): Hash of the PDF file
+            page_hashes (list): Hash of every page
+            chunks (list): Chunks created from the document
+        """
+        self.entry = {
+            "document_id": self.document_id,
+            "settings_hash": settings_hash(),
+            "chunking_hash": chunking_hash(),
+            "pdf_hash": pdf_hash,
+            "pages": {str(page_num): page_hash for page_num, page_hash in enumerate(page_hashes)},
+            "chunks": {chunk["id"]: hash_chunk(chunk) for chunk in chunks}
+        }
+    
+    def update_chunks(self, chunks):
+        """
+        Record the hashes of chunks created again from unchanged pages
+        
+        Args:
+            chunks (list): Chunks created from the document
+        """
+        self.entry["chunking_hash"] = chunking_hash()
+        self.entry["chunks"] = {chunk["id"]: hash_chunk(chunk) for chunk in chunks}
@@ -0,0 +1,172 @@
+"""
+TOA-AI OCR Engine
+Runs Tesseract on rendered pages in a thread pool with a disk cache
+"""
+
+import os
+import time
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import fitz  # PyMuPDF
+from PIL import Image
+import pytesseract
+
+# Add parent directory to system path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import PROCESSED_DIR, PDF_PROCESSING
+from src.utils.logger import get_logger
+
+logger = get_logger("OCREngine")
+
+OCR_CACHE_DIR = PROCESSED_DIR / "ocr_cache"
+
+class OCREngine:
+    """
+    Parallel, cached OCR of PDF pages
+    
+    Pages are rendered in grayscale in the calling thread (PyMuPDF is not
+    thread-safe) and recognised by Tesseract in a thread pool; Tesseract runs
+    as a subprocess, so threads give real parallelism. Results are cached on
+    disk under a hash of the rendered pixels, so a page that renders the same
+    is never recognised twice.
+    """
+    
+    def __init__(self, lang=None, workers=None, use_cache=None):
+        """
+        Initialize the OCR engine
+        
+        Args:
+            lang (str, optional): Tesseract language (defaults to config)
+            workers (int, optional): Tesseract threads (defaults to config)
+            use_cache (bool, optional): Use the disk cache (defaults to config)
+        """
+        self.lang = lang or PDF_PROCESSING["ocr_lang"]
+        self.workers = workers or PDF_PROCESSING.get("ocr_workers", 1)
+        self.use_cache = PDF_PROCESSING.get("ocr_cache", True) if use_cache is None else use_cache
+        self.executor = None
+        
+        # One record per recognised page: page_num, dpi, render/ocr seconds, cached
+        self.latencies = []
+        
+        tesseract_path = PDF_PROCESSING.get("tesseract_path")
+        if tesseract_path and os.path.exists(tesseract_path):
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+    
+    def choose_dpi(self, page):
+        """
+        Choose a render resolution from the page size
+        
+        Pages are rendered so their long edge has about ocr_target_pixels
+        pixels, between ocr_min_dpi and the configured dpi. Large drawings
+        are therefore not rendered at full resolution.
+        
+        Args:
+            page (fitz.Page): Page object
+        
+        Returns:
+            int: Render DPI
+        """
+        long_edge_inches = max(page.rect.width, page.rect.height) / 72
+        if long_edge_inches <= 0:
+            return PDF_PROCESSING["dpi"]
+        
+        dpi = PDF_PROCESSING.get("ocr_target_pixels", 3300) / long_edge_inches
+        return int(min(max(dpi, PDF_PROCESSING.get("ocr_min_dpi", 150)), PDF_PROCESSING["dpi"]))
+    
+    def submit(self, page):
+        """
+        Render a page and schedule its recognition
+        
+        Args:
+            page (fitz.Page): Page object
+        
+        Returns:
+            concurrent.futures.Future: Future resolving to the page text
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        
+        start_time = time.perf_counter()
+        dpi = self.choose_dpi(page)
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        render_seconds = time.perf_counter() - start_time
+        
+        return self.executor.submit(self._recognize, page.number, dpi,
+                                    pix.width, pix.height, pix.samples, render_seconds)
+    
+    def recognize(self, page):
+        """
+        Recognise the text of a page and wait for the result
+        
+        Args:
+            page (fitz.Page): Page object
+        
+        Returns:
+            str: Extracted text
+        """
+        return self.submit(page).result()
+    
+    def _recognize(self, page_num, dpi, width, height, samples, render_seconds):
+        """Recognise rendered page pixels, using the disk cache if possible"""
+        start_time = time.perf_counter()
+        cache_path = self._cache_path(width, height, samples) if self.use_cache else None
+        
+        if cache_path is not None and cache_path.exists():
+            text = cache_path.read_text(encoding="utf-8")
+            cached = True
+        else:
+            img = Image.frombytes("L", [width, height], samples)
+            text = pytesseract.image_to_string(img, lang=self.lang)
+            cached = False
+            
+            if cache_path is not None:
+                os.makedirs(cache_path.parent, exist_ok=True)
+                tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(text, encoding="utf-8")
+                os.replace(tmp_path, cache_path)
+        
+        self.latencies.append({
+            "page_num": page_num,
+            "dpi": dpi,
+            "render_seconds": render_seconds,
+            "ocr_seconds": time.perf_counter() - start_time,
+            "cached": cached
+        })
+        
+        return text
+    
+    def _cache_path(self, width, height, samples):
+        """Cache file for a rendered page, keyed by its pixels and language"""
+        digest = hashlib.sha256()
+        digest.update(f"{width}x{height}:{self.lang}:".encode("utf-8"))
+        digest.update(samples)
+        key = digest.hexdigest()
+        return OCR_CACHE_DIR / key[:2] / f"{key}.txt"
+    
+    def log_summary(self, document_id):
+        """
+        Log OCR latency statistics
+        
+        Args:
+            document_id (str): Document identifier
+        """
+        latencies = self.latencies
+        if not latencies:
+            return
+        
+        cached = sum(1 for record in latencies if record["cached"])
+        totals = sorted(record["render_seconds"] + record["ocr_seconds"] for record in latencies)
+        recognised = [record["ocr_seconds"] for record in latencies if not record["cached"]]
+        
+        logger.info(f"OCR for {document_id}: {len(latencies)} pages, {cached} from cache, "
+                    f"page latency mean {sum(totals) / len(totals):.2f}s, "
+                    f"p95 {totals[int(0.95 * (len(totals) - 1))]:.2f}s, max {totals[-1]:.2f}s"
+                    + (f", Tesseract mean {sum(recognised) / len(recognised):.2f}s" if recognised else ""))
+    
+    def close(self):
+        """Shut down the thread pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
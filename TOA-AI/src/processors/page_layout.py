@@ -0,0 +1,156 @@
+"""
+TOA-AI Page Layout
+Extracts the text and layout of a PDF page once so every extractor can share it
+"""
+
+import fitz  # PyMuPDF
+
+class PageLayout:
+    """
+    Text lines and blocks of a single page with their bounding boxes
+    
+    Built from one get_text("dict") call. The plain text is rebuilt from the
+    same lines, so it matches page.get_text() exactly.
+    """
+    
+    def __init__(self, page):
+        """
+        Extract the layout of a page
+        
+        Args:
+            page (fitz.Page): Page object
+        """
+        self.page_num = page.number
+        self.transformation_matrix = page.transformation_matrix
+        self.ocr = False
+        
+        # (text, bbox) tuples in reading order
+        self.lines = []
+        self.blocks = []
+        
+        text_parts = []
+        page_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+        
+        for block in page_dict["blocks"]:
+            if block["type"] != 0:
+                continue
+            
+            block_lines = []
+            for line in block["lines"]:
+                line_text = "".join(span["text"] for span in line["spans"])
+                block_lines.append(line_text)
+                self.lines.append((line_text, tuple(line["bbox"])))
+                text_parts.append(line_text + "\n")
+            
+            self.blocks.append(("\n".join(block_lines), tuple(block["bbox"])))
+        
+        self.text = "".join(text_parts)
+    
+    def set_ocr_text(self, text):
+        """
+        Replace the page text with OCR output
+        
+        OCR text has no layout, so caption lookups fall back to text search.
+        
+        Args:
+            text (str): Text recognised by OCR
+        """
+        self.text = text
+        self.lines = []
+        self.blocks = []
+        self.ocr = True
+    
+    def pdf_rect_to_page(self, bbox):
+        """
+        Convert a rectangle in PDF space (origin bottom-left, e.g. from
+        Camelot) to page coordinates (origin top-left)
+        
+        Args:
+            bbox (tuple): Rectangle (x0, y0, x1, y1) in PDF space
+        
+        Returns:
+            list: Rectangle [x0, y0, x1, y1] in page coordinates
+        """
+        rect = fitz.Rect(bbox) * self.transformation_matrix
+        return [rect.x0, rect.y0, rect.x1, rect.y1]
+    
+    def count_aligned_columns(self, min_rows, tolerance=3):
+        """
+        Count text columns that line up across several multi-column rows
+        
+        Args:
+            min_rows (int): Rows a column must appear in to count
+            tolerance (float): Vertical tolerance for lines in the same row
+        
+        Returns:
+            int: Number of aligned columns
+        """
+        rows = {}
+        for line_text, bbox in self.lines:
+            if line_text.strip():
+                rows.setdefault(round(bbox[1] / tolerance), []).append(bbox[0])
+        
+        columns = {}
+        for row in rows.values():
+            if len(row) >= 2:
+                for x0 in row:
+                    column = round(x0 / 5)
+                    columns[column] = columns.get(column, 0) + 1
+        
+        return sum(1 for count in columns.values() if count >= min_rows)
+    
+    def find_caption(self, patterns, bbox=None, max_distance=None):
+        """
+        Find the caption for an asset on the page
+        
+        With an asset bounding box, the caption block closest to the asset is
+        used, so several figures on one page each get their own caption.
+        Without one (or on OCR pages), the first caption in the text is used.
+        
+        Args:
+            patterns (list): Compiled caption patterns (figure or table)
+            bbox (list, optional): Asset rectangle [x0, y0, x1, y1] in page coordinates
+            max_distance (float, optional): Maximum gap in points between asset and caption
+        
+        Returns:
+            str: Caption text or None
+        """
+        if bbox is not None and self.blocks:
+            best_caption = None
+            best_distance = None
+            
+            for block_text, block_bbox in self.blocks:
+                caption = self._match_caption(patterns, block_text)
+                if caption is None:
+                    continue
+                
+                distance = self._rect_distance(bbox, block_bbox)
+                if max_distance is not None and distance > max_distance:
+                    continue
+                
+                if best_distance is None or distance < best_distance:
+                    best_caption = caption
+                    best_distance = distance
+            
+            return best_caption
+        
+        return self._match_caption(patterns, self.text)
+    
+    def _match_caption(self, patterns, text):
+        """Return the caption from the first pattern that matches the text"""
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                if len(match.groups()) >= 2:
+                    number, caption = match.groups()[:2]
+                    return caption.strip()
+                elif len(match.groups()) == 1:
+                    return match.group(1).strip()
+        
+        return None
+    
+    def _rect_distance(self, rect_a, rect_b):
+        """Gap between two rectangles in points (0 if they overlap)"""
+        dx = max(0, rect_b[0] - rect_a[2], rect_a[0] - rect_b[2])
+        dy = max(0, rect_b[1] - rect_a[3], rect_a[1] - rect_b[3])
+        return (dx * dx + dy * dy) ** 0.5
@@ -0,0 +1,258 @@
+"""
+TOA-AI Page Stream
+Writes processed pages to NDJSON as they are produced and reads them back
+"""
+
+import os
+import json
+from pathlib import Path
+import sys
+
+# Add parent directory to system path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import PROCESSED_DIR
+from src.utils.logger import get_logger
+
+logger = get_logger("PageStream")
+
+def page_stream_path(document_id):
+    """
+    Get the path of a document's page stream
+    
+    Args:
+        document_id (str): Document identifier
+    
+    Returns:
+        Path: Path to the NDJSON file
+    """
+    return PROCESSED_DIR / f"{document_id}_pages.ndjson"
+
+class PageStreamWriter:
+    """
+    Appends page results to an NDJSON file while a document is processed
+    
+    The file holds one record per line: a "document" record with the
+    metadata, one "page" record per page, and after finalize() a "summary"
+    record with the asset counts. Pages are written to a .partial file and
+    flushed one by one, so a crash leaves every finished page readable.
+    finalize() fills in the section parents in a streaming pass and moves
+    the file into place.
+    """
+    
+    def __init__(self, document_id, output_path=None):
+        """
+        Open a page stream for writing
+        
+        Args:
+            document_id (str): Document identifier
+            output_path (str, optional): Path to the NDJSON file
+        """
+        self.document_id = document_id
+        self.output_path = Path(output_path or page_stream_path(document_id))
+        self.partial_path = self.output_path.with_name(self.output_path.name + ".partial")
+        self.pages_written = 0
+        
+        os.makedirs(self.output_path.parent, exist_ok=True)
+        self.file = open(self.partial_path, "w", encoding="utf-8")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if exc_type is not None:
+            logger.error(f"Processing of {self.document_id} failed after {self.pages_written} pages, "
+                         f"partial results kept in {self.partial_path}")
+        return False
+    
+    def _write_record(self, record):
+        """Write one record as a line and flush it"""
+        self.file.write(json.dumps(record))
+        self.file.write("\n")
+        self.file.flush()
+    
+    def write_header(self, metadata):
+        """
+        Write the document record
+        
+        Args:
+            metadata (dict): Document metadata
+        """
+        self._write_record({"document": {"id": self.document_id, "metadata": metadata}})
+    
+    def write_page(self, page_content):
+        """
+        Write one page result
+        
+        Args:
+            page_content (dict): Structured page content
+        """
+        self._write_record({"page": page_content})
+        self.pages_written += 1
+    
+    def finalize(self, section_parents, asset_counts):
+        """
+        Link sections to their parents and move the stream into place
+        
+        Args:
+            section_parents (dict): Parent section ID keyed by (page number, position of the section on the page)
+            asset_counts (dict): Number of images, tables and warnings
+        """
+        self.close()
+        
+        tmp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in iter_page_stream(self.partial_path):
+                if "page" in record:
+                    page_num = record["page"]["page_num"]
+                    for position, section in enumerate(record["page"].get("sections", [])):
+                        section["parent_id"] = section_parents.get((page_num, position))
+                f.write(json.dumps(record))
+                f.write("\n")
+            
+            f.write(json.dumps({"summary": {"pages": self.pages_written,
+                                            "asset_counts": asset_counts}}))
+            f.write("\n")
+        
+        os.replace(tmp_path, self.output_path)
+        os.remove(self.partial_path)
+        
+        logger.info(f"Saved {self.pages_written} pages of {self.document_id} to {self.output_path}")
+    
+    def close(self):
+        """Close the underlying file"""
+        if not self.file.closed:
+            self.file.close()
+
+def iter_page_stream(path):
+    """
+    Read the records of a page stream one at a time
+    
+    A truncated last line (from a crash mid-write) is skipped.
+    
+    Args:
+        path (str): Path to the NDJSON file (final or .partial)
+    
+    Yields:
+        dict: Record with a single "document", "page" or "summary" key
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping incomplete record on line {line_num} of {path}")
+
+def iter_pages(path):
+    """
+    Read the page results of a page stream one at a time
+    
+    Args:
+        path (str): Path to the NDJSON file
+    
+    Yields:
+        dict: Structured page content
+    """
+    for record in iter_page_stream(path):
+        if "page" in record:
+            yield record["page"]
+
+class PageStreamSections:
+    """
+    Sections of a page stream in page order, read from disk on each iteration
+    
+    Lets a document's sections be passed over several times without holding
+    all of them in memory.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path to the NDJSON file
+        """
+        self.path = Path(path)
+    
+    def __iter__(self):
+        for page_content in iter_pages(self.path):
+            yield from page_content.get("sections", [])
+
+def open_document(path):
+    """
+    Get a processed document whose sections are streamed from its page stream
+    
+    Only the document metadata and asset counts are read into memory. The
+    sections are read from the pages again each time they are iterated, in
+    page order rather than ordered by section ID.
+    
+    Args:
+        path (str): Path to the NDJSON file
+    
+    Returns:
+        dict: Structured document content, with a PageStreamSections as "sections"
+    """
+    document = {
+        "id": None,
+        "metadata": {},
+        "sections": PageStreamSections(path),
+        "asset_counts": None
+    }
+    
+    # Only the document and summary records are decoded
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith('{"document"'):
+                header = json.loads(line)["document"]
+                document["id"] = header["id"]
+                document["metadata"] = header["metadata"]
+            elif line.startswith('{"summary"'):
+                document["asset_counts"] = json.loads(line)["summary"]["asset_counts"]
+    
+    # A stream without a summary (one that was not finalized) is counted page by page
+    if document["asset_counts"] is None:
+        document["asset_counts"] = {"images": 0, "tables": 0, "warnings": 0}
+        for page_content in iter_pages(path):
+            for asset_type in document["asset_counts"]:
+                document["asset_counts"][asset_type] += len(page_content.get(asset_type, []))
+    
+    return document
+
+def load_document(path):
+    """
+    Build the processed document from a page stream
+    
+    The result has the same layout process_document returns: sections of
+    all pages ordered by section ID, with the document metadata and
+    asset counts.
+    
+    Args:
+        path (str): Path to the NDJSON file (final or .partial)
+    
+    Returns:
+        dict: Structured document content
+    """
+    document = {
+        "id": None,
+        "metadata": {},
+        "sections": [],
+        "asset_counts": {
+            "images": 0,
+            "tables": 0,
+            "warnings": 0
+        }
+    }
+    
+    for record in iter_page_stream(path):
+        if "document" in record:
+            document["id"] = record["document"]["id"]
+            document["metadata"] = record["document"]["metadata"]
+        elif "page" in record:
+            page_content = record["page"]
+            document["sections"].extend(page_content.get("sections", []))
+            for asset_type in ["images", "tables", "warnings"]:
+                document["asset_counts"][asset_type] += len(page_content.get(asset_type, []))
+    
+    document["sections"].sort(key=lambda s: s["id"])
+    
+    return document
@@ -7,12 +7,13 @@ import os
 import re
 import io
 import sys
+import hashlib
+from collections import deque
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
 import camelot
 import pandas as pd
-from PIL import Image
-import pytesseract
 from tqdm import tqdm
 
 # Add parent directory to system path
@@ -20,9 +21,44 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from config.config import PDF_PROCESSING, DOCUMENT_STRUCTURE
 from src.utils.logger import get_logger, timer
 from src.utils.asset_manager import AssetManager
+from src.processors.page_layout import PageLayout
+from src.processors.ocr_engine import OCREngine
 
 logger = get_logger("PDFProcessor")
 
+def _process_page_range(pdf_path, page_nums):
+    """
+    Process a range of pages in a worker process
+    
+    Each worker opens its own fitz handle and asset manager; registry writes
+    are left to the parent process, which merges the returned assets.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_nums (list): Page numbers to process (0-indexed)
+        
+    Returns:
+        tuple: (list of page results, dict of assets registered for these pages,
+                dict of table extraction counters, list of OCR latency records)
+    """
+    processor = PDFProcessor(pdf_path)
+    processor.asset_manager.auto_save = False
+    processor._schedule_ocr(page_nums)
+    
+    pages = list(processor._process_pages(page_nums))
+    processor.ocr_engine.close()
+    
+    page_set = set(page_nums)
+    assets = {}
+    asset_manager = processor.asset_manager
+    for asset_type, registry in asset_manager.get_all_assets().items():
+        assets[asset_type] = {
+            asset_id: asset for asset_id, asset in registry.items()
+            if page_set.intersection(asset_manager.get_asset_pages(asset))
+        }
+    
+    return pages, assets, processor.table_stats, processor.ocr_engine.latencies
+
 class PDFProcessor:
     """
     Processes Technical Order PDFs to extract text, tables, images with structure
@@ -49,9 +85,25 @@ class PDFProcessor:
         # Compiled regex patterns
         self._compile_patterns()
         
-        # Tesseract config
-        if hasattr(PDF_PROCESSING, "tesseract_path") and PDF_PROCESSING["tesseract_path"]:
-            pytesseract.pytesseract.tesseract_cmd = PDF_PROCESSING["tesseract_path"]
+        # Camelot results for pre-filtered pages, consumed by _extract_tables
+        self._camelot_tables = {}
+        
+        # Layouts built by the table pre-filter, consumed by _process_page
+        self._layouts = {}
+        
+        # Image xref -> stored image ID, so shared images are extracted once
+        self._image_xrefs = {}
+        self.table_stats = {
+            "pages": 0,
+            "candidate_pages": 0,
+            "camelot_calls": 0,
+            "camelot_calls_skipped": 0
+        }
+        
+        # OCR runs in a thread pool; scanned pages are submitted ahead of time
+        self.ocr_engine = OCREngine()
+        self._ocr_queue = deque()
+        self._ocr_futures = {}
         
         logger.info(f"Initialized PDF processor for {self.pdf_path.name} ({self.num_pages} pages)")
     
@@ -78,10 +130,19 @@ class PDFProcessor:
         return [rect.x0, rect.y0, rect.x1, rect.y1]
     
     @timer
-    def process_document(self):
+    def process_document(self, workers=None, cached_pages=None):
         """
         Process the entire document and return structured content
         
+        Holds every page in memory; process_to_stream() writes pages out as
+        they are produced instead.
+        
+        Args:
+            workers (int, optional): Number of worker processes for page
+                processing (defaults to PDF_PROCESSING["workers"])
+            cached_pages (dict, optional): Results of unchanged pages from a
+                previous run, keyed by page number; these pages are not processed
+        
         Returns:
             dict: Structured document content
         """
@@ -92,34 +153,231 @@ class PDFProcessor:
         document = {
             "id": self.document_id,
             "metadata": metadata,
-            "sections": [],
-            "asset_counts": {
-                "images": 0,
-                "tables": 0,
-                "warnings": 0
-            }
+            "sections": []
         }
         
-        # Process each page
-        for page_num in tqdm(range(self.num_pages), desc=f"Processing {self.document_id}"):
-            page_content = self._process_page(page_num)
-            
-            # Update document with page content
+        for page_content in self.iter_pages(workers=workers, cached_pages=cached_pages):
             document["sections"].extend(page_content.get("sections", []))
-            document["asset_counts"]["images"] += len(page_content.get("images", []))
-            document["asset_counts"]["tables"] += len(page_content.get("tables", []))
-            document["asset_counts"]["warnings"] += len(page_content.get("warnings", []))
+        
+        document["asset_counts"] = self.asset_counts
         
         # Link sections to their parent sections
         self._link_sections(document["sections"])
         
+        return document
+    
+    @timer
+    def process_to_stream(self, writer, workers=None, cached_pages=None):
+        """
+        Process the document page by page into a page stream
+        
+        Only the section IDs and levels are kept in memory; sections are
+        linked to their parents in a final pass over the stream.
+        
+        Args:
+            writer (PageStreamWriter): Page stream to write to
+            workers (int, optional): Number of worker processes for page processing
+            cached_pages (dict, optional): Results of unchanged pages from a
+                previous run, keyed by page number; these pages are not processed
+        """
+        writer.write_header(self._extract_metadata())
+        
+        for page_content in self.iter_pages(workers=workers, cached_pages=cached_pages):
+            writer.write_page(page_content)
+        
+        writer.finalize(self.link_section_parents(), self.asset_counts)
+    
+    def iter_pages(self, workers=None, cached_pages=None):
+        """
+        Yield the result of every page in page order
+        
+        Pages are processed as they are consumed. Section parents are not
+        set; link_section_parents() computes them once all pages are done.
+        
+        Args:
+            workers (int, optional): Number of worker processes for page
+                processing (defaults to PDF_PROCESSING["workers"])
+            cached_pages (dict, optional): Results of unchanged pages from a
+                previous run, keyed by page number; these pages are not processed
+        
+        Yields:
+            dict: Structured page content
+        """
+        workers = workers or PDF_PROCESSING.get("workers", 1)
+        cached_pages = cached_pages or {}
+        
+        pages_to_process = [page_num for page_num in range(self.num_pages)
+                            if page_num not in cached_pages]
+        if cached_pages:
+            logger.info(f"Reusing {self.num_pages - len(pages_to_process)} unchanged pages, "
+                        f"processing {len(pages_to_process)} pages of {self.document_id}")
+        
+        # Section IDs, levels and (page number, position on the page) for linking, and asset totals
+        self.section_index = []
+        self.asset_counts = {
+            "images": 0,
+            "tables": 0,
+            "warnings": 0
+        }
+        
+        processed_pages = self._iter_page_results(workers, pages_to_process)
+        
+        try:
+            # Registry is written once for the whole document
+            with self.asset_manager.batch():
+                for page_num in range(self.num_pages):
+                    if page_num in cached_pages:
+                        page_content = cached_pages[page_num]
+                        # Parents are linked again once all pages are done
+                        for section in page_content.get("sections", []):
+                            section["parent_id"] = None
+                    else:
+                        page_content = next(processed_pages)
+                    
+                    self.section_index.extend({"id": section["id"], "level": section["level"],
+                                               "key": (page_num, position)}
+                                              for position, section in enumerate(page_content.get("sections", [])))
+                    self.asset_counts["images"] += len(page_content.get("images", []))
+                    self.asset_counts["tables"] += len(page_content.get("tables", []))
+                    self.asset_counts["warnings"] += len(page_content.get("warnings", []))
+                    
+                    yield page_content
+        finally:
+            processed_pages.close()
+            self.ocr_engine.close()
+        
         logger.info(f"Processed document {self.document_id}: "
-                   f"{len(document['sections'])} sections, "
-                   f"{document['asset_counts']['images']} images, "
-                   f"{document['asset_counts']['tables']} tables, "
-                   f"{document['asset_counts']['warnings']} warnings")
+                   f"{len(self.section_index)} sections, "
+                   f"{self.asset_counts['images']} images, "
+                   f"{self.asset_counts['tables']} tables, "
+                   f"{self.asset_counts['warnings']} warnings")
+        logger.info(f"Table pre-filter for {self.document_id}: "
+                   f"{self.table_stats['candidate_pages']}/{self.table_stats['pages']} candidate pages, "
+                   f"{self.table_stats['camelot_calls']} Camelot calls, "
+                   f"{self.table_stats['camelot_calls_skipped']} skipped")
+        self.ocr_engine.log_summary(self.document_id)
+    
+    def link_section_parents(self):
+        """
+        Compute the parent of every section yielded by iter_pages()
         
-        return document
+        Sections are keyed by page and position rather than ID, as the same
+        section ID can occur on several pages and only some copies may
+        have a parent.
+        
+        Returns:
+            dict: Parent section ID keyed by (page number, position of the section on the page)
+        """
+        sections = [dict(section) for section in self.section_index]
+        self._link_sections(sections)
+        
+        return {section["key"]: section["parent_id"]
+                for section in sections if section.get("parent_id")}
+    
+    def _iter_page_results(self, workers, page_nums):
+        """
+        Yield page results in page order, serially or from a process pool
+        
+        Args:
+            workers (int): Number of worker processes
+            page_nums (list): Page numbers to process (0-indexed)
+            
+        Yields:
+            dict: Structured page content
+        """
+        if not page_nums:
+            return
+        
+        if workers <= 1 or len(page_nums) <= 1:
+            self._schedule_ocr(page_nums)
+            yield from tqdm(self._process_pages(page_nums), total=len(page_nums),
+                            desc=f"Processing {self.document_id}")
+            return
+        
+        page_ranges = self._split_page_ranges(workers, page_nums)
+        logger.info(f"Processing {self.document_id} with {workers} workers "
+                    f"over {len(page_ranges)} page ranges")
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_process_page_range,
+                                   [str(self.pdf_path)] * len(page_ranges),
+                                   page_ranges)
+            
+            for pages, assets, table_stats, ocr_latencies in tqdm(results, total=len(page_ranges),
+                                                                  desc=f"Processing {self.document_id}"):
+                self.asset_manager.merge_assets(assets)
+                for key, value in table_stats.items():
+                    self.table_stats[key] += value
+                self.ocr_engine.latencies.extend(ocr_latencies)
+                yield from pages
+    
+    def _process_pages(self, page_nums):
+        """
+        Process pages in order, pre-filtering and reading their tables one window at a time
+        
+        The table pre-filter keeps the layout of each page it inspects until
+        the page is processed, so windows of table_prefilter["window"] pages
+        bound the layouts and Camelot results held at once.
+        
+        Args:
+            page_nums (list): Page numbers to process (0-indexed)
+        
+        Yields:
+            dict: Structured page content
+        """
+        window = max(1, PDF_PROCESSING["table_prefilter"].get("window", 32))
+        for start in range(0, len(page_nums), window):
+            window_pages = page_nums[start:start + window]
+            self._prefetch_tables(window_pages)
+            for page_num in window_pages:
+                yield self._process_page(page_num)
+    
+    def _split_page_ranges(self, workers, page_nums):
+        """
+        Split pages into contiguous ranges for the worker pool
+        
+        Two ranges per worker keeps the pool busy when pages vary in cost.
+        
+        Args:
+            workers (int): Number of worker processes
+            page_nums (list): Page numbers to process (0-indexed)
+            
+        Returns:
+            list: List of page number lists
+        """
+        range_size = max(1, -(-len(page_nums) // (workers * 2)))
+        return [page_nums[start:start + range_size]
+                for start in range(0, len(page_nums), range_size)]
+    
+    def compute_page_hashes(self):
+        """
+        Hash the content of every page
+        
+        A page hash covers its content stream and the raw streams of the
+        images and form XObjects it draws, so it changes whenever what the
+        page shows changes, but not when objects are merely renumbered.
+        
+        Returns:
+            list: SHA-256 hex digest per page
+        """
+        page_hashes = []
+        
+        for page in self.doc:
+            digest = hashlib.sha256()
+            digest.update(repr(tuple(page.rect)).encode("utf-8"))
+            digest.update(page.read_contents())
+            
+            xrefs = [img[0] for img in page.get_images(full=True)]
+            xrefs += [xobject[0] for xobject in page.get_xobjects()]
+            for xref in xrefs:
+                try:
+                    digest.update(self.doc.xref_stream_raw(xref) or b"")
+                except Exception:
+                    digest.update(str(xref).encode("utf-8"))
+            
+            page_hashes.append(digest.hexdigest())
+        
+        return page_hashes
     
     def _extract_metadata(self):
         """
@@ -186,13 +444,15 @@ class PDFProcessor:
         """
         page = self.doc[page_num]
         
-        # Extract basic text content
-        text = page.get_text()
+        # Extract text and layout once for all extractors
+        layout = self._layouts.pop(page_num, None) or PageLayout(page)
         
         # Check if page needs OCR (insufficient text)
-        if len(text.strip()) < PDF_PROCESSING["min_text_length"]:
+        if len(layout.text.strip()) < PDF_PROCESSING["min_text_length"]:
             logger.info(f"Page {page_num+1} has insufficient text, attempting OCR")
-            text = self._apply_ocr(page)
+            layout.set_ocr_text(self._apply_ocr(page))
+        
+        text = layout.text
         
         # Extract sections from text
         sections = self._extract_sections(text, page_num)
@@ -201,10 +461,10 @@ class PDFProcessor:
         warnings = self._extract_warnings(text, page_num)
         
         # Extract tables
-        tables = self._extract_tables(page_num)
+        tables = self._extract_tables(page_num, layout)
         
         # Extract images
-        images = self._extract_images(page, page_num)
+        images = self._extract_images(page, page_num, layout)
         
         # Link sections with assets
         self._link_sections_with_assets(sections, images, tables, warnings)
@@ -339,113 +599,225 @@ class PDFProcessor:
         
         return warnings
     
+    def _find_table_pages(self, page_nums):
+        """
+        Pre-filter pages that could contain a table
+        
+        A page is a candidate if it has enough horizontal/vertical vector
+        rulings for a bordered table, or enough rows of text lines sharing
+        column positions for a borderless one.
+        
+        Args:
+            page_nums (iterable): Page numbers to check (0-indexed)
+            
+        Returns:
+            list: Candidate page numbers
+        """
+        settings = PDF_PROCESSING["table_prefilter"]
+        if not settings["enabled"]:
+            return list(page_nums)
+        
+        candidates = []
+        for page_num in page_nums:
+            page = self.doc[page_num]
+            if self._count_ruling_lines(page) >= settings["min_ruling_lines"]:
+                candidates.append(page_num)
+                continue
+            
+            # Keep the layout so _process_page does not extract the text again
+            layout = self._layouts[page_num] = PageLayout(page)
+            if layout.count_aligned_columns(settings["min_aligned_rows"]) >= settings["min_aligned_columns"]:
+                candidates.append(page_num)
+        
+        return candidates
+    
+    def _count_ruling_lines(self, page):
+        """
+        Count horizontal and vertical vector lines on a page
+        
+        Args:
+            page (fitz.Page): Page object
+            
+        Returns:
+            int: Number of ruling lines (rectangles count as four)
+        """
+        count = 0
+        for drawing in page.get_drawings():
+            for item in drawing["items"]:
+                if item[0] == "re":
+                    count += 4
+                elif item[0] == "l":
+                    start, end = item[1], item[2]
+                    if abs(start.x - end.x) < 1 or abs(start.y - end.y) < 1:
+                        count += 1
+        return count
+    
     @timer
-    def _extract_tables(self, page_num):
+    def _prefetch_tables(self, page_nums):
+        """
+        Run Camelot once over all candidate pages instead of once per page
+        
+        Lattice mode runs over every candidate page; stream mode then runs
+        over the candidates where lattice found no table, matching the
+        per-page fallback. Results are held until _extract_tables stores them.
+        
+        Args:
+            page_nums (iterable): Page numbers to cover (0-indexed)
+        """
+        page_nums = list(page_nums)
+        candidates = self._find_table_pages(page_nums)
+        calls_before = self.table_stats["camelot_calls"]
+        
+        lattice_tables = self._read_tables(candidates, "lattice")
+        lattice_pages = [
+            page_num for page_num in candidates
+            if lattice_tables.get(page_num) and lattice_tables[page_num][0].shape[0] > 0
+        ]
+        stream_pages = [page_num for page_num in candidates if page_num not in lattice_pages]
+        stream_tables = self._read_tables(stream_pages, "stream")
+        
+        for page_num in page_nums:
+            if page_num in lattice_pages:
+                self._camelot_tables[page_num] = ("lattice", lattice_tables[page_num])
+            elif page_num in stream_tables:
+                self._camelot_tables[page_num] = ("stream", stream_tables[page_num])
+            else:
+                self._camelot_tables[page_num] = (None, [])
+        
+        # Per-page extraction ran lattice on every page and stream on every
+        # page without a lattice table
+        per_page_calls = 2 * len(page_nums) - len(lattice_pages)
+        calls = self.table_stats["camelot_calls"] - calls_before
+        
+        self.table_stats["pages"] += len(page_nums)
+        self.table_stats["candidate_pages"] += len(candidates)
+        self.table_stats["camelot_calls_skipped"] += max(0, per_page_calls - calls)
+    
+    def _read_tables(self, page_nums, flavor):
+        """
+        Read tables from several pages with a single Camelot call
+        
+        Falls back to one call per page if the batched call fails, so a
+        single bad page does not cost the tables of the others.
+        
+        Args:
+            page_nums (list): Page numbers to read (0-indexed)
+            flavor (str): Camelot flavor (lattice or stream)
+            
+        Returns:
+            dict: Tables grouped by page number, in Camelot order
+        """
+        if not page_nums:
+            return {}
+        
+        try:
+            self.table_stats["camelot_calls"] += 1
+            table_list = camelot.read_pdf(
+                str(self.pdf_path),
+                pages=self._page_range_string(page_nums),
+                flavor=flavor
+            )
+        except Exception as e:
+            if len(page_nums) == 1:
+                logger.error(f"Error extracting tables from page {page_nums[0]+1}: {str(e)}")
+                return {}
+            
+            logger.warning(f"Batched {flavor} table extraction failed, retrying per page: {str(e)}")
+            tables = {}
+            for page_num in page_nums:
+                tables.update(self._read_tables([page_num], flavor))
+            return tables
+        
+        tables = {}
+        for table in table_list:
+            tables.setdefault(int(table.page) - 1, []).append(table)
+        
+        return tables
+    
+    def _page_range_string(self, page_nums):
+        """
+        Build a Camelot page string such as "1-3,7,9-10"
+        
+        Args:
+            page_nums (list): Page numbers (0-indexed)
+            
+        Returns:
+            str: Page range string (1-indexed)
+        """
+        ranges = []
+        for page_num in sorted(page_nums):
+            if ranges and page_num == ranges[-1][1] + 1:
+                ranges[-1][1] = page_num
+            else:
+                ranges.append([page_num, page_num])
+        
+        return ",".join(
+            str(start + 1) if start == end else f"{start + 1}-{end + 1}"
+            for start, end in ranges
+        )
+    
+    @timer
+    def _extract_tables(self, page_num, layout):
         """
         Extract tables from the page
         
         Args:
             page_num (int): Page number
+            layout (PageLayout): Text and layout of the page
             
         Returns:
             list: Extracted tables
         """
         tables = []
         
-        # Try to extract tables with Camelot
-        try:
-            # First try lattice mode (for bordered tables)
-            lattice_tables = camelot.read_pdf(
-                str(self.pdf_path), 
-                pages=str(page_num + 1), 
-                flavor='lattice'
-            )
-            
-            # If lattice mode found tables, use those
-            if len(lattice_tables) > 0 and lattice_tables[0].shape[0] > 0:
-                logger.info(f"Found {len(lattice_tables)} table(s) with lattice mode on page {page_num+1}")
+        if page_num not in self._camelot_tables:
+            self._prefetch_tables([page_num])
+        
+        flavor, page_tables = self._camelot_tables.pop(page_num)
+        if flavor:
+            logger.info(f"Found {len(page_tables)} table(s) with {flavor} mode on page {page_num+1}")
+        
+        for i, table in enumerate(page_tables):
+            if table.shape[0] > 0:  # Only process non-empty tables
+                # Look for the caption closest to the table
+                rect = None
+                if getattr(table, "_bbox", None):
+                    rect = layout.pdf_rect_to_page(table._bbox)
+                caption = self._find_table_caption(layout, rect)
                 
-                for i, table in enumerate(lattice_tables):
-                    if table.shape[0] > 0:  # Only process non-empty tables
-                        # Look for table caption
-                        caption = self._find_table_caption(page_num)
-                        
-                        # Store table in asset manager
-                        table_id = self.asset_manager.store_table(
-                            table.df, 
-                            page_num,
-                            caption=caption,
-                            table_num=f"Table {i+1}"
-                        )
-                        
-                        if table_id:
-                            tables.append({
-                                "id": table_id,
-                                "page": page_num + 1,
-                                "caption": caption,
-                                "rows": table.shape[0],
-                                "columns": table.shape[1]
-                            })
-            else:
-                # If lattice mode failed, try stream mode (for borderless tables)
-                stream_tables = camelot.read_pdf(
-                    str(self.pdf_path), 
-                    pages=str(page_num + 1), 
-                    flavor='stream'
+                # Store table in asset manager
+                table_id = self.asset_manager.store_table(
+                    table.df, 
+                    page_num,
+                    caption=caption,
+                    table_num=f"Table {i+1}"
                 )
                 
-                logger.info(f"Found {len(stream_tables)} table(s) with stream mode on page {page_num+1}")
-                
-                for i, table in enumerate(stream_tables):
-                    if table.shape[0] > 0:  # Only process non-empty tables
-                        # Look for table caption
-                        caption = self._find_table_caption(page_num)
-                        
-                        # Store table in asset manager
-                        table_id = self.asset_manager.store_table(
-                            table.df, 
-                            page_num,
-                            caption=caption,
-                            table_num=f"Table {i+1}"
-                        )
-                        
-                        if table_id:
-                            tables.append({
-                                "id": table_id,
-                                "page": page_num + 1,
-                                "caption": caption,
-                                "rows": table.shape[0],
-                                "columns": table.shape[1]
-                            })
-                            
-        except Exception as e:
-            logger.error(f"Error extracting tables from page {page_num+1}: {str(e)}")
+                if table_id:
+                    tables.append({
+                        "id": table_id,
+                        "page": page_num + 1,
+                        "caption": caption,
+                        "rows": table.shape[0],
+                        "columns": table.shape[1]
+                    })
         
         return tables
     
-    def _find_table_caption(self, page_num):
-        """Find table caption on the page"""
-        text = self.doc[page_num].get_text()
-        
-        for pattern in self.table_patterns:
-            match = pattern.search(text)
-            if match:
-                if len(match.groups()) >= 2:
-                    table_num, caption = match.groups()
-                    return caption.strip()
-                elif len(match.groups()) == 1:
-                    return match.group(1).strip()
-        
-        return None
+    def _find_table_caption(self, layout, rect=None):
+        """Find the caption of a table on the page"""
+        return layout.find_caption(self.table_patterns, rect,
+                                   PDF_PROCESSING["caption_max_distance"])
     
     @timer
-    def _extract_images(self, page, page_num):
+    def _extract_images(self, page, page_num, layout):
         """
         Extract images from the page
         
         Args:
             page (fitz.Page): Page object
             page_num (int): Page number
+            layout (PageLayout): Text and layout of the page
             
         Returns:
             list: Extracted images
@@ -459,13 +831,6 @@ class PDFProcessor:
             xref = img[0]
             
             try:
-                # Extract image
-                base_image = self.doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                
-                # Try to find caption
-                caption = self._find_image_caption(page_num)
-                
                 # Extract image rectangle
                 rect = None
                 for img_rect in page.get_image_rects(xref):
@@ -473,13 +838,31 @@ class PDFProcessor:
                     rect = self._rect_to_list(img_rect)
                     break
                 
-                # Store image in asset manager
-                image_id = self.asset_manager.store_image(
-                    image_bytes,
-                    page_num,
-                    caption=caption,
-                    source_rect=rect
-                )
+                # Try to find the caption closest to the image
+                caption = self._find_image_caption(layout, rect)
+                
+                if xref in self._image_xrefs:
+                    # Already stored from an earlier page, only reference it
+                    image_id = self.asset_manager.reference_image(
+                        self._image_xrefs[xref],
+                        page_num,
+                        caption=caption,
+                        source_rect=rect
+                    )
+                else:
+                    # Extract image
+                    base_image = self.doc.extract_image(xref)
+                    
+                    # Store image in asset manager (deduplicated by content hash)
+                    image_id = self.asset_manager.store_image(
+                        base_image["image"],
+                        page_num,
+                        caption=caption,
+                        source_rect=rect,
+                        ext=base_image.get("ext")
+                    )
+                    if image_id:
+                        self._image_xrefs[xref] = image_id
                 
                 if image_id:
                     images.append({
@@ -493,21 +876,35 @@ class PDFProcessor:
         
         return images
     
-    def _find_image_caption(self, page_num):
-        """Find image caption on the page"""
-        text = self.doc[page_num].get_text()
+    def _find_image_caption(self, layout, rect=None):
+        """Find the caption of an image on the page"""
+        return layout.find_caption(self.figure_patterns, rect,
+                                   PDF_PROCESSING["caption_max_distance"])
+        
+    def _schedule_ocr(self, page_nums):
+        """
+        Queue pages without any fonts for OCR ahead of processing
         
-        for pattern in self.figure_patterns:
-            match = pattern.search(text)
-            if match:
-                if len(match.groups()) >= 2:
-                    figure_num, caption = match.groups()
-                    return caption.strip()
-                elif len(match.groups()) == 1:
-                    return match.group(1).strip()
+        Such pages have no text layer, so they are known to need OCR before
+        _process_page reaches them. Pages with a few characters of text are
+        still recognised on demand.
         
-        return None
+        Args:
+            page_nums (list): Page numbers to process (0-indexed)
+        """
+        self._ocr_queue = deque(page_num for page_num in page_nums
+                                if not self.doc[page_num].get_fonts())
         
+        if self._ocr_queue:
+            logger.info(f"{len(self._ocr_queue)} pages of {self.document_id} have no text layer, queued for OCR")
+    
+    def _submit_ocr_ahead(self):
+        """Keep the OCR pool busy with queued pages, without rendering too far ahead"""
+        window = 2 * self.ocr_engine.workers
+        while self._ocr_queue and len(self._ocr_futures) < window:
+            page_num = self._ocr_queue.popleft()
+            self._ocr_futures[page_num] = self.ocr_engine.submit(self.doc[page_num])
+    
     def _apply_ocr(self, page):
         """
         Apply OCR to a page for text extraction
@@ -518,17 +915,13 @@ class PDFProcessor:
         Returns:
             str: Extracted text
         """
-        # Convert page to image
-        pix = page.get_pixmap(dpi=PDF_PROCESSING["dpi"])
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        self._submit_ocr_ahead()
         
-        # Apply OCR
-        text = pytesseract.image_to_string(
-            img, 
-            lang=PDF_PROCESSING["ocr_lang"]
-        )
+        future = self._ocr_futures.pop(page.number, None)
+        if future is None:
+            future = self.ocr_engine.submit(page)
         
-        return text
+        return future.result()
     
     def _link_sections_with_assets(self, sections, images, tables, warnings):
         """
@@ -548,10 +941,12 @@ class PDFProcessor:
             for image in images:
                 if image["page"] - 1 == section_page:
                     section["assets"]["images"].append(image["id"])
+                    self.asset_manager.link_section("images", image["id"], section["id"], section_page)
             
             for table in tables:
                 if table["page"] - 1 == section_page:
                     section["assets"]["tables"].append(table["id"])
+                    self.asset_manager.link_section("tables", table["id"], section["id"], section_page)
             
             for warning in warnings:
                 if warning["page"] - 1 == section_page:
@@ -559,11 +954,8 @@ class PDFProcessor:
                     if warning["content"] in section["content"]:
                         section["assets"]["warnings"].append(warning["id"])
                         
-                        # Also update the warning with its section ID
-                        warning_obj = self.asset_manager.get_warning(warning["id"])
-                        if warning_obj:
-                            warning_obj["section_id"] = section["id"]
-                            # Note: We'd need to save the registry if we want this to persist
+                        # Also record the section in the registry (saved with the page's assets)
+                        self.asset_manager.link_section("warnings", warning["id"], section["id"], section_page)
     
     def _link_sections(self, sections):
         """
@@ -12,11 +12,19 @@ import numpy as np
 
 # Add parent directory to system path
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from config.config import VECTOR_DB, INDEX_DIR, PROCESSED_DIR
+from config.config import VECTOR_DB, INDEX_DIR, CHUNKS_DIR
 from src.utils.logger import get_logger, timer
+from src.processors.ingest_manifest import hash_chunk
+from src.processors.chunk_store import read_chunk_source, iter_parents
 
 logger = get_logger("VectorIndexer")
 
+# Document and content hash of every chunk currently in the collection
+INDEX_STATE_PATH = INDEX_DIR / "indexed_chunks.json"
+
+# Parent chunks (not embedded) that search_parents returns for matched chunks
+PARENT_STORE_PATH = INDEX_DIR / "parent_chunks.json"
+
 class VectorIndexer:
     """
     Indexes document chunks for vector search
@@ -34,6 +42,9 @@ class VectorIndexer:
         self.embedding_model = None
         self.chroma_client = None
         self.collection = None
+        
+        # Parent chunks keyed by ID, loaded on first small-to-big search
+        self.parents = None
     
     @timer
     def initialize_models(self):
@@ -68,13 +79,20 @@ class VectorIndexer:
             return False
     
     @timer
-    def index_chunks(self, chunks=None, chunks_path=None):
+    def index_chunks(self, chunks=None, chunks_path=None, incremental=False):
         """
         Index document chunks
         
+        Unless chunks are given, they are streamed from the chunk shards (or
+        chunks_path) twice: once to hash them and once to embed the ones
+        that need indexing, batch by batch. Memory use does not grow with
+        the size of the corpus beyond one hash per chunk.
+        
         Args:
             chunks (list, optional): List of chunks to index
-            chunks_path (str, optional): Path to chunks JSON file
+            chunks_path (str, optional): Shard directory, shard or chunks JSON file
+            incremental (bool): Only embed new or changed chunks and delete
+                chunks that no longer exist, instead of adding everything
             
         Returns:
             bool: True if indexing was successful
@@ -84,75 +102,197 @@ class VectorIndexer:
             if not success:
                 return False
         
-        # Load chunks if not provided
-        if not chunks and chunks_path:
-            try:
-                with open(chunks_path, "r") as f:
-                    chunks = json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading chunks from {chunks_path}: {str(e)}")
-                return False
-        elif not chunks:
-            # Try to load all chunks from default location
-            all_chunks_path = PROCESSED_DIR / "all_chunks.json"
-            try:
-                with open(all_chunks_path, "r") as f:
-                    chunks = json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading chunks from {all_chunks_path}: {str(e)}")
-                return False
+        if chunks:
+            read_chunks = lambda: iter(chunks)
+        else:
+            read_chunks = lambda: read_chunk_source(chunks_path)
+        
+        try:
+            chunk_hashes = {
+                chunk["id"]: {"document_id": chunk["metadata"].get("document_id"),
+                              "hash": hash_chunk(chunk)}
+                for chunk in read_chunks()
+            }
+        except Exception as e:
+            logger.error(f"Error loading chunks from {chunks_path or CHUNKS_DIR}: {str(e)}")
+            return False
         
-        if not chunks:
+        if not chunk_hashes:
             logger.error("No chunks to index")
             return False
         
-        logger.info(f"Indexing {len(chunks)} chunks")
+        # Parent chunks are stored beside the collection rather than embedded
+        document_ids = {entry["document_id"] for entry in chunk_hashes.values()}
+        parents_source = chunks_path if chunks_path and Path(chunks_path).is_dir() else None
+        self._update_parent_store(document_ids, parents_source)
         
-        # Prepare batch data
-        chunk_ids = []
-        chunk_texts = []
-        chunk_metadatas = []
+        indexed_hashes = self._load_index_state()
+        to_index = set(chunk_hashes)
         
-        for chunk in chunks:
-            chunk_ids.append(chunk["id"])
-            chunk_texts.append(chunk["content"])
+        if incremental:
+            # Chunks of the given documents that were not produced again are stale;
+            # other documents in the collection are left alone
+            stale_ids = [chunk_id for chunk_id, entry in indexed_hashes.items()
+                         if entry["document_id"] in document_ids and chunk_id not in chunk_hashes]
+            if stale_ids:
+                logger.info(f"Deleting {len(stale_ids)} stale chunks")
+                for i in range(0, len(stale_ids), 1000):
+                    self.collection.delete(ids=stale_ids[i:i+1000])
+                
+                for chunk_id in stale_ids:
+                    del indexed_hashes[chunk_id]
             
+            to_index = {chunk_id for chunk_id, entry in chunk_hashes.items()
+                        if indexed_hashes.get(chunk_id) != entry}
+            logger.info(f"{len(chunk_hashes) - len(to_index)} chunks unchanged since last indexing")
+        
+        indexed_hashes.update(chunk_hashes)
+        
+        if not to_index:
+            self._save_index_state(indexed_hashes)
+            logger.info(f"Index is up to date. Collection has {self.collection.count()} documents")
+            return True
+        
+        logger.info(f"Indexing {len(to_index)} chunks")
+        
+        # Embed and write in batches; upsert replaces changed chunks in place
+        batch_size = 32
+        write_batch = self.collection.upsert if incremental else self.collection.add
+        batch = []
+        with tqdm(total=len(to_index), desc="Indexing chunks") as progress:
+            for chunk in read_chunks():
+                if chunk["id"] not in to_index:
+                    continue
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    self._index_batch(batch, write_batch)
+                    progress.update(len(batch))
+                    batch = []
+            if batch:
+                self._index_batch(batch, write_batch)
+                progress.update(len(batch))
+        
+        self._save_index_state(indexed_hashes)
+        
+        # Get collection stats
+        collection_count = self.collection.count()
+        logger.info(f"Indexing complete. Collection now has {collection_count} documents")
+        
+        return True
+    
+    def _index_batch(self, chunks, write_batch):
+        """
+        Embed a batch of chunks and write it to the collection
+        
+        Args:
+            chunks (list): Chunks to index
+            write_batch (callable): Collection add or upsert
+        """
+        chunk_metadatas = []
+        for chunk in chunks:
             # Convert asset lists to comma-separated strings for ChromaDB
             metadata = chunk["metadata"].copy()
             for asset_type in ["images", "tables", "warnings"]:
                 if asset_type in metadata and isinstance(metadata[asset_type], list):
                     metadata[asset_type] = ",".join(metadata[asset_type])
             
+            # ChromaDB only stores scalars, so keep the other locations of deduplicated chunks as JSON
+            if "duplicates" in metadata:
+                metadata["duplicates"] = json.dumps(metadata["duplicates"])
+            
             chunk_metadatas.append(metadata)
         
-        # Generate embeddings
-        logger.info("Generating embeddings")
-        embeddings = []
+        chunk_texts = [chunk["content"] for chunk in chunks]
+        embeddings = self.embedding_model.encode(chunk_texts)
         
-        # Process in batches to avoid memory issues
-        batch_size = 32
-        for i in tqdm(range(0, len(chunk_texts), batch_size), desc="Generating embeddings"):
-            batch_texts = chunk_texts[i:i+batch_size]
-            batch_embeddings = self.embedding_model.encode(batch_texts)
-            embeddings.extend(batch_embeddings.tolist())
-        
-        # Add to collection
-        logger.info("Adding to vector database")
-        
-        # Process in batches
-        for i in tqdm(range(0, len(chunk_ids), batch_size), desc="Adding to database"):
-            self.collection.add(
-                ids=chunk_ids[i:i+batch_size],
-                embeddings=embeddings[i:i+batch_size],
-                documents=chunk_texts[i:i+batch_size],
-                metadatas=chunk_metadatas[i:i+batch_size]
-            )
+        write_batch(
+            ids=[chunk["id"] for chunk in chunks],
+            embeddings=embeddings.tolist(),
+            documents=chunk_texts,
+            metadatas=chunk_metadatas
+        )
+    
+    def _load_index_state(self):
+        """
+        Load the document and content hash of indexed chunks
         
-        # Get collection stats
-        collection_count = self.collection.count()
-        logger.info(f"Indexing complete. Collection now has {collection_count} documents")
+        Returns:
+            dict: Entries keyed by chunk ID
+        """
+        if not os.path.exists(INDEX_STATE_PATH):
+            return {}
         
-        return True
+        try:
+            with open(INDEX_STATE_PATH, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading index state: {str(e)}")
+            return {}
+    
+    def _save_index_state(self, chunk_hashes):
+        """
+        Save the document and content hash of indexed chunks
+        
+        Args:
+            chunk_hashes (dict): Entries keyed by chunk ID
+        """
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        
+        tmp_path = INDEX_STATE_PATH.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(chunk_hashes, f)
+        os.replace(tmp_path, INDEX_STATE_PATH)
+    
+    def _load_parent_store(self):
+        """
+        Load the parent chunks of indexed documents
+        
+        Returns:
+            dict: Parent chunks keyed by ID
+        """
+        if not os.path.exists(PARENT_STORE_PATH):
+            return {}
+        
+        try:
+            with open(PARENT_STORE_PATH, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading parent chunks: {str(e)}")
+            return {}
+    
+    def _save_parent_store(self, parents):
+        """
+        Save the parent chunks of indexed documents
+        
+        Args:
+            parents (dict): Parent chunks keyed by ID
+        """
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        
+        tmp_path = PARENT_STORE_PATH.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(parents, f)
+        os.replace(tmp_path, PARENT_STORE_PATH)
+        self.parents = parents
+    
+    def _update_parent_store(self, document_ids, chunks_dir=None):
+        """
+        Replace the stored parent chunks of the given documents with those of their shards
+        
+        Args:
+            document_ids (set): Documents being indexed
+            chunks_dir (str, optional): Shard directory (defaults to CHUNKS_DIR)
+        """
+        parents = {parent_id: parent for parent_id, parent in self._load_parent_store().items()
+                   if parent["metadata"].get("document_id") not in document_ids}
+        
+        count = 0
+        for parent in iter_parents(sorted(document_ids), chunks_dir):
+            parents[parent["id"]] = parent
+            count += 1
+        
+        self._save_parent_store(parents)
+        logger.info(f"Stored {count} parent chunks for {len(document_ids)} documents")
     
     @timer
     def search(self, query, top_k=None, filter_dict=None):
@@ -191,6 +331,60 @@ class VectorIndexer:
             logger.error(f"Error searching: {str(e)}")
             return None
     
+    @timer
+    def search_parents(self, query, top_k=None, filter_dict=None):
+        """
+        Search small chunks and return their parent chunks (small-to-big)
+        
+        Chunks are matched on their own embeddings, then each is replaced
+        by its parent chunk, so the context holds the whole section or
+        table. A parent is returned once, at the rank of its best chunk,
+        with the matched chunk IDs under "matched_chunks"; chunks without
+        a parent are returned as they are. VECTOR_DB["child_candidates"]
+        chunks are matched per result, so that shared parents still leave
+        top_k results.
+        
+        Args:
+            query (str): Query text
+            top_k (int, optional): Number of results to return
+            filter_dict (dict, optional): Metadata filters (applied to the matched chunks)
+            
+        Returns:
+            dict: Search results in the same form as search
+        """
+        if not top_k:
+            top_k = VECTOR_DB["top_k"]
+        
+        results = self.search(query, top_k * VECTOR_DB.get("child_candidates", 3), filter_dict)
+        if not results:
+            return results
+        
+        if self.parents is None:
+            self.parents = self._load_parent_store()
+        
+        ids, documents, metadatas, distances = [], [], [], []
+        positions = {}
+        matches = zip(results["ids"][0], results["documents"][0], results["metadatas"][0],
+                      results.get("distances", [[None] * len(results["ids"][0])])[0])
+        for chunk_id, content, metadata, distance in matches:
+            parent = self.parents.get(metadata.get("parent_id"))
+            result_id = parent["id"] if parent else chunk_id
+            
+            if result_id in positions:
+                matched = metadatas[positions[result_id]]
+                matched["matched_chunks"] += f",{chunk_id}"
+                continue
+            if len(ids) == top_k:
+                continue
+            
+            positions[result_id] = len(ids)
+            ids.append(result_id)
+            documents.append(parent["content"] if parent else content)
+            metadatas.append(dict(parent["metadata"] if parent else metadata, matched_chunks=chunk_id))
+            distances.append(distance)
+        
+        return {"ids": [ids], "documents": [documents], "metadatas": [metadatas], "distances": [distances]}
+    
     @timer
     def hybrid_search(self, query, top_k=None, filter_dict=None):
         """
@@ -225,6 +419,9 @@ class VectorIndexer:
             )
             logger.info(f"Created new collection: {self.collection_name}")
             
+            self._save_index_state({})
+            self._save_parent_store({})
+            
             return True
         except Exception as e:
             logger.error(f"Error resetting index: {str(e)}")
@@ -1,8 +1,7 @@
 import os
 import logging
-import time
-from functools import wraps
 from .vector_store import VectorStore
+from ..utils.metrics import timer
 from sentence_transformers import SentenceTransformer
 
 # Set up logging
@@ -13,17 +12,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def timer(func):
-    """Decorator to time function execution"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        logger.info(f"{func.__name__} completed in {end_time - start_time:.2f} seconds")
-        return result
-    return wrapper
-
 class Retriever:
     """Retriever for the RAG pipeline"""
     
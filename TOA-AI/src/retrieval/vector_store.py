@@ -6,8 +6,7 @@ import logging
 from sentence_transformers import SentenceTransformer
 from rank_bm25 import BM25Okapi
 import re
-import time
-from functools import wraps
+from ..utils.metrics import timer
 
 # Set up logging
 logging.basicConfig(
@@ -17,17 +16,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def timer(func):
-    """Decorator to time function execution"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        logger.info(f"{func.__name__} completed in {end_time - start_time:.2f} seconds")
-        return result
-    return wrapper
-
 class VectorStore:
     """Vector store for document chunks using FAISS and BM25"""
     
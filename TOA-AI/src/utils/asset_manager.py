@@ -9,6 +9,7 @@ import uuid
 import json
 import base64
 import hashlib
+from contextlib import contextmanager
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -16,11 +17,25 @@ from PIL import Image
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from config.config import ASSETS_DIR, IMAGE_DIR, TABLE_DIR, WARNING_DIR
+from config.config import ASSETS_DIR, IMAGE_DIR, TABLE_DIR, WARNING_DIR, ASSET_REGISTRY, PDF_PROCESSING
 from src.utils.logger import get_logger, timer
+from src.utils.asset_registry_db import AssetRegistryDB, asset_pages, asset_sections
+from src.utils.table_store import write_table
 
 logger = get_logger("AssetManager")
 
+# Replace special ligatures and other problematic characters
+TEXT_TRANSLATION = str.maketrans({
+    '\ufb01': 'fi',  # fi ligature
+    '\ufb02': 'fl',  # fl ligature
+    '\u2019': "'",   # right single quotation mark
+    '\u2018': "'",   # left single quotation mark
+    '\u201c': '"',   # left double quotation mark
+    '\u201d': '"',   # right double quotation mark
+    '\u2013': '-',   # en dash
+    '\u2014': '--',  # em dash
+})
+
 class AssetManager:
     """
     Manages the extraction, storage, and retrieval of assets from PDFs
@@ -47,42 +62,140 @@ class AssetManager:
                          self.doc_table_dir, self.doc_warning_dir]:
             os.makedirs(dir_path, exist_ok=True)
         
-        # Initialize asset registries
-        self.image_registry = {}
-        self.table_registry = {}
-        self.warning_registry = {}
+        # Asset registries, loaded from the backend on first use
+        self._registries = None
+        self._image_hashes = {}
+        
+        # The sqlite backend keeps all registries in one indexed database;
+        # lookups before the registry is loaded are answered by queries
+        self.backend = ASSET_REGISTRY.get("backend", "json")
+        self.registry_db = AssetRegistryDB() if self.backend == "sqlite" else None
         
-        # Load existing registries if they exist
-        self._load_registries()
+        # Registries are written after every store unless disabled
+        # (worker processes hand their assets back to the parent instead)
+        self.auto_save = True
+        
+        # Open batch() blocks; registry writes are deferred until the outermost one ends
+        self._batch_depth = 0
+        self._dirty = False
+    
+    @property
+    def image_registry(self):
+        """Image registry of the document"""
+        return self._get_registries()["images"]
+    
+    @property
+    def table_registry(self):
+        """Table registry of the document"""
+        return self._get_registries()["tables"]
+    
+    @property
+    def warning_registry(self):
+        """Warning registry of the document"""
+        return self._get_registries()["warnings"]
+    
+    @property
+    def image_hashes(self):
+        """Content hash -> image ID of the document's images"""
+        self._get_registries()
+        return self._image_hashes
+    
+    def _get_registries(self):
+        """Get the asset registries, loading them on first use"""
+        if self._registries is None:
+            self._load_registries()
+        return self._registries
     
     def _load_registries(self):
         """Load existing asset registries if they exist"""
-        registry_path = self.doc_asset_dir / "asset_registry.json"
-        if os.path.exists(registry_path):
+        registries = {"images": {}, "tables": {}, "warnings": {}}
+        
+        if self.registry_db is not None:
             try:
-                with open(registry_path, "r") as f:
-                    registry = json.load(f)
-                    self.image_registry = registry.get("images", {})
-                    self.table_registry = registry.get("tables", {})
-                    self.warning_registry = registry.get("warnings", {})
-                logger.info(f"Loaded existing asset registry for {self.document_id}")
+                registries = self.registry_db.load_document(self.document_id)
+                if any(registries.values()):
+                    logger.info(f"Loaded existing asset registry for {self.document_id}")
             except Exception as e:
                 logger.error(f"Error loading asset registry: {e}")
+        else:
+            registry_path = self.doc_asset_dir / "asset_registry.json"
+            if os.path.exists(registry_path):
+                try:
+                    with open(registry_path, "r") as f:
+                        registry = json.load(f)
+                        for asset_type in registries:
+                            registries[asset_type] = registry.get(asset_type, {})
+                    logger.info(f"Loaded existing asset registry for {self.document_id}")
+                except Exception as e:
+                    logger.error(f"Error loading asset registry: {e}")
+        
+        self._registries = registries
+        
+        # Content hash -> image ID, so each unique image is stored once per document
+        self._image_hashes = {
+            image["content_hash"]: image_id
+            for image_id, image in registries["images"].items()
+            if "content_hash" in image
+        }
     
     def _save_registries(self):
-        """Save asset registries to disk"""
-        registry = {
-            "images": self.image_registry,
-            "tables": self.table_registry,
-            "warnings": self.warning_registry
-        }
+        """Save asset registries to disk, or mark them dirty inside a batch"""
+        if not self.auto_save:
+            return
+        
+        if self._batch_depth:
+            self._dirty = True
+            return
+        
+        self.flush()
+    
+    def flush(self):
+        """
+        Write the asset registries to disk
+        
+        The JSON registry is written to a temporary file and renamed over the
+        old one, so readers never see a partially written registry. The sqlite
+        backend replaces the document's rows in a single transaction.
+        """
+        registry = self._get_registries()
+        
+        if self.registry_db is not None:
+            self.registry_db.save_document(self.document_id, registry)
+            self._dirty = False
+            logger.info(f"Saved asset registry for {self.document_id}")
+            return
         
         registry_path = self.doc_asset_dir / "asset_registry.json"
-        with open(registry_path, "w") as f:
-            json.dump(registry, f, indent=2)
+        tmp_path = self.doc_asset_dir / f"asset_registry.json.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(registry, f, indent=ASSET_REGISTRY.get("indent"))
+        os.replace(tmp_path, registry_path)
         
+        self._dirty = False
         logger.info(f"Saved asset registry for {self.document_id}")
     
+    @contextmanager
+    def batch(self):
+        """
+        Buffer registry writes until the block ends
+        
+        Assets stored inside the block are registered in memory and the
+        registry is written once when the outermost batch exits, instead of
+        after every asset. Batches can be nested.
+        
+        Example:
+            with asset_manager.batch():
+                for table in tables:
+                    asset_manager.store_table(table, page_num)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty and self.auto_save:
+                self.flush()
+    
     def _generate_asset_id(self, asset_type, content, page_num):
         """
         Generate a unique ID for an asset
@@ -99,54 +212,103 @@ class AssetManager:
             content_hash = hashlib.md5(content).hexdigest()[:8]
         elif isinstance(content, str):
             content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()[:8]
-        elif isinstance(content, (pd.DataFrame, np.ndarray)):
-            content_hash = hashlib.md5(str(content).encode('utf-8')).hexdigest()[:8]
+        elif isinstance(content, pd.DataFrame):
+            content_hash = self._fingerprint_table(content)[:8]
+        elif isinstance(content, np.ndarray):
+            content_hash = self._fingerprint_table(pd.DataFrame(content))[:8]
         else:
             # Generate a random UUID if content can't be hashed
             content_hash = str(uuid.uuid4())[:8]
         
         return f"{asset_type}_{self.document_id}_p{page_num}_{content_hash}"
     
+    def _fingerprint_table(self, table_df):
+        """
+        Hash the shape, headers and cell values of a table
+        
+        Every cell value is hashed with BLAKE2b, unlike str(DataFrame)
+        which pandas truncates for large frames (so different tables could
+        get the same ID) and which is slower to build.
+        
+        Args:
+            table_df (pandas.DataFrame): Table data
+            
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(table_df.shape).encode('utf-8'))
+        digest.update("\x1f".join(map(str, table_df.columns)).encode('utf-8'))
+        digest.update("\x1f".join(map(str, table_df.to_numpy(dtype=object).ravel())).encode('utf-8'))
+        return digest.hexdigest()
+    
     def _clean_text(self, text):
         """Clean text to ensure it can be saved properly"""
         if not isinstance(text, str):
             return text
+        return text.translate(TEXT_TRANSLATION)
+    
+    def _clean_table(self, table_df):
+        """
+        Clean the text cells of a table in place
         
-        # Replace special ligatures and other problematic characters
-        replacements = {
-            '\ufb01': 'fi',  # fi ligature
-            '\ufb02': 'fl',  # fl ligature
-            '\u2019': "'",   # right single quotation mark
-            '\u2018': "'",   # left single quotation mark
-            '\u201c': '"',   # left double quotation mark
-            '\u201d': '"',   # right double quotation mark
-            '\u2013': '-',   # en dash
-            '\u2014': '--',  # em dash
-        }
+        Each text column is translated in one vectorised pass; cells that
+        are not strings are left as they are.
         
-        for char, replacement in replacements.items():
-            text = text.replace(char, replacement)
+        Args:
+            table_df (pandas.DataFrame): Table data
+        """
+        for position, dtype in enumerate(table_df.dtypes):
+            if dtype != object and not pd.api.types.is_string_dtype(dtype):
+                continue
             
-        return text
+            column = table_df.iloc[:, position]
+            try:
+                cleaned = column.str.translate(TEXT_TRANSLATION)
+            except AttributeError:
+                # No string values in the column
+                continue
+            table_df.iloc[:, position] = cleaned.where(cleaned.notna(), column)
     
     @timer
-    def store_image(self, image_data, page_num, caption=None, source_rect=None):
+    def store_image(self, image_data, page_num, caption=None, source_rect=None, ext=None):
         """
         Store an image asset
         
+        Images are content-addressed: an image already stored for this
+        document is not decoded or written again, the page is only recorded
+        as another occurrence of it.
+        
+        Image streams in one of the configured image_formats are written
+        as-is with their own extension; only the header is read for the
+        dimensions. Other formats are decoded and converted to PNG.
+        Thumbnails and previews are made on request by ThumbnailService.
+        
         Args:
             image_data (bytes or PIL.Image): Image data
             page_num (int): Page number where the image appears
             caption (str, optional): Caption for the image
             source_rect (tuple, optional): Source rectangle (x0, y0, x1, y1)
+            ext (str, optional): Extension of the image stream (e.g. "jpeg"),
+                detected from the header if not given
             
         Returns:
             str: Image asset ID
         """
-        # Generate asset ID
-        image_id = self._generate_asset_id("img", image_data, page_num)
+        content_hash = None
+        if isinstance(image_data, bytes):
+            content_hash = hashlib.md5(image_data).hexdigest()
+            if content_hash in self.image_hashes:
+                return self.reference_image(self.image_hashes[content_hash], page_num,
+                                            caption=caption, source_rect=source_rect)
+        
+        # Generate asset ID (content-addressed, so independent of the page)
+        if content_hash:
+            image_id = f"img_{self.document_id}_{content_hash[:8]}"
+        else:
+            image_id = self._generate_asset_id("img", image_data, page_num)
         
-        # Convert to PIL Image if needed
+        # Convert to PIL Image if needed (opening only parses the header)
         if isinstance(image_data, bytes):
             try:
                 image = Image.open(io.BytesIO(image_data))
@@ -159,10 +321,22 @@ class AssetManager:
             logger.error(f"Unsupported image data type: {type(image_data)}")
             return None
         
-        # Save image to file
-        image_path = self.doc_image_dir / f"{image_id}.png"
+        # Keep the original stream if it is already in a supported format
+        ext = (ext or image.format or "").lower()
+        pass_through = isinstance(image_data, bytes) and ext in PDF_PROCESSING["image_formats"]
+        if not pass_through:
+            ext = "png"
+        
+        # Save image to file (atomically, as parallel workers may store the same image)
+        image_path = self.doc_image_dir / f"{image_id}.{ext}"
+        tmp_path = self.doc_image_dir / f"{image_id}.{os.getpid()}.tmp"
         try:
-            image.save(image_path)
+            if pass_through:
+                with open(tmp_path, "wb") as f:
+                    f.write(image_data)
+            else:
+                image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, image_path)
         except Exception as e:
             logger.error(f"Error saving image: {e}")
             return None
@@ -177,8 +351,17 @@ class AssetManager:
             "file_path": str(image_path),
             "width": image.width,
             "height": image.height,
-            "format": image.format
+            "format": image.format,
+            "encoding": "original" if pass_through else "png",
+            "content_hash": content_hash,
+            "occurrences": [{
+                "page_num": page_num,
+                "caption": caption,
+                "source_rect": source_rect
+            }]
         }
+        if content_hash:
+            self.image_hashes[content_hash] = image_id
         
         # Save registry
         self._save_registries()
@@ -186,6 +369,39 @@ class AssetManager:
         logger.info(f"Stored image asset: {image_id}")
         return image_id
     
+    def reference_image(self, image_id, page_num, caption=None, source_rect=None):
+        """
+        Record another occurrence of an already stored image
+        
+        Args:
+            image_id (str): ID of the stored image
+            page_num (int): Page number where the image appears
+            caption (str, optional): Caption for the image on this page
+            source_rect (tuple, optional): Source rectangle (x0, y0, x1, y1)
+            
+        Returns:
+            str: Image asset ID
+        """
+        occurrences = self._image_occurrences(self.image_registry[image_id])
+        
+        if all(occurrence["page_num"] != page_num for occurrence in occurrences):
+            occurrences.append({
+                "page_num": page_num,
+                "caption": caption,
+                "source_rect": source_rect
+            })
+            self._save_registries()
+        
+        return image_id
+    
+    def _image_occurrences(self, image):
+        """Get the occurrences of an image (registries written before they existed have none)"""
+        return image.setdefault("occurrences", [{
+            "page_num": image["page_num"],
+            "caption": image["caption"],
+            "source_rect": image["source_rect"]
+        }])
+    
     @timer
     def store_table(self, table_data, page_num, caption=None, table_num=None):
         """
@@ -210,27 +426,15 @@ class AssetManager:
             return None
         
         # Clean table data to avoid encoding issues
-        for col in table_df.columns:
-            if table_df[col].dtype == 'object':  # Only process string columns
-                table_df[col] = table_df[col].apply(lambda x: self._clean_text(x) if isinstance(x, str) else x)
+        self._clean_table(table_df)
         
         # Generate asset ID
         table_id = self._generate_asset_id("tbl", table_df, page_num)
         
-        # Save table to files (CSV and markdown)
-        csv_path = self.doc_table_dir / f"{table_id}.csv"
-        md_path = self.doc_table_dir / f"{table_id}.md"
-        
+        # Save table to a single file (Parquet, or CSV without pyarrow);
+        # Markdown, CSV and HTML are rendered on request by table_store
         try:
-            # Save as CSV
-            table_df.to_csv(csv_path, index=False)
-            
-            # Save as markdown
-            with open(md_path, "w", encoding="utf-8") as f:
-                f.write(table_df.to_markdown(index=False))
-            
-            # Generate HTML preview
-            html = table_df.to_html(index=False)
+            data_path, storage_format = write_table(table_df, self.doc_table_dir / table_id)
         except Exception as e:
             logger.error(f"Error saving table: {str(e)}")
             return None
@@ -242,8 +446,8 @@ class AssetManager:
             "page_num": page_num,
             "caption": self._clean_text(caption),
             "table_num": table_num,
-            "csv_path": str(csv_path),
-            "md_path": str(md_path),
+            "data_path": str(data_path),
+            "storage_format": storage_format,
             "rows": table_df.shape[0],
             "columns": table_df.shape[1],
             "headers": table_df.columns.tolist(),
@@ -309,17 +513,140 @@ class AssetManager:
         logger.info(f"Stored {warning_type} asset: {warning_id}")
         return warning_id
     
+    def merge_assets(self, assets):
+        """
+        Merge assets registered elsewhere (e.g. by a worker process)
+        
+        Args:
+            assets (dict): Registries keyed by "images", "tables" and "warnings"
+        """
+        with self.batch():
+            for image_id, image in assets.get("images", {}).items():
+                if image_id in self.image_registry:
+                    stored = self.image_registry[image_id]
+                    for occurrence in image.get("occurrences", []):
+                        self._merge_occurrence(stored, occurrence)
+                else:
+                    self.image_registry[image_id] = image
+                    if image.get("content_hash"):
+                        self.image_hashes[image["content_hash"]] = image_id
+            
+            self.table_registry.update(assets.get("tables", {}))
+            self.warning_registry.update(assets.get("warnings", {}))
+            
+            self._save_registries()
+    
+    def _merge_occurrence(self, image, occurrence):
+        """Add an occurrence to an image, merging section links of the same page"""
+        occurrences = self._image_occurrences(image)
+        for existing in occurrences:
+            if existing["page_num"] == occurrence["page_num"]:
+                for section_id in occurrence.get("section_ids", []):
+                    if section_id not in existing.setdefault("section_ids", []):
+                        existing["section_ids"].append(section_id)
+                return
+        occurrences.append(dict(occurrence))
+    
+    def link_section(self, asset_type, asset_id, section_id, page_num=None):
+        """
+        Record that an asset belongs to a section
+        
+        Warnings keep a single section_id, tables a list of section_ids and
+        images a list per occurrence, so the link is dropped together with
+        the occurrence when its page is reprocessed.
+        
+        Args:
+            asset_type (str): "images", "tables" or "warnings"
+            asset_id (str): Asset identifier
+            section_id (str): Section identifier
+            page_num (int, optional): Page of the section (0-indexed)
+        """
+        asset = self._get_registries()[asset_type].get(asset_id)
+        if asset is None:
+            return
+        
+        if asset_type == "warnings":
+            asset["section_id"] = section_id
+        else:
+            target = asset
+            if asset_type == "images":
+                target = next((occurrence for occurrence in asset.get("occurrences", [])
+                               if occurrence["page_num"] == page_num), asset)
+            section_ids = target.setdefault("section_ids", [])
+            if section_id in section_ids:
+                return
+            section_ids.append(section_id)
+        
+        self._save_registries()
+    
+    def remove_page_assets(self, page_nums):
+        """
+        Remove the registry entries of assets on the given pages
+        
+        Used before reprocessing pages so their stale assets do not linger.
+        
+        Args:
+            page_nums (list): Page numbers (0-indexed)
+        """
+        page_nums = set(page_nums)
+        removed = 0
+        
+        # Shared images only lose their occurrences on these pages
+        for image_id, image in list(self.image_registry.items()):
+            occurrences = [occurrence for occurrence in image.get("occurrences", [])
+                           if occurrence["page_num"] not in page_nums]
+            if occurrences:
+                image["occurrences"] = occurrences
+                image.update({key: occurrences[0][key] for key in ("page_num", "caption", "source_rect")})
+            elif image["page_num"] in page_nums or "occurrences" in image:
+                del self.image_registry[image_id]
+                self.image_hashes.pop(image.get("content_hash"), None)
+                removed += 1
+        
+        for registry in (self.table_registry, self.warning_registry):
+            for asset_id in [asset_id for asset_id, asset in registry.items()
+                             if asset["page_num"] in page_nums]:
+                del registry[asset_id]
+                removed += 1
+        
+        if removed:
+            self._save_registries()
+            logger.info(f"Removed {removed} assets on {len(page_nums)} pages of {self.document_id}")
+    
+    def get_asset_pages(self, asset):
+        """
+        Get the pages an asset appears on
+        
+        Args:
+            asset (dict): Registry entry
+            
+        Returns:
+            list: Page numbers (0-indexed)
+        """
+        return asset_pages(asset)
+    
+    def _query_backend(self):
+        """Whether lookups should be answered by the database instead of the registry in memory"""
+        return self.registry_db is not None and self._registries is None
+    
+    def _get_asset(self, asset_type, asset_id):
+        """Get an asset of one type by ID"""
+        if self._query_backend():
+            asset = self.registry_db.get_asset(asset_id, asset_type)
+            return asset if asset and asset.get("document_id") == self.document_id else None
+        return self._get_registries()[asset_type].get(asset_id)
+    
     def get_image(self, image_id):
         """Get image metadata by ID"""
-        return self.image_registry.get(image_id)
+        return self._get_asset("images", image_id)
     
     def get_table(self, table_id):
         """Get table metadata by ID"""
-        return self.table_registry.get(table_id)
+        return self._get_asset("tables", table_id)
     
     def get_warning(self, warning_id):
         """Get warning metadata by ID"""
-        return self.warning_registry.get(warning_id)
+        return self._get_asset("warnings", warning_id)
     
     def get_all_assets(self):
         """Get all assets for the document"""
@@ -331,6 +658,9 @@ class AssetManager:
     
     def get_page_assets(self, page_num):
         """Get all assets for a specific page"""
+        if self._query_backend():
+            return self.registry_db.get_page_assets(self.document_id, page_num)
+        
         page_assets = {
             "images": {},
             "tables": {},
@@ -338,7 +668,7 @@ class AssetManager:
         }
         
         for img_id, img in self.image_registry.items():
-            if img["page_num"] == page_num:
+            if page_num in self.get_asset_pages(img):
                 page_assets["images"][img_id] = img
                 
         for tbl_id, tbl in self.table_registry.items():
@@ -349,4 +679,85 @@ class AssetManager:
             if warn["page_num"] == page_num:
                 page_assets["warnings"][warn_id] = warn
         
-        return page_assets 
\ No newline at end of file
+        return page_assets 
+    
+    def get_section_assets(self, section_id):
+        """Get all assets linked to a specific section"""
+        if self._query_backend():
+            return self.registry_db.get_section_assets(section_id, self.document_id)
+        
+        return {
+            asset_type: {asset_id: asset for asset_id, asset in registry.items()
+                         if section_id in asset_sections(asset)}
+            for asset_type, registry in self.get_all_assets().items()
+        }
+
+# Asset ID prefix -> registry
+ASSET_ID_TYPES = {"img": "images", "tbl": "tables", "warn": "warnings"}
+
+# Registry path -> (modification time, registry) for find_asset
+_registry_cache = {}
+_registry_db = None
+
+def parse_asset_id(asset_id):
+    """
+    Split an asset ID into its registry and document
+    
+    IDs look like img_<document>_<hash> or tbl_/warn_<document>_p<page>_<hash>.
+    
+    Args:
+        asset_id (str): Asset identifier
+        
+    Returns:
+        tuple: (asset type, document ID), or (None, None) if the ID is malformed
+    """
+    prefix, _, rest = asset_id.partition("_")
+    asset_type = ASSET_ID_TYPES.get(prefix)
+    if asset_type is None or not rest:
+        return None, None
+    
+    parts = rest.rsplit("_", 1 if asset_type == "images" else 2)
+    document_id = parts[0] if len(parts) > 1 else None
+    return asset_type, document_id
+
+def find_asset(asset_id):
+    """
+    Look up an asset of any document by ID
+    
+    Unlike AssetManager, this never creates directories, so it is safe to
+    call with IDs from untrusted input. JSON registries are cached until
+    they change on disk.
+    
+    Args:
+        asset_id (str): Asset identifier
+        
+    Returns:
+        tuple: (asset type, registry entry), or (None, None) if not found
+    """
+    asset_type, document_id = parse_asset_id(asset_id)
+    if asset_type is None:
+        return None, None
+    
+    if ASSET_REGISTRY.get("backend") == "sqlite":
+        global _registry_db
+        if _registry_db is None:
+            _registry_db = AssetRegistryDB()
+        asset = _registry_db.get_asset(asset_id, asset_type)
+        return (asset_type, asset) if asset else (None, None)
+    
+    if not document_id or Path(document_id).name != document_id or document_id in (".", ".."):
+        return None, None
+    
+    registry_path = ASSETS_DIR / document_id / "asset_registry.json"
+    try:
+        mtime = os.stat(registry_path).st_mtime_ns
+    except OSError:
+        return None, None
+    
+    cached = _registry_cache.get(registry_path)
+    if cached is None or cached[0] != mtime:
+        with open(registry_path, "r") as f:
+            cached = _registry_cache[registry_path] = (mtime, json.load(f))
+    
+    asset = cached[1].get(asset_type, {}).get(asset_id)
+    return (asset_type, asset) if asset else (None, None)
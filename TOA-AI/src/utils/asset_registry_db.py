@@ -0,0 +1,336 @@
+"""
+TOA-AI Asset Registry Database
+SQLite storage for asset registries with page, type, priority and section indexes
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import ASSETS_DIR, ASSET_REGISTRY
+from src.utils.logger import get_logger
+
+logger = get_logger("AssetRegistryDB")
+
+REGISTRY_DB_PATH = ASSET_REGISTRY.get("db_path") or ASSETS_DIR / "asset_registry.db"
+
+ASSET_TYPES = ["images", "tables", "warnings"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id TEXT PRIMARY KEY,
+    document_id TEXT NOT NULL,
+    asset_type TEXT NOT NULL,
+    page_num INTEGER,
+    priority INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS asset_pages (
+    document_id TEXT NOT NULL,
+    page_num INTEGER NOT NULL,
+    asset_id TEXT NOT NULL,
+    PRIMARY KEY (document_id, page_num, asset_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS asset_sections (
+    section_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    PRIMARY KEY (section_id, document_id, asset_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_assets_document_page ON assets (document_id, page_num);
+CREATE INDEX IF NOT EXISTS idx_assets_document_type ON assets (document_id, asset_type);
+CREATE INDEX IF NOT EXISTS idx_assets_type ON assets (asset_type);
+CREATE INDEX IF NOT EXISTS idx_assets_priority ON assets (asset_type, priority);
+CREATE INDEX IF NOT EXISTS idx_asset_pages_asset ON asset_pages (asset_id);
+CREATE INDEX IF NOT EXISTS idx_asset_sections_asset ON asset_sections (asset_id);
+"""
+
+def asset_pages(asset):
+    """
+    Get the pages an asset appears on
+    
+    Args:
+        asset (dict): Registry entry
+    
+    Returns:
+        list: Page numbers (0-indexed)
+    """
+    if "occurrences" in asset:
+        return [occurrence["page_num"] for occurrence in asset["occurrences"]]
+    return [asset["page_num"]]
+
+def asset_sections(asset):
+    """
+    Get the sections an asset is linked to
+    
+    Warnings carry a single section_id, tables a list of section_ids and
+    images a list per occurrence.
+    
+    Args:
+        asset (dict): Registry entry
+    
+    Returns:
+        set: Section IDs
+    """
+    section_ids = set(asset.get("section_ids") or [])
+    if asset.get("section_id"):
+        section_ids.add(asset["section_id"])
+    for occurrence in asset.get("occurrences", []):
+        section_ids.update(occurrence.get("section_ids") or [])
+    return section_ids
+
+class AssetRegistryDB:
+    """
+    Asset registries of all documents in one SQLite database
+    
+    Each asset is a row holding its registry entry as JSON, with the
+    columns needed for lookups pulled out and indexed. Pages and sections
+    are kept in separate tables since an image can appear on several pages
+    and an asset can belong to several sections. The database runs in WAL
+    mode so parallel ingest jobs and readers (API, chunker) do not block
+    each other.
+    """
+    
+    def __init__(self, db_path=None):
+        """
+        Open (and create if needed) the registry database
+        
+        Args:
+            db_path (str, optional): Path to the database (defaults to config)
+        """
+        self.db_path = Path(db_path or REGISTRY_DB_PATH)
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connection(self):
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    def save_document(self, document_id, registries):
+        """
+        Replace the registry of a document in one transaction
+        
+        Args:
+            document_id (str): Document identifier
+            registries (dict): Registries keyed by "images", "tables" and "warnings"
+        """
+        asset_rows, page_rows, section_rows = [], [], []
+        for asset_type in ASSET_TYPES:
+            for asset_id, asset in registries.get(asset_type, {}).items():
+                asset_rows.append((asset_id, document_id, asset_type, asset.get("page_num"),
+                                   asset.get("priority"), json.dumps(asset)))
+                page_rows.extend((document_id, page_num, asset_id)
+                                 for page_num in set(asset_pages(asset)))
+                section_rows.extend((section_id, document_id, asset_id)
+                                    for section_id in asset_sections(asset))
+        
+        with self._connection() as conn:
+            conn.execute("DELETE FROM assets WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM asset_pages WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM asset_sections WHERE document_id = ?", (document_id,))
+            conn.executemany("INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?)", asset_rows)
+            conn.executemany("INSERT OR IGNORE INTO asset_pages VALUES (?, ?, ?)", page_rows)
+            conn.executemany("INSERT OR IGNORE INTO asset_sections VALUES (?, ?, ?)", section_rows)
+    
+    def load_document(self, document_id):
+        """
+        Load the registry of a document
+        
+        Args:
+            document_id (str): Document identifier
+        
+        Returns:
+            dict: Registries keyed by "images", "tables" and "warnings"
+        """
+        rows = self._connection().execute(
+            "SELECT asset_type, asset_id, data FROM assets WHERE document_id = ? ORDER BY rowid",
+            (document_id,))
+        return self._group(rows)
+    
+    def document_ids(self):
+        """
+        Get the documents that have assets in the database
+        
+        Returns:
+            list: Document identifiers
+        """
+        rows = self._connection().execute("SELECT DISTINCT document_id FROM assets ORDER BY document_id")
+        return [document_id for (document_id,) in rows]
+    
+    def has_document(self, document_id):
+        """
+        Check whether a document has any assets in the database
+        
+        Args:
+            document_id (str): Document identifier
+        
+        Returns:
+            bool: True if the document is present
+        """
+        row = self._connection().execute(
+            "SELECT 1 FROM assets WHERE document_id = ? LIMIT 1", (document_id,)).fetchone()
+        return row is not None
+    
+    def get_asset(self, asset_id, asset_type=None):
+        """
+        Get an asset by ID
+        
+        Args:
+            asset_id (str): Asset identifier
+            asset_type (str, optional): Only return assets of this type
+        
+        Returns:
+            dict: Registry entry, or None
+        """
+        if asset_type:
+            row = self._connection().execute(
+                "SELECT data FROM assets WHERE asset_id = ? AND asset_type = ?",
+                (asset_id, asset_type)).fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT data FROM assets WHERE asset_id = ?", (asset_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_page_assets(self, document_id, page_num):
+        """
+        Get all assets on a page
+        
+        Args:
+            document_id (str): Document identifier
+            page_num (int): Page number (0-indexed)
+        
+        Returns:
+            dict: Registries keyed by "images", "tables" and "warnings"
+        """
+        rows = self._connection().execute(
+            "SELECT a.asset_type, a.asset_id, a.data FROM asset_pages p "
+            "JOIN assets a ON a.asset_id = p.asset_id "
+            "WHERE p.document_id = ? AND p.page_num = ? ORDER BY a.rowid",
+            (document_id, page_num))
+        return self._group(rows)
+    
+    def get_section_assets(self, section_id, document_id=None):
+        """
+        Get all assets linked to a section
+        
+        Args:
+            section_id (str): Section identifier
+            document_id (str, optional): Only return assets of this document
+        
+        Returns:
+            dict: Registries keyed by "images", "tables" and "warnings"
+        """
+        query = ("SELECT a.asset_type, a.asset_id, a.data FROM asset_sections s "
+                 "JOIN assets a ON a.asset_id = s.asset_id WHERE s.section_id = ?")
+        params = [section_id]
+        if document_id:
+            query += " AND s.document_id = ?"
+            params.append(document_id)
+        
+        rows = self._connection().execute(query + " ORDER BY a.rowid", params)
+        return self._group(rows)
+    
+    def get_assets_by_type(self, asset_type, document_id=None):
+        """
+        Get all assets of one type
+        
+        Args:
+            asset_type (str): "images", "tables" or "warnings"
+            document_id (str, optional): Only return assets of this document
+        
+        Returns:
+            dict: Registry entries keyed by asset ID
+        """
+        query = "SELECT asset_type, asset_id, data FROM assets WHERE asset_type = ?"
+        params = [asset_type]
+        if document_id:
+            query += " AND document_id = ?"
+            params.append(document_id)
+        
+        rows = self._connection().execute(query + " ORDER BY rowid", params)
+        return self._group(rows)[asset_type]
+    
+    def get_warnings(self, max_priority=None, document_id=None):
+        """
+        Get warnings, most severe first
+        
+        Args:
+            max_priority (int, optional): Only return warnings with this priority
+                or higher (1 = WARNING, 2 = CAUTION, 3 = NOTE)
+            document_id (str, optional): Only return warnings of this document
+        
+        Returns:
+            list: Warning registry entries
+        """
+        query = "SELECT data FROM assets WHERE asset_type = 'warnings'"
+        params = []
+        if max_priority is not None:
+            query += " AND priority <= ?"
+            params.append(max_priority)
+        if document_id:
+            query += " AND document_id = ?"
+            params.append(document_id)
+        
+        rows = self._connection().execute(query + " ORDER BY priority, rowid", params)
+        return [json.loads(data) for (data,) in rows]
+    
+    def _group(self, rows):
+        """Group (asset_type, asset_id, data) rows into registries"""
+        registries = {asset_type: {} for asset_type in ASSET_TYPES}
+        for asset_type, asset_id, data in rows:
+            registries[asset_type][asset_id] = json.loads(data)
+        return registries
+
+def migrate_json_registries(assets_dir=None, db_path=None):
+    """
+    Copy the asset_registry.json files of all documents into the database
+    
+    Documents already in the database are replaced by their JSON registry.
+    
+    Args:
+        assets_dir (str, optional): Directory holding one folder per document
+        db_path (str, optional): Path to the database (defaults to config)
+    
+    Returns:
+        dict: Number of migrated assets keyed by document ID
+    """
+    assets_dir = Path(assets_dir or ASSETS_DIR)
+    db = AssetRegistryDB(db_path)
+    migrated = {}
+    
+    for registry_path in sorted(assets_dir.glob("*/asset_registry.json")):
+        document_id = registry_path.parent.name
+        try:
+            with open(registry_path, "r") as f:
+                registry = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading asset registry {registry_path}: {e}")
+            continue
+        
+        db.save_document(document_id, registry)
+        migrated[document_id] = sum(len(registry.get(asset_type, {})) for asset_type in ASSET_TYPES)
+        logger.info(f"Migrated {migrated[document_id]} assets of {document_id}")
+    
+    db.close()
+    return migrated
@@ -0,0 +1,170 @@
+"""
+TOA-AI Embedding Cache
+Keeps chunk embeddings on disk keyed by model and content hash, so unchanged chunks are not encoded again
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import sys
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import INDEX_DIR
+from src.utils.logger import get_logger
+
+logger = get_logger("EmbeddingCache")
+
+EMBEDDING_CACHE_DIR = INDEX_DIR / "embedding_cache"
+
+def content_hash(text):
+    """
+    Hash a text the way the cache keys it
+    
+    Args:
+        text (str): Chunk text
+    
+    Returns:
+        str: SHA-256 hex digest of the UTF-8 text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Embeddings of one model, keyed by the SHA-256 of the embedded text
+    
+    Each model has a directory holding vectors.f32, a float32 array with
+    one row per cached text that is read through a memory map, and
+    index.json, which maps content hashes to rows. New rows are appended
+    to the array before the index is replaced, so an interrupted run
+    leaves at most unreferenced rows, which the next append overwrites.
+    """
+    
+    def __init__(self, model_name, cache_dir=None):
+        """
+        Initialize the cache of a model
+        
+        Args:
+            model_name (str): Embedding model
+            cache_dir (str, optional): Cache directory (defaults to EMBEDDING_CACHE_DIR)
+        """
+        self.model_name = model_name
+        self.path = Path(cache_dir or EMBEDDING_CACHE_DIR) / model_name.replace("/", "__")
+        self.vectors_path = self.path / "vectors.f32"
+        self.index_path = self.path / "index.json"
+        
+        self.dim = None
+        self.rows = {}
+        self.vectors = None
+        self.hits = 0
+        self.misses = 0
+        
+        self._load()
+    
+    def _load(self):
+        """Load the hash index and map the vectors"""
+        if not self.index_path.exists():
+            return
+        
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading embedding cache index {self.index_path}: {str(e)}")
+            return
+        
+        if index.get("model") != self.model_name:
+            logger.warning(f"Embedding cache {self.path} belongs to {index.get('model')}, ignoring it")
+            return
+        
+        self.dim = index["dim"]
+        self.rows = index["rows"]
+        self._map()
+    
+    def _map(self):
+        """Memory-map the rows the index references"""
+        self.vectors = None
+        if self.rows:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                     shape=(len(self.rows), self.dim))
+    
+    def __len__(self):
+        """Number of cached embeddings"""
+        return len(self.rows)
+    
+    def add_many(self, texts, embeddings):
+        """
+        Add the embeddings of texts to the cache
+        
+        Args:
+            texts (list): Embedded texts
+            embeddings (numpy.ndarray): One embedding per text
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embeddings of {self.model_name} have {embeddings.shape[1]} dimensions, "
+                             f"the cache has {self.dim}")
+        
+        new_rows = {}
+        new_vectors = []
+        for text, embedding in zip(texts, embeddings):
+            key = content_hash(text)
+            if key not in self.rows and key not in new_rows:
+                new_rows[key] = len(self.rows) + len(new_rows)
+                new_vectors.append(embedding)
+        
+        if not new_rows:
+            return
+        
+        os.makedirs(self.path, exist_ok=True)
+        
+        # Release the memory map before growing the file
+        self.vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(len(self.rows) * self.dim * 4)
+            f.write(np.stack(new_vectors).tobytes())
+        
+        self.rows.update(new_rows)
+        
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "rows": self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+        
+        self._map()
+    
+    def encode(self, texts, encode_batch):
+        """
+        Get the embeddings of texts, encoding only the ones not in the cache
+        
+        Args:
+            texts (list): Texts to embed
+            encode_batch (callable): Encodes a list of texts to an array of embeddings
+        
+        Returns:
+            numpy.ndarray: One float32 embedding per text, in order
+        """
+        keys = [content_hash(text) for text in texts]
+        
+        # Encode each missing text once, even if several chunks share it
+        missing = {}
+        misses = 0
+        for key, text in zip(keys, texts):
+            if key not in self.rows:
+                missing.setdefault(key, text)
+                misses += 1
+        if missing:
+            self.add_many(list(missing.values()), encode_batch(list(missing.values())))
+        
+        self.hits += len(texts) - misses
+        self.misses += misses
+        logger.info(f"Embedding cache for {self.model_name}: {len(texts) - misses} hits, {misses} misses "
+                    f"({len(missing)} texts encoded), {len(self)} embeddings cached")
+        
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors[[self.rows[key] for key in keys]])
@@ -7,7 +7,6 @@ import sys
 import os
 from pathlib import Path
 from loguru import logger
-import time
 
 # Add parent directory to path to import config
 sys.path.append(str(Path(__file__).parent.parent.parent))
@@ -40,13 +39,5 @@ def get_logger(name):
     """Get a logger with the given name"""
     return logger.bind(name=name)
 
-# Create a function for timing operations
-def timer(func):
-    """Decorator to time function execution"""
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        logger.info(f"{func.__name__} completed in {end_time - start_time:.2f} seconds")
-        return result
-    return wrapper 
\ No newline at end of file
+# Timing operations are recorded in the shared metrics registry
+from src.utils.metrics import timer 
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""
+TOA-AI Metrics
+In-process timing histograms shared by every timed function
+"""
+
+import os
+import json
+import time
+import random
+import atexit
+import threading
+from functools import wraps
+from pathlib import Path
+import sys
+from loguru import logger as _logger
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import METRICS
+
+logger = _logger.bind(name="Metrics")
+
+# Histogram bucket upper bounds in seconds: 10us doubling up to ~22 minutes
+BUCKET_BOUNDS = [1e-5 * 2 ** i for i in range(28)]
+
+class Histogram:
+    """Count, sum, extremes and log-scale buckets of observed durations"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+    
+    def observe(self, value):
+        """
+        Add an observation
+        
+        Args:
+            value (float): Duration in seconds
+        """
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        
+        index = 0
+        while index < len(BUCKET_BOUNDS) and value > BUCKET_BOUNDS[index]:
+            index += 1
+        self.buckets[index] += 1
+    
+    def percentile(self, q):
+        """
+        Estimate a percentile from the buckets
+        
+        Args:
+            q (float): Percentile between 0 and 1
+        
+        Returns:
+            float: Upper bound of the bucket holding the percentile
+        """
+        if not self.count:
+            return 0.0
+        
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+    
+    def to_dict(self):
+        """Summary of the histogram"""
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else 0.0,
+            "min_seconds": self.min,
+            "p50_seconds": self.percentile(0.50),
+            "p95_seconds": self.percentile(0.95),
+            "p99_seconds": self.percentile(0.99),
+            "max_seconds": self.max
+        }
+
+class MetricsRegistry:
+    """
+    Process-wide registry of timing histograms
+    
+    Observations can be sampled (sample_rate) or switched off entirely
+    (enabled). A summary is logged every summary_interval seconds, checked
+    when observations are recorded, and once more at exit.
+    """
+    
+    def __init__(self, settings=None):
+        """
+        Initialize the registry
+        
+        Args:
+            settings (dict, optional): Metrics settings (defaults to config)
+        """
+        settings = settings or METRICS
+        self.enabled = settings.get("enabled", True)
+        self.sample_rate = settings.get("sample_rate", 1.0)
+        self.summary_interval = settings.get("summary_interval", 60)
+        self.summary_path = settings.get("summary_path")
+        self.slow_call_seconds = settings.get("slow_call_seconds")
+        
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._last_summary = time.monotonic()
+    
+    def should_sample(self):
+        """
+        Decide whether to time the current call
+        
+        Returns:
+            bool: True if the call should be timed
+        """
+        if not self.enabled:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+    
+    def observe(self, name, seconds):
+        """
+        Record a duration
+        
+        Args:
+            name (str): Metric name (function or stage)
+            seconds (float): Duration in seconds
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            
+            summary_due = (self.summary_interval and
+                           time.monotonic() - self._last_summary >= self.summary_interval)
+            if summary_due:
+                self._last_summary = time.monotonic()
+        
+        if self.slow_call_seconds and seconds >= self.slow_call_seconds:
+            logger.info(f"{name} took {seconds:.2f} seconds")
+        
+        if summary_due:
+            self.log_summary()
+    
+    def snapshot(self):
+        """
+        Get a summary of every histogram
+        
+        Returns:
+            dict: Histogram summaries keyed by metric name
+        """
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+    
+    def log_summary(self):
+        """Log one line per metric, slowest total first"""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return
+        
+        logger.info(f"Timing summary ({len(snapshot)} metrics, sample rate {self.sample_rate:g}):")
+        for name, summary in sorted(snapshot.items(), key=lambda item: -item[1]["total_seconds"]):
+            logger.info(f"  {name}: {summary['count']} calls, total {summary['total_seconds']:.2f}s, "
+                        f"mean {summary['mean_seconds'] * 1000:.1f}ms, "
+                        f"p95 {summary['p95_seconds'] * 1000:.1f}ms, "
+                        f"max {summary['max_seconds'] * 1000:.1f}ms")
+    
+    def dump(self, path=None):
+        """
+        Write the summary of every histogram to a JSON file
+        
+        Args:
+            path (str, optional): Output path (defaults to summary_path)
+        
+        Returns:
+            Path: Path written to, or None
+        """
+        path = path or self.summary_path
+        snapshot = self.snapshot()
+        if not path or not snapshot:
+            return None
+        
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"pid": os.getpid(), "sample_rate": self.sample_rate, "metrics": snapshot}, f, indent=2)
+        os.replace(tmp_path, path)
+        
+        return path
+    
+    def reset(self):
+        """Drop all recorded observations"""
+        with self._lock:
+            self.histograms = {}
+
+registry = MetricsRegistry()
+
+def timer(func=None, name=None):
+    """
+    Decorator recording the duration of each call in the metrics registry
+    
+    Can be used as @timer or @timer(name="stage").
+    
+    Args:
+        func (callable, optional): Function to time
+        name (str, optional): Metric name (defaults to the function's qualified name)
+    """
+    def decorator(func):
+        metric_name = name or func.__qualname__
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.should_sample():
+                return func(*args, **kwargs)
+            
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(metric_name, time.perf_counter() - start_time)
+        return wrapper
+    
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+def _summarize_at_exit():
+    """Log the final summary, and save it if a summary path is configured"""
+    registry.log_summary()
+    if registry.summary_path:
+        registry.dump()
+
+atexit.register(_summarize_at_exit)
@@ -0,0 +1,130 @@
+"""
+TOA-AI Table Store
+Stores each table once in a compact form and renders Markdown, CSV or HTML on demand
+"""
+
+import os
+import io
+from functools import lru_cache
+from pathlib import Path
+import sys
+import pandas as pd
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import TABLE_STORAGE
+from src.utils.logger import get_logger
+
+logger = get_logger("TableStore")
+
+RENDER_FORMATS = ["markdown", "csv", "html"]
+
+@lru_cache(maxsize=None)
+def _parquet_available():
+    """Check (once) whether a Parquet engine is installed"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("pyarrow is not installed, storing tables as CSV")
+        return False
+
+def storage_format():
+    """
+    Get the format new tables are stored in
+    
+    Parquet is used if configured and pyarrow is installed, CSV otherwise.
+    
+    Returns:
+        str: "parquet" or "csv"
+    """
+    if TABLE_STORAGE.get("format", "parquet") == "parquet" and _parquet_available():
+        return "parquet"
+    return "csv"
+
+def write_table(table_df, base_path):
+    """
+    Write a table in the storage format
+    
+    The file is written to a temporary name and renamed into place.
+    
+    Args:
+        table_df (pandas.DataFrame): Table data
+        base_path (Path): Path of the table without extension
+    
+    Returns:
+        tuple: (path written, storage format)
+    """
+    table_format = storage_format()
+    path = Path(f"{base_path}.{table_format}")
+    tmp_path = Path(f"{base_path}.{os.getpid()}.tmp")
+    
+    if table_format == "parquet":
+        # Parquet needs string column names
+        table_df.set_axis([str(column) for column in table_df.columns], axis=1).to_parquet(
+            tmp_path, index=False, compression=TABLE_STORAGE.get("compression", "zstd"))
+    else:
+        table_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    
+    return path, table_format
+
+def load_table(table):
+    """
+    Load a stored table into a DataFrame
+    
+    Args:
+        table (dict): Table registry entry
+    
+    Returns:
+        pandas.DataFrame: Table data
+    """
+    path, table_format = _table_source(table)
+    return _read(path, table_format).copy()
+
+def render_table(table, fmt="markdown"):
+    """
+    Render a stored table
+    
+    Renderings are kept in a small LRU cache (TABLE_STORAGE["render_cache_size"]),
+    so repeated requests for the same table do not read or format it again.
+    
+    Args:
+        table (dict): Table registry entry
+        fmt (str): "markdown", "csv" or "html"
+    
+    Returns:
+        str: Rendered table
+    """
+    if fmt not in RENDER_FORMATS:
+        raise ValueError(f"Unsupported table format: {fmt}")
+    
+    path, table_format = _table_source(table)
+    return _render(path, table_format, fmt)
+
+def _table_source(table):
+    """Get the stored file of a table; registries written before Parquet storage point at the CSV"""
+    if table.get("data_path"):
+        return str(table["data_path"]), table["storage_format"]
+    return str(table["csv_path"]), "csv"
+
+@lru_cache(maxsize=8)
+def _read(path, table_format):
+    """Read a stored table (the last few are kept for consecutive renderings)"""
+    if table_format == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+@lru_cache(maxsize=TABLE_STORAGE.get("render_cache_size", 256))
+def _render(path, table_format, fmt):
+    """Render a stored table"""
+    table_df = _read(path, table_format)
+    
+    if fmt == "markdown":
+        return table_df.to_markdown(index=False)
+    if fmt == "html":
+        return table_df.to_html(index=False)
+    
+    buffer = io.StringIO()
+    table_df.to_csv(buffer, index=False)
+    return buffer.getvalue()
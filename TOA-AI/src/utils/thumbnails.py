@@ -0,0 +1,170 @@
+"""
+TOA-AI Thumbnails
+Generates thumbnail and preview variants of stored images on request
+"""
+
+import os
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+import sys
+from PIL import Image
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import IMAGE_VARIANTS
+from src.utils.logger import get_logger
+
+logger = get_logger("Thumbnails")
+
+class ThumbnailService:
+    """
+    Background generation of downscaled image variants
+    
+    Variants ("thumbnail", "preview", see IMAGE_VARIANTS) are written next
+    to the original image under variants/ the first time they are
+    requested and served from disk afterwards. Generation runs in a thread
+    pool (Pillow releases the GIL while decoding and resizing), and
+    concurrent requests for the same variant share one job. JPEG sources are
+    decoded at reduced scale, so a thumbnail of a large scan does not need
+    the full-resolution pixels.
+    """
+    
+    def __init__(self, workers=None):
+        """
+        Initialize the service
+        
+        Args:
+            workers (int, optional): Generator threads (defaults to config)
+        """
+        self.workers = workers or IMAGE_VARIANTS.get("workers", 2)
+        self.sizes = IMAGE_VARIANTS["sizes"]
+        self.executor = None
+        
+        # Variant path -> future of the job generating it
+        self._pending = {}
+        self._lock = threading.Lock()
+    
+    def variant_tag(self, variant):
+        """
+        Get the tag of a variant's current settings
+        
+        The tag includes the variant's size and the JPEG quality, so files
+        and ETags generated with other settings are not reused.
+        
+        Args:
+            variant (str): Variant name
+        
+        Returns:
+            str: Tag such as "thumbnail-256-q85"
+        """
+        return f"{variant}-{self.sizes[variant]}-q{IMAGE_VARIANTS.get('jpeg_quality', 85)}"
+    
+    def variant_path(self, image, variant):
+        """
+        Get the path of an image variant
+        
+        Args:
+            image (dict): Image registry entry
+            variant (str): Variant name
+        
+        Returns:
+            Path: Path to the variant file (may not exist yet)
+        """
+        source_path = Path(image["file_path"])
+        ext = "jpg" if source_path.suffix.lower() in (".jpg", ".jpeg") else "png"
+        return source_path.parent / "variants" / f"{image['id']}_{self.variant_tag(variant)}.{ext}"
+    
+    def request(self, image, variant):
+        """
+        Schedule generation of an image variant unless it already exists
+        
+        Args:
+            image (dict): Image registry entry
+            variant (str): Variant name
+        
+        Returns:
+            concurrent.futures.Future: Future resolving to the variant path
+        """
+        if variant not in self.sizes:
+            raise ValueError(f"Unknown image variant: {variant}")
+        
+        path = self.variant_path(image, variant)
+        if path.exists():
+            future = Future()
+            future.set_result(path)
+            return future
+        
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers)
+                future = self.executor.submit(self._generate, image["file_path"], path, self.sizes[variant])
+                future.add_done_callback(lambda _: self._forget(path))
+                self._pending[path] = future
+        
+        return future
+    
+    def get(self, image, variant, timeout=None):
+        """
+        Get an image variant, generating it if needed
+        
+        Args:
+            image (dict): Image registry entry
+            variant (str): Variant name
+            timeout (float, optional): Seconds to wait for generation
+        
+        Returns:
+            Path: Path to the variant file
+        """
+        return self.request(image, variant).result(timeout)
+    
+    def _forget(self, path):
+        """Drop a finished job"""
+        with self._lock:
+            self._pending.pop(path, None)
+    
+    def _generate(self, source_path, path, max_size):
+        """Downscale an image so its longest edge is at most max_size pixels"""
+        with Image.open(source_path) as image:
+            # Let the JPEG decoder skip detail that would be thrown away
+            image.draft("RGB", (max_size, max_size))
+            image.thumbnail((max_size, max_size))
+            
+            os.makedirs(path.parent, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            if path.suffix == ".jpg":
+                if image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                image.save(tmp_path, format="JPEG", quality=IMAGE_VARIANTS.get("jpeg_quality", 85))
+            else:
+                if image.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+                    image = image.convert("RGBA" if "A" in image.mode else "RGB")
+                image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+        
+        logger.info(f"Generated {path.name}")
+        return path
+    
+    def close(self):
+        """Wait for pending jobs and shut down the thread pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_thumbnail_service():
+    """
+    Get the process-wide thumbnail service
+    
+    Returns:
+        ThumbnailService: Shared service
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ThumbnailService()
+        return _service
@@ -0,0 +1,184 @@
+"""
+TOA-AI Token Counter
+Counts text in the word-pieces of the embedding model, so chunks can be sized to its input window
+"""
+
+import json
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+import sys
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config.config import CHUNKING
+from src.utils.logger import get_logger
+
+logger = get_logger("TokenCounter")
+
+class TokenCounter:
+    """
+    Token counts and offsets from the embedding model's fast tokenizer
+    
+    Sentence Transformers truncate every input at the model's max sequence
+    length (256 word-pieces for all-MiniLM-L6-v2), including the [CLS] and
+    [SEP] tokens it adds. window is the number of text tokens that remain.
+    
+    Counts and token offsets are cached by text, as the same section
+    headers and chunk texts are measured repeatedly.
+    """
+    
+    def __init__(self, model_name=None, max_tokens=None, cache_size=4096):
+        """
+        Initialize the token counter
+        
+        Args:
+            model_name (str, optional): Embedding model (defaults to config)
+            max_tokens (int, optional): Max sequence length, overriding the model's
+            cache_size (int): Number of texts whose counts are cached
+        """
+        from transformers import AutoTokenizer
+        
+        self.model_name = model_name or CHUNKING.get("embedding_model", "all-MiniLM-L6-v2")
+        self.repo_id = self.model_name if "/" in self.model_name else f"sentence-transformers/{self.model_name}"
+        self.tokenizer = AutoTokenizer.from_pretrained(self.repo_id, use_fast=True)
+        if not self.tokenizer.is_fast:
+            raise ValueError(f"{self.repo_id} has no fast tokenizer, token offsets are not available")
+        
+        self.max_seq_length = max_tokens or CHUNKING.get("max_tokens") or self._model_max_seq_length()
+        self.window = self.max_seq_length - self.tokenizer.num_special_tokens_to_add()
+        
+        self.cache_size = cache_size
+        self._counts = OrderedDict()
+        self._starts = OrderedDict()
+        self._lock = threading.Lock()
+        
+        logger.info(f"Counting tokens with {self.repo_id} (max sequence length {self.max_seq_length})")
+    
+    def _model_max_seq_length(self):
+        """Read the max sequence length Sentence Transformers uses for the model"""
+        try:
+            from huggingface_hub import hf_hub_download
+            with open(hf_hub_download(self.repo_id, "sentence_bert_config.json"), "r") as f:
+                return json.load(f)["max_seq_length"]
+        except Exception as e:
+            logger.warning(f"Could not read the max sequence length of {self.repo_id}: {e}")
+        
+        # Tokenizers without a limit report a huge sentinel value
+        return min(self.tokenizer.model_max_length, 512)
+    
+    def _cached(self, cache, text, compute):
+        """Look a text up in an LRU cache, computing and storing it on a miss"""
+        with self._lock:
+            if text in cache:
+                cache.move_to_end(text)
+                return cache[text]
+        
+        value = compute(text)
+        
+        with self._lock:
+            cache[text] = value
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return value
+    
+    def _token_starts(self, text):
+        """Character offset at which each token of a text starts"""
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return [start for start, _ in encoding["offset_mapping"]]
+    
+    def token_starts(self, text):
+        """
+        Get the character offset at which each token of a text starts
+        
+        Args:
+            text (str): Text to tokenize
+        
+        Returns:
+            list: Start offsets in token order
+        """
+        return self._cached(self._starts, text, self._token_starts)
+    
+    def count(self, text):
+        """
+        Count the tokens of a text (without special tokens)
+        
+        Args:
+            text (str): Text to count
+        
+        Returns:
+            int: Number of tokens
+        """
+        if not text:
+            return 0
+        return self._cached(self._counts, text, lambda value: len(self.token_starts(value)))
+    
+    def count_many(self, texts):
+        """
+        Count the tokens of several texts, tokenizing uncached ones in one batch
+        
+        Args:
+            texts (list): Texts to count
+        
+        Returns:
+            list: Number of tokens per text
+        """
+        with self._lock:
+            missing = list({text for text in texts if text and text not in self._counts})
+        
+        if missing:
+            encodings = self.tokenizer(missing, add_special_tokens=False)["input_ids"]
+            with self._lock:
+                for text, input_ids in zip(missing, encodings):
+                    self._counts[text] = len(input_ids)
+                while len(self._counts) > self.cache_size:
+                    self._counts.popitem(last=False)
+        
+        return [self.count(text) for text in texts]
+    
+    def span_count(self, starts, start, end):
+        """
+        Count the tokens starting within a character span of a tokenized text
+        
+        Args:
+            starts (list): Token start offsets of the text (see token_starts)
+            start (int): Start of the span
+            end (int): End of the span
+        
+        Returns:
+            int: Number of tokens
+        """
+        return bisect_left(starts, end) - bisect_left(starts, start)
+    
+    def truncated(self, text):
+        """
+        Count the tokens of a text the embedding model does not see
+        
+        Args:
+            text (str): Text to embed
+        
+        Returns:
+            int: Number of tokens beyond the window
+        """
+        return max(self.count(text) - self.window, 0)
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+def get_token_counter(model_name=None, max_tokens=None):
+    """
+    Get a shared token counter for an embedding model
+    
+    Args:
+        model_name (str, optional): Embedding model (defaults to config)
+        max_tokens (int, optional): Max sequence length, overriding the model's
+    
+    Returns:
+        TokenCounter: Counter with a warm cache
+    """
+    key = (model_name or CHUNKING.get("embedding_model", "all-MiniLM-L6-v2"), max_tokens)
+    with _counters_lock:
+        if key not in _counters:
+            _counters[key] = TokenCounter(*key)
+        return _counters[key]
@@ -0,0 +1,124 @@
+"""
+TOA-AI Token Truncation Report
+Shows how much chunk text the embedding model truncates with character and token chunk sizing
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Add the project directory to the path
+import sys
+sys.path.append(str(Path(__file__).parent))
+
+# Import project components
+from config.config import CHUNKING, PROCESSED_DIR
+from src.processors.document_chunker import DocumentChunker
+from src.processors.page_stream import load_document
+from src.utils.token_counter import get_token_counter
+from src.utils.logger import get_logger
+
+# Initialize logger
+logger = get_logger("TokenReport")
+
+def truncation_stats(chunks, counter):
+    """
+    Measure how many tokens of each chunk type fall outside the window
+    
+    Args:
+        chunks (list): Chunks to measure
+        counter (TokenCounter): Token counter of the embedding model
+    
+    Returns:
+        dict: Stats per chunk type and in total
+    """
+    stats = defaultdict(lambda: {"chunks": 0, "tokens": 0, "truncated_chunks": 0, "truncated_tokens": 0})
+    counts = counter.count_many([chunk["content"] for chunk in chunks])
+    
+    for chunk, count in zip(chunks, counts):
+        truncated = max(count - counter.window, 0)
+        for key in (chunk.get("type", "unknown"), "total"):
+            stats[key]["chunks"] += 1
+            stats[key]["tokens"] += count
+            stats[key]["truncated_chunks"] += bool(truncated)
+            stats[key]["truncated_tokens"] += truncated
+    
+    return dict(stats)
+
+def token_report(document_paths, model_name=None, max_tokens=None):
+    """
+    Chunk documents by characters and by tokens and compare the truncation
+    
+    Args:
+        document_paths (list): Paths of processed page streams
+        model_name (str, optional): Embedding model
+        max_tokens (int, optional): Max sequence length, overriding the model's
+    
+    Returns:
+        dict: Report with before (characters) and after (tokens) stats per document
+    """
+    counter = get_token_counter(model_name, max_tokens)
+    report = {"model": counter.model_name, "max_seq_length": counter.max_seq_length,
+              "window": counter.window, "documents": {}}
+    
+    for path in document_paths:
+        document = load_document(path)
+        result = {}
+        for label, size_unit in (("before", "chars"), ("after", "tokens")):
+            chunk_settings = dict(CHUNKING, size_unit=size_unit, embedding_model=counter.model_name,
+                                  max_tokens=max_tokens)
+            chunks = DocumentChunker(document, chunk_settings).create_chunks()
+            result[label] = truncation_stats(chunks, counter)
+        report["documents"][document["id"]] = result
+    
+    return report
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Report tokens the embedding model truncates from chunks")
+    parser.add_argument("--dir", type=str, default=str(PROCESSED_DIR),
+                        help="Directory with processed documents (*_pages.ndjson)")
+    parser.add_argument("--document", type=str, default=None,
+                        help="Only report this document ID")
+    parser.add_argument("--model", type=str, default=CHUNKING.get("embedding_model", "all-MiniLM-L6-v2"),
+                        help="Embedding model whose tokenizer and window are used")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Max sequence length (defaults to the model's)")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Path to write the full report to (JSON)")
+    
+    args = parser.parse_args()
+    
+    pattern = f"{args.document}_pages.ndjson" if args.document else "*_pages.ndjson"
+    document_paths = sorted(Path(args.dir).glob(pattern))
+    if not document_paths:
+        logger.error(f"No processed documents found in {args.dir}")
+        return
+    
+    start_time = time.time()
+    
+    report = token_report(document_paths, args.model, args.max_tokens)
+    
+    logger.info(f"{report['model']}: {report['window']} text tokens per chunk "
+                f"(max sequence length {report['max_seq_length']})")
+    for document_id, result in report["documents"].items():
+        for label in ("before", "after"):
+            total = result[label]["total"]
+            logger.info(f"{document_id} {label:>6}: {total['chunks']} chunks, {total['tokens']} tokens, "
+                        f"{total['truncated_tokens']} truncated in {total['truncated_chunks']} chunks")
+            for chunk_type, stats in sorted(result[label].items()):
+                if chunk_type != "total" and stats["truncated_tokens"]:
+                    logger.info(f"    {chunk_type}: {stats['truncated_tokens']} tokens truncated "
+                                f"in {stats['truncated_chunks']} of {stats['chunks']} chunks")
+    
+    logger.info(f"Report completed in {time.time() - start_time:.2f} seconds")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()